@@ -0,0 +1,23 @@
+-- Refresh tokens (rotated on use) and revoked access tokens for the signed-token auth
+USE stock_db;
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+    jti VARCHAR(32) PRIMARY KEY,
+    user_id INT NOT NULL,
+    expires_at DATETIME NOT NULL,
+    revoked BOOLEAN NOT NULL DEFAULT 0,
+    INDEX ix_refresh_tokens_user_id (user_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    jti VARCHAR(32) NULL UNIQUE,
+    user_id INT NOT NULL,
+    revoked_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    expires_at DATETIME NOT NULL,
+    INDEX ix_revoked_tokens_expires_at (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Tables created before revoked_at kept microseconds
+ALTER TABLE revoked_tokens MODIFY revoked_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6);
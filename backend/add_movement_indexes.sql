@@ -0,0 +1,6 @@
+-- Indexes used by the cursor-paginated GET /stock and GET /stock/product/{id}
+-- (ix_stock_movements_date_id is created by add_stock_snapshots.sql)
+USE stock_db;
+
+CREATE INDEX ix_stock_movements_product_date_id ON stock_movements (product_id, movement_date, id);
+CREATE INDEX ix_stock_movements_type_date_id ON stock_movements (type, movement_date, id);
@@ -0,0 +1,4 @@
+-- Units of each order already delivered from stock by POST /orders/fulfill
+USE stock_db;
+
+ALTER TABLE orders ADD COLUMN fulfilled_quantity INT NOT NULL DEFAULT 0;
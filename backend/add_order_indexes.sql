@@ -0,0 +1,9 @@
+-- Indexes used by the cursor-paginated, filtered GET /orders
+-- Pages are keyed on (order_date, id): orders without a date take the migration date
+USE stock_db;
+
+UPDATE orders SET order_date = CURRENT_DATE WHERE order_date IS NULL;
+
+CREATE INDEX ix_orders_date_id ON orders (order_date, id);
+CREATE INDEX ix_orders_status_date_id ON orders (status, order_date, id);
+CREATE INDEX ix_orders_product_date_id ON orders (product_id, order_date, id);
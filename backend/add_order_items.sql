@@ -0,0 +1,26 @@
+-- Orders become a header with one line per product in order_items
+USE stock_db;
+
+CREATE TABLE IF NOT EXISTS order_items (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    order_id INT NOT NULL,
+    product_id INT NOT NULL,
+    quantity INT NOT NULL,
+    fulfilled_quantity INT NOT NULL DEFAULT 0,
+    INDEX ix_order_items_order_id (order_id, id),
+    INDEX ix_order_items_product_order (product_id, order_id),
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Every existing order becomes a one-line order
+INSERT INTO order_items (order_id, product_id, quantity, fulfilled_quantity)
+SELECT id, product_id, quantity, fulfilled_quantity FROM orders;
+
+-- orders_ibfk_1 is the product foreign key from create_database.sql
+ALTER TABLE orders DROP FOREIGN KEY orders_ibfk_1;
+DROP INDEX ix_orders_product_date_id ON orders;
+ALTER TABLE orders
+    DROP COLUMN product_id,
+    DROP COLUMN quantity,
+    DROP COLUMN fulfilled_quantity;
@@ -0,0 +1,9 @@
+-- Indexes used by the keyset-paginated GET /products (sort column + id)
+USE stock_db;
+
+CREATE INDEX ix_products_name_id ON products (name, id);
+CREATE INDEX ix_products_price_id ON products (price, id);
+CREATE INDEX ix_products_quantity_id ON products (quantity, id);
+
+-- SKU lookups used by the bulk import upsert
+CREATE INDEX ix_products_sku ON products (sku);
@@ -0,0 +1,6 @@
+-- Reorder thresholds used by GET /stock/alerts (NULL = no alert for the product)
+USE stock_db;
+
+ALTER TABLE products
+    ADD COLUMN reorder_point INT NULL,
+    ADD COLUMN reorder_qty INT NULL;
@@ -0,0 +1,38 @@
+-- Stock locations (warehouses, aisles, bins) with per-location quantities
+-- products.quantity stays the total; located_quantity is the part held in stock_levels
+USE stock_db;
+
+CREATE TABLE IF NOT EXISTS locations (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    code VARCHAR(50) NOT NULL UNIQUE,
+    name VARCHAR(150) NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stock_levels (
+    product_id INT NOT NULL,
+    location_id INT NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, location_id),
+    INDEX ix_stock_levels_location_product (location_id, product_id),
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    FOREIGN KEY (location_id) REFERENCES locations(id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stock_transfers (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    from_location_id INT NULL,
+    to_location_id INT NULL,
+    quantity INT NOT NULL,
+    transfer_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_stock_transfers_product_id (product_id),
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+    FOREIGN KEY (from_location_id) REFERENCES locations(id),
+    FOREIGN KEY (to_location_id) REFERENCES locations(id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+ALTER TABLE products ADD COLUMN located_quantity INT NOT NULL DEFAULT 0;
+
+ALTER TABLE stock_movements
+    ADD COLUMN location_id INT NULL,
+    ADD FOREIGN KEY (location_id) REFERENCES locations(id);
@@ -0,0 +1,15 @@
+-- Daily IN/OUT rollups read by /stock/trend and /stock/evolution-value
+-- Backfill existing history afterwards with: python tools/rebuild_stock_rollups.py
+USE stock_db;
+
+CREATE TABLE IF NOT EXISTS stock_daily_rollups (
+    day DATE NOT NULL,
+    product_id INT NOT NULL,
+    category_id INT NULL,
+    quantity_in INT NOT NULL DEFAULT 0,
+    quantity_out INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, product_id),
+    INDEX ix_stock_daily_rollups_product_day (product_id, day),
+    INDEX ix_stock_daily_rollups_category_day (category_id, day),
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
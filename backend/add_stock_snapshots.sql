@@ -0,0 +1,21 @@
+-- Stock snapshots used by GET /stock/as-of and GET /stats?as_of=
+-- Take snapshots periodically (e.g. nightly cron): python tools/take_stock_snapshot.py
+USE stock_db;
+
+CREATE INDEX ix_stock_movements_date_id ON stock_movements (movement_date, id);
+
+CREATE TABLE IF NOT EXISTS stock_snapshots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    taken_at DATETIME NOT NULL,
+    INDEX ix_stock_snapshots_taken_at (taken_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS stock_snapshot_lines (
+    snapshot_id INT NOT NULL,
+    product_id INT NOT NULL,
+    category_id INT NULL,
+    quantity INT NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    PRIMARY KEY (snapshot_id, product_id),
+    FOREIGN KEY (snapshot_id) REFERENCES stock_snapshots(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
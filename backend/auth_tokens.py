@@ -0,0 +1,202 @@
+import logging
+import math
+import os
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, NamedTuple, Optional
+
+from fastapi import HTTPException
+from jose import ExpiredSignatureError, JWTError, jwt
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import RefreshToken, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+JWT_SECRET = os.getenv("JWT_SECRET")
+if not JWT_SECRET:
+    # Tokens then only verify in this process and die with it
+    JWT_SECRET = secrets.token_urlsafe(32)
+    logger.warning("JWT_SECRET non défini: clé de signature aléatoire pour ce processus")
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "7"))
+# How often each worker reloads revocations made by the other workers
+REVOCATION_RESYNC_SECONDS = float(os.getenv("REVOCATION_RESYNC_SECONDS", "30"))
+
+
+class TokenUser(NamedTuple):
+    """The authenticated user as carried by the access token claims."""
+    id: int
+    role: str
+    jti: str
+    issued_at: float
+    expires_at: int
+
+
+def _role_value(role) -> str:
+    return role.value if hasattr(role, "value") else str(role)
+
+
+def _encode(claims: dict) -> str:
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def create_access_token(user) -> str:
+    now = time.time()
+    return _encode({
+        "sub": str(user.id),
+        "role": _role_value(user.role),
+        "type": "access",
+        "jti": uuid.uuid4().hex,
+        # Milliseconds, rounded down, so that a revocation splits the tokens of a same second
+        "iat": math.floor(now * 1000) / 1000,
+        "exp": int(now) + ACCESS_TOKEN_MINUTES * 60,
+    })
+
+
+def create_refresh_token(db: Session, user_id: int) -> str:
+    """Issue a refresh token and record it, so it can be rotated and revoked. The caller commits."""
+    now = int(time.time())
+    jti = uuid.uuid4().hex
+    expires = now + REFRESH_TOKEN_DAYS * 86400
+    db.add(RefreshToken(jti=jti, user_id=user_id, expires_at=datetime.fromtimestamp(expires)))
+    return _encode({"sub": str(user_id), "type": "refresh", "jti": jti, "iat": now, "exp": expires})
+
+
+def decode_token(token: str, expected_type: str) -> dict:
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Jeton expiré")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Jeton invalide")
+    if claims.get("type") != expected_type:
+        raise HTTPException(status_code=401, detail="Jeton invalide")
+    return claims
+
+
+class RevocationList:
+    """Revoked access tokens, checked in memory on every request.
+
+    Entries are single token ids (logout) or a user id with a time before
+    which all of that user's tokens are refused (password, role or account
+    changes). Revocations are written to the revoked_tokens table and each
+    process reloads it every REVOCATION_RESYNC_SECONDS, so a revocation made
+    by another worker applies within that delay; an entry is dropped once
+    the tokens it covers have expired anyway.
+    """
+
+    def __init__(self, resync_seconds: float = REVOCATION_RESYNC_SECONDS):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._resync_seconds = resync_seconds
+        self._tokens: Dict[str, float] = {}  # jti -> expiry
+        self._users: Dict[int, float] = {}  # user id -> revoked before (epoch seconds)
+        self._loaded_at: Optional[float] = None
+
+    def load(self, db: Session):
+        now = datetime.now()
+        db.query(RevokedToken).filter(RevokedToken.expires_at < now).delete(synchronize_session=False)
+        db.commit()
+        tokens, users = {}, {}
+        for row in db.query(RevokedToken.jti, RevokedToken.user_id, RevokedToken.revoked_at, RevokedToken.expires_at):
+            if row.jti:
+                tokens[row.jti] = row.expires_at.timestamp()
+            else:
+                users[row.user_id] = max(users.get(row.user_id, 0), row.revoked_at.timestamp())
+        with self._lock:
+            self._tokens, self._users = tokens, users
+            self._loaded_at = time.monotonic()
+
+    def ensure_fresh(self, session_factory):
+        """Reload when stale; a single request pays for it while the others use the current list."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self._resync_seconds:
+            return
+        if not self._reload_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            db = session_factory()
+            try:
+                self.load(db)
+            finally:
+                db.close()
+        finally:
+            self._reload_lock.release()
+
+    def is_revoked(self, user: TokenUser) -> bool:
+        return user.jti in self._tokens or user.issued_at < self._users.get(user.id, -1)
+
+    def revoke_token(self, db: Session, user: TokenUser):
+        """Refuse this access token from now on. The caller commits."""
+        db.add(RevokedToken(jti=user.jti, user_id=user.id, expires_at=datetime.fromtimestamp(user.expires_at)))
+        with self._lock:
+            self._tokens[user.jti] = user.expires_at
+
+    def revoke_user(self, db: Session, user_id: int):
+        """Refuse every token issued so far to this user, refresh tokens included. The caller commits."""
+        # Rounded up to the millisecond of the iat claims: every token issued so far is older
+        now = datetime.fromtimestamp(math.ceil(time.time() * 1000) / 1000)
+        db.add(RevokedToken(
+            jti=None, user_id=user_id, revoked_at=now,
+            expires_at=now + timedelta(minutes=ACCESS_TOKEN_MINUTES),
+        ))
+        db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked.is_(False))
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        )
+        with self._lock:
+            self._users[user_id] = max(self._users.get(user_id, 0), now.timestamp())
+
+
+revocations = RevocationList()
+
+
+def authenticate(token: str) -> TokenUser:
+    """Verify an access token: signature, expiry and revocation, without touching the database."""
+    claims = decode_token(token, "access")
+    try:
+        user = TokenUser(int(claims["sub"]), claims["role"], claims["jti"], float(claims["iat"]), int(claims["exp"]))
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=401, detail="Jeton invalide")
+    if revocations.is_revoked(user):
+        raise HTTPException(status_code=401, detail="Jeton révoqué")
+    return user
+
+
+def rotate_refresh_token(db: Session, token: str) -> int:
+    """Consume a refresh token and return its user id; a new one must then be issued.
+
+    Presenting a token that was already used means it leaked: every refresh
+    token of that user is revoked. The caller commits.
+    """
+    claims = decode_token(token, "refresh")
+    row = db.query(RefreshToken).filter(RefreshToken.jti == claims.get("jti")).with_for_update().first()
+    if row is None or row.expires_at < datetime.now():
+        raise HTTPException(status_code=401, detail="Jeton invalide")
+    if row.revoked:
+        revocations.revoke_user(db, row.user_id)
+        db.commit()
+        raise HTTPException(status_code=401, detail="Jeton révoqué")
+    row.revoked = True
+    return row.user_id
+
+
+def revoke_refresh_token(db: Session, token: str):
+    """Revoke a refresh token (logout); unknown or invalid tokens are ignored. The caller commits."""
+    try:
+        claims = decode_token(token, "refresh")
+    except HTTPException:
+        return
+    db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.jti == claims.get("jti"))
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
@@ -3,7 +3,7 @@ load_dotenv()
 
 from database import SessionLocal
 from models import User
-from tools.hash_password import hash_password
+from tools.hash_password import hash_password, verify_password
 
 db = SessionLocal()
 
@@ -27,7 +27,7 @@ try:
     admin = db.query(User).filter(User.email == "admin@stock.com").first()
     if admin:
         print(f"\nAdmin found!")
-        print(f"Password matches: {hash_password('admin123') == admin.password}")
+        print(f"Password matches: {verify_password('admin123', admin.password)[0]}")
     else:
         print("\nNo admin user found!")
         
@@ -1,7 +1,11 @@
 import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from pool_metrics import MeasuredAsyncQueuePool, MeasuredQueuePool, async_pool_metrics, pool_metrics
 
 # Load environment variables
 load_dotenv()
@@ -12,10 +16,74 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_NAME = os.getenv("DB_NAME", "stock_db")
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+# DATABASE_URL overrides the MySQL settings (e.g. a SQLite file for load tests)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+
+# Connection pool, per process: size it to the worker threads that query
+# at once (see GET /stats/pool for the checkout wait and overflow use)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing the request
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Reconnect after this many seconds, below MySQL's wait_timeout (8 h by default)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+
+def pool_options(url) -> dict:
+    """Pool settings for ``url``; none for in-memory SQLite, which lives in one connection."""
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
 
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
+    **({"poolclass": MeasuredQueuePool, **pool_options(DATABASE_URL)} if pool_options(DATABASE_URL) else {}),
 )
+pool_metrics.attach(engine)
 SessionLocal = sessionmaker(bind=engine)
+
+# Read replicas, comma-separated URLs: the heavy read-only routes go there
+# (see read_routing.py), every write still goes to DATABASE_URL
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DB_REPLICA_URL", "").split(",") if url.strip()]
+replica_engines = [create_engine(url, pool_pre_ping=True, **pool_options(url)) for url in DB_REPLICA_URLS]
+ReplicaSessionLocals = [sessionmaker(bind=replica) for replica in replica_engines]
+
+# DB_ASYNC=1 serves the hot read routes (products, stock, orders, stats)
+# from an asyncio engine, so waiting on the database does not hold one of
+# the threadpool's threads. Same database, through aiomysql (aiosqlite for
+# a SQLite URL); its pool has the same settings as the sync one.
+DB_ASYNC = os.getenv("DB_ASYNC", "0").lower() in ("1", "true", "yes")
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+async_engine = None
+AsyncSessionLocal = None
+AsyncReplicaSessionLocals = []
+if DB_ASYNC:
+    async_engine = create_async_engine(
+        async_url(DATABASE_URL),
+        pool_pre_ping=True,
+        **({"poolclass": MeasuredAsyncQueuePool, **pool_options(DATABASE_URL)} if pool_options(DATABASE_URL) else {}),
+    )
+    async_pool_metrics.attach(async_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    AsyncReplicaSessionLocals = [
+        async_sessionmaker(
+            create_async_engine(
+                async_url(url),
+                pool_pre_ping=True,
+                **({"poolclass": AsyncAdaptedQueuePool, **pool_options(url)} if pool_options(url) else {}),
+            ),
+            expire_on_commit=False,
+        )
+        for url in DB_REPLICA_URLS
+    ]
@@ -1,8 +1,9 @@
-from typing import List, Union
-from fastapi import Depends, HTTPException, Header
-from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import User
+from typing import List, Optional, Union
+from fastapi import Depends, HTTPException, Header, Request
+from fastapi.concurrency import run_in_threadpool
+from auth_tokens import TokenUser, authenticate, decode_token, revocations
+from database import AsyncSessionLocal, SessionLocal
+from read_routing import READ_PIN_COOKIE, replica_router
 
 
 def get_db():
@@ -13,21 +14,70 @@ def get_db():
         db.close()
 
 
-def get_current_user(x_user_id: int = Header(None), db: Session = Depends(get_db)):
-    if x_user_id is None:
-        raise HTTPException(status_code=401, detail="User ID header missing")
-    user = db.query(User).filter(User.id == x_user_id).first()
-    if not user:
-        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
-    return user
+async def get_async_db():
+    """AsyncSession for the async read routes (only registered when DB_ASYNC is on)."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def reader_key(request: Request) -> str:
+    """Who is reading or writing, for read-your-writes: the token's user, else the client address."""
+    scheme, _, token = (request.headers.get("authorization") or "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            return "user:" + decode_token(token, "access")["sub"]
+        except HTTPException:
+            pass
+    return "client:" + (request.client.host if request.client else "")
+
+
+def pinned_by_client(request: Request) -> bool:
+    """Whether the request carries a live read-your-writes pin, set by whichever worker took the write."""
+    return replica_router.cookie_pinned(request.cookies.get(READ_PIN_COOKIE))
+
+
+def get_read_db(request: Request):
+    """Session for a read-only route: a replica when one is fresh enough, else the primary."""
+    session_factory = (
+        replica_router.session_factory(reader_key(request), pinned_by_client(request))
+        if replica_router.replicas else None
+    )
+    db = (session_factory or SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    if replica_router.replicas and replica_router.check_due():
+        await run_in_threadpool(replica_router.check_lag)
+    replica = replica_router.pick(reader_key(request), pinned_by_client(request)) if replica_router.replicas else None
+    async with (replica.async_session_factory if replica else AsyncSessionLocal)() as db:
+        yield db
+
+
+def get_current_user(authorization: str = Header(None)) -> TokenUser:
+    """The user of the Bearer access token, from its claims alone (no database query)."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Jeton d'accès manquant", headers={"WWW-Authenticate": "Bearer"})
+    revocations.ensure_fresh(SessionLocal)
+    return authenticate(token)
+
+
+def get_stream_user(authorization: str = Header(None), access_token: Optional[str] = None) -> TokenUser:
+    """get_current_user for EventSource streams, which cannot send headers: the token may come as ?access_token=."""
+    if not authorization and access_token:
+        authorization = f"Bearer {access_token}"
+    return get_current_user(authorization)
 
 
 def role_dependency(required_roles: Union[str, List[str]]):
     roles = [required_roles] if isinstance(required_roles, str) else required_roles
 
-    def _role_check(user: User = Depends(get_current_user)):
-        user_role = user.role.value if hasattr(user.role, 'value') else str(user.role)
-        if user_role not in roles:
+    def _role_check(user: TokenUser = Depends(get_current_user)):
+        if user.role not in roles:
             raise HTTPException(status_code=403, detail="Accès interdit")
         return user
 
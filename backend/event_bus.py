@@ -0,0 +1,121 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# Events kept for clients resuming with Last-Event-ID
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "10000"))
+# Events queued for one slow client before it is asked to resynchronize
+EVENT_SUBSCRIBER_QUEUE = int(os.getenv("EVENT_SUBSCRIBER_QUEUE", "1000"))
+
+TOPICS = ("products", "stock", "orders", "alerts")
+
+
+class Event(NamedTuple):
+    seq: int
+    topic: str
+    type: str
+    data: dict
+    ts: float
+
+
+class Subscriber:
+    def __init__(self, topics: Set[str], loop: asyncio.AbstractEventLoop):
+        self.topics = topics
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue()
+        self.overflowed = False
+
+    def _deliver(self, event: Event):
+        # Runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= EVENT_SUBSCRIBER_QUEUE:
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+
+class EventBus:
+    """In-process publish/subscribe of compact change events.
+
+    Write paths call publish() after their commit, from any thread. Every
+    event gets the next sequence number and is kept in a ring buffer, so a
+    client reconnecting with the last id it saw gets what it missed. Ids
+    carry an epoch (the process start) so ids from a previous process, or
+    from before the buffer, are detected and the client is told to reload.
+
+    Events only reach clients connected to the worker process that made the
+    write.
+    """
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self.epoch = format(time.time_ns(), "x")
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._buffer: Deque[Event] = deque(maxlen=buffer_size)
+        self._subscribers: List[Subscriber] = []
+
+    def event_id(self, event: Event) -> str:
+        return f"{self.epoch}-{event.seq}"
+
+    def parse_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Sequence number of an id issued by this process (None if unknown or foreign)."""
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def publish(self, topic: str, type: str, data: dict) -> Event:
+        with self._lock:
+            self._seq += 1
+            event = Event(self._seq, topic, type, data, time.time())
+            self._buffer.append(event)
+            subscribers = [s for s in self._subscribers if topic in s.topics]
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber._deliver, event)
+            except RuntimeError:
+                # The client's event loop is gone
+                self.unsubscribe(subscriber)
+        return event
+
+    def publish_many(self, topic: str, events: Iterable[Tuple[str, dict]]):
+        for type, data in events:
+            self.publish(topic, type, data)
+
+    def subscribe(self, topics: Iterable[str]) -> Subscriber:
+        """Register a subscriber on the running event loop."""
+        subscriber = Subscriber(set(topics), asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def since(self, seq: int, topics: Set[str]) -> Tuple[List[Event], bool]:
+        """Buffered events after ``seq`` on ``topics``; False if some were already dropped."""
+        with self._lock:
+            complete = seq >= self._seq or (bool(self._buffer) and self._buffer[0].seq <= seq + 1)
+            events = [e for e in self._buffer if e.seq > seq and e.topic in topics]
+        return events, complete
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "last_seq": self._seq,
+                "buffered": len(self._buffer),
+                "subscribers": len(self._subscribers),
+            }
+
+
+event_bus = EventBus()
@@ -0,0 +1,232 @@
+import math
+import os
+import threading
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import String, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from models import StockDailyRollup, StockMovement
+
+FORECAST_HISTORY_DAYS = int(os.getenv("FORECAST_HISTORY_DAYS", "730"))
+# Half-life, in days, of the weight given to past sales in the velocity
+FORECAST_HALF_LIFE_DAYS = float(os.getenv("FORECAST_HALF_LIFE_DAYS", "30"))
+# Days between placing an order and receiving it, and between two orders
+FORECAST_LEAD_TIME_DAYS = int(os.getenv("FORECAST_LEAD_TIME_DAYS", "7"))
+FORECAST_REVIEW_DAYS = int(os.getenv("FORECAST_REVIEW_DAYS", "30"))
+# Safety stock in standard deviations of lead-time demand (1.65 ~ 95% service level)
+FORECAST_SERVICE_Z = float(os.getenv("FORECAST_SERVICE_Z", "1.65"))
+
+MOVING_AVERAGE_WINDOWS = (7, 30, 90)
+# Days read one by one; older history is summed per product by the database
+DAILY_WINDOW = MOVING_AVERAGE_WINDOWS[-1]
+_LOAD_BATCH = 100_000
+
+
+class Demand(NamedTuple):
+    """Per-product demand statistics, one array entry per product id in ``ids`` (sorted)."""
+    ids: np.ndarray
+    velocity: np.ndarray
+    moving_averages: dict
+    sigma: np.ndarray
+    last_sale: np.ndarray
+    computed_at: date
+
+
+def _day_numbers(values) -> np.ndarray:
+    # Dates are read as 'YYYY-MM-DD' text and parsed by NumPy in one call
+    return np.array(values, dtype="datetime64[D]").astype(np.int64)
+
+
+def load_demand(db: Session, today: Optional[date] = None, history_days: int = FORECAST_HISTORY_DAYS) -> Demand:
+    """Compute demand statistics for every product from the daily OUT rollups.
+
+    Two reads: the (product, day, quantity) rows of the last DAILY_WINDOW
+    days into flat arrays, and one row per product with its totals over
+    the whole history. Every statistic is then a vectorized operation
+    (np.bincount, np.unique) over those arrays, with no per-product loop.
+    """
+    today = today or date.today()
+    origin = _day_numbers([today.isoformat()])[0]  # day numbers are counted back from today
+    history_start = today - timedelta(days=history_days - 1)
+    year_start = today - timedelta(days=364)
+    conn = db.connection()
+
+    products, ages, quantities = [], [], []
+    recent = conn.execution_options(stream_results=True).execute(
+        select(StockDailyRollup.product_id, cast(StockDailyRollup.day, String), StockDailyRollup.quantity_out)
+        .where(StockDailyRollup.day > today - timedelta(days=DAILY_WINDOW), StockDailyRollup.day <= today)
+        .where(StockDailyRollup.quantity_out > 0)
+    )
+    for batch in recent.partitions(_LOAD_BATCH):
+        product_col, day_col, quantity_col = zip(*batch)
+        products.append(np.fromiter(product_col, dtype=np.int64, count=len(batch)))
+        ages.append(origin - _day_numbers(day_col))
+        quantities.append(np.fromiter(quantity_col, dtype=np.float64, count=len(batch)))
+
+    totals = conn.execute(
+        select(
+            StockDailyRollup.product_id,
+            func.sum(case((StockDailyRollup.day >= year_start, StockDailyRollup.quantity_out), else_=0)),
+            func.sum(StockDailyRollup.quantity_out),
+            cast(func.max(StockDailyRollup.day), String),
+        )
+        .where(StockDailyRollup.day >= history_start, StockDailyRollup.day <= today, StockDailyRollup.quantity_out > 0)
+        .group_by(StockDailyRollup.product_id)
+    ).all()
+    if not totals:
+        empty = np.zeros(0)
+        return Demand(np.zeros(0, dtype=np.int64), empty, {w: empty for w in (*MOVING_AVERAGE_WINDOWS, 365)}, empty, np.zeros(0, dtype=np.int64), today)
+
+    total_ids, year_totals, history_totals, last_days = zip(*totals)
+    ids = np.array(total_ids, dtype=np.int64)
+    order = np.argsort(ids)
+    ids = ids[order]
+    n = len(ids)
+    year_total = np.array(year_totals, dtype=np.float64)[order]
+    history_total = np.array(history_totals, dtype=np.float64)[order]
+    last_sale = (_day_numbers(last_days)[order] + date(1970, 1, 1).toordinal())
+
+    product = np.concatenate(products) if products else np.zeros(0, dtype=np.int64)
+    age = np.concatenate(ages) if ages else np.zeros(0, dtype=np.int64)
+    quantity = np.concatenate(quantities) if quantities else np.zeros(0)
+    index = np.searchsorted(ids, product)
+
+    def window_sum(values, window):
+        mask = age < window
+        return np.bincount(index[mask], weights=values[mask], minlength=n)
+
+    moving_averages = {w: window_sum(quantity, w) / w for w in MOVING_AVERAGE_WINDOWS}
+    moving_averages[365] = year_total / min(365, history_days)
+
+    # Exponentially weighted daily demand: the last DAILY_WINDOW days day by day,
+    # older sales at the average rate of the rest of the history
+    decay = 0.5 ** (1 / FORECAST_HALF_LIFE_DAYS)
+    recent_weight = (1 - decay ** DAILY_WINDOW) / (1 - decay)
+    older_weight = (decay ** DAILY_WINDOW - decay ** history_days) / (1 - decay)
+    older_days = max(history_days - DAILY_WINDOW, 1)
+    older_rate = (history_total - window_sum(quantity, DAILY_WINDOW)) / older_days
+    velocity = (np.bincount(index, weights=quantity * decay ** age, minlength=n) + older_rate * older_weight) / (recent_weight + older_weight)
+
+    # Daily standard deviation over the daily window (days without sales count as zeros)
+    mean = moving_averages[DAILY_WINDOW]
+    variance = window_sum(quantity ** 2, DAILY_WINDOW) / DAILY_WINDOW - mean ** 2
+    sigma = np.sqrt(np.clip(variance, 0, None))
+    return Demand(ids, velocity, moving_averages, sigma, last_sale, today)
+
+
+def forecast(
+    demand: Demand,
+    product_ids: np.ndarray,
+    quantities: np.ndarray,
+    reorder_qty: np.ndarray,
+    lead_time_days: int = FORECAST_LEAD_TIME_DAYS,
+    review_days: int = FORECAST_REVIEW_DAYS,
+    service_z: float = FORECAST_SERVICE_Z,
+) -> dict:
+    """Days of cover and suggested order quantity for each given product, as arrays.
+
+    The target stock covers the expected demand over lead time + review
+    period plus a safety stock of ``service_z`` standard deviations of
+    lead-time demand; the suggestion (rounded up to whole ``reorder_qty``
+    lots when set) brings the stock up to it.
+    """
+    positions = np.searchsorted(demand.ids, product_ids)
+    positions = np.clip(positions, 0, max(len(demand.ids) - 1, 0))
+    known = (demand.ids[positions] == product_ids) if len(demand.ids) else np.zeros(len(product_ids), dtype=bool)
+
+    def pick(values):
+        return np.where(known, values[positions], 0.0) if len(demand.ids) else np.zeros(len(product_ids))
+
+    velocity = pick(demand.velocity)
+    sigma = pick(demand.sigma)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(velocity > 0, quantities / velocity, np.inf)
+
+    safety = service_z * sigma * math.sqrt(lead_time_days)
+    target = velocity * (lead_time_days + review_days) + safety
+    needed = np.ceil(np.clip(target - quantities, 0, None))
+    lots = np.where(reorder_qty > 0, reorder_qty, 1)
+    suggested = np.ceil(needed / lots) * lots
+    return {
+        "velocity": velocity,
+        "moving_averages": {w: pick(ma) for w, ma in demand.moving_averages.items()},
+        "sigma": sigma,
+        "safety_stock": safety,
+        "days_of_cover": days_of_cover,
+        "suggested_qty": suggested.astype(np.int64),
+        "last_sale": np.where(known, demand.last_sale[positions], 0) if len(demand.ids) else np.zeros(len(product_ids), dtype=np.int64),
+    }
+
+
+class DemandCache:
+    """Demand statistics cached until new movements arrive.
+
+    The key is a version bumped by every stock change committed in this
+    process, the highest movement id (movements written by other workers)
+    and the date, since the windows move at midnight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._key = None
+        self._demand: Optional[Demand] = None
+
+    def invalidate(self):
+        self._version += 1
+
+    def get(self, db: Session) -> Demand:
+        key = (self._version, db.query(func.max(StockMovement.id)).scalar(), date.today())
+        with self._lock:
+            if self._demand is None or key != self._key:
+                self._demand = load_demand(db)
+                self._key = key
+            return self._demand
+
+
+demand_cache = DemandCache()
+
+
+def forecast_rows(db: Session, rows: List, limit: Optional[int] = None, reorder_only: bool = False) -> List[dict]:
+    """Forecast for product rows (with id, quantity and reorder_qty), least days of cover first.
+
+    Sorting and filtering happen on the arrays; only the returned rows are
+    turned into dicts.
+    """
+    if not rows:
+        return []
+    demand = demand_cache.get(db)
+    result = forecast(
+        demand,
+        np.fromiter((r.id for r in rows), dtype=np.int64, count=len(rows)),
+        np.fromiter((r.quantity or 0 for r in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((r.reorder_qty or 0 for r in rows), dtype=np.float64, count=len(rows)),
+    )
+    cover = result["days_of_cover"]
+    order = np.lexsort((-result["velocity"], cover))
+    if reorder_only:
+        order = order[result["suggested_qty"][order] > 0]
+    if limit is not None:
+        order = order[:limit]
+
+    out = []
+    for i in order.tolist():
+        row = rows[i]
+        days = float(cover[i])
+        last_sale = int(result["last_sale"][i])
+        out.append({
+            "product_id": row.id,
+            "quantity": row.quantity,
+            "velocity": round(float(result["velocity"][i]), 3),
+            **{f"ma_{w}": round(float(ma[i]), 3) for w, ma in result["moving_averages"].items()},
+            "safety_stock": round(float(result["safety_stock"][i]), 1),
+            "days_of_cover": round(days, 1) if math.isfinite(days) else None,
+            "stockout_date": (demand.computed_at + timedelta(days=int(days))).isoformat() if math.isfinite(days) else None,
+            "last_sale": date.fromordinal(last_sale).isoformat() if last_sale else None,
+            "reorder_qty": row.reorder_qty,
+            "suggested_qty": int(result["suggested_qty"][i]),
+        })
+    return out
@@ -0,0 +1,239 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+
+from database import SessionLocal
+from models import Product, StockMovement
+from stock_rollups import record_rollup
+from stock_service import apply_delta, movement_event, publish_changes
+
+STOCK_GROUP_COMMIT = os.getenv("STOCK_GROUP_COMMIT", "0") == "1"
+STOCK_GROUP_COMMIT_MAX_BATCH = int(os.getenv("STOCK_GROUP_COMMIT_MAX_BATCH", "200"))
+STOCK_GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("STOCK_GROUP_COMMIT_MAX_DELAY_MS", "5"))
+STOCK_GROUP_COMMIT_TIMEOUT = float(os.getenv("STOCK_GROUP_COMMIT_TIMEOUT", "30"))
+
+
+class PendingMovement(NamedTuple):
+    product_id: int
+    movement_type: str
+    quantity: int
+    future: Future
+
+
+def _product_dict(product: Product, quantity: int) -> dict:
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": product.price,
+        "quantity": quantity,
+        "sku": product.sku,
+        "description": product.description,
+        "category_id": product.category_id,
+        "supplier_id": product.supplier_id,
+        "image_url": product.image_url,
+    }
+
+
+class GroupCommitWriter:
+    """Queue stock movements and commit them in groups from one writer thread.
+
+    A group is closed when it reaches ``max_batch`` movements or when
+    ``max_delay_ms`` has elapsed since its first movement. Each group is
+    one transaction: products are locked once, movements are checked in
+    arrival order, each product gets one conditional update with its net
+    delta, and all movement rows are inserted together. Callers block until
+    the group holding their movement has committed (or been rejected); a
+    caller that times out before its movement is picked up withdraws it.
+    """
+
+    def __init__(self, session_factory, max_batch: int = STOCK_GROUP_COMMIT_MAX_BATCH, max_delay_ms: float = STOCK_GROUP_COMMIT_MAX_DELAY_MS):
+        self._session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._queue: "queue.Queue[Optional[PendingMovement]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics_lock = threading.Lock()
+        self._reset_metrics()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._thread = threading.Thread(target=self._run, name="stock-group-commit", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Commit what is queued, then stop the writer thread."""
+        if self.running:
+            self._queue.put(None)
+            self._thread.join()
+        self._thread = None
+
+    def submit(self, product_id: int, movement_type: str, quantity: int) -> dict:
+        """Queue one movement and wait for its group to commit."""
+        future: Future = Future()
+        self._queue.put(PendingMovement(product_id, movement_type, quantity, future))
+        try:
+            return future.result(timeout=STOCK_GROUP_COMMIT_TIMEOUT)
+        except FutureTimeout:
+            # Only a movement the writer has not picked up yet can be withdrawn:
+            # the 503 then means it is never written, and a retry cannot double it
+            if future.cancel():
+                with self._metrics_lock:
+                    self._cancelled += 1
+                raise HTTPException(status_code=503, detail="Écriture du stock indisponible")
+        # Its group is already being committed: report the actual outcome
+        return future.result()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stopping:
+                return
+
+    def _commit(self, batch: List[PendingMovement]):
+        # Skip the movements whose caller gave up; the others can no longer be cancelled
+        batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        db = self._session_factory()
+        accepted: List[PendingMovement] = []
+        quantities_after: List[int] = []
+        try:
+            product_ids = sorted({item.product_id for item in batch})
+            products = {
+                p.id: p for p in
+                db.query(Product).filter(Product.id.in_(product_ids)).order_by(Product.id).with_for_update().all()
+            }
+
+            # Check each movement against the running quantity, in arrival order
+            quantities = {product_id: p.quantity for product_id, p in products.items()}
+            totals: Dict[int, Dict[str, int]] = {}
+            for item in batch:
+                if item.product_id not in products:
+                    item.future.set_exception(HTTPException(status_code=404, detail="Produit non trouvé"))
+                    continue
+                delta = item.quantity if item.movement_type == "IN" else -item.quantity
+                # Stock held at a location is only taken out through that location
+                if quantities[item.product_id] + delta < (products[item.product_id].located_quantity or 0):
+                    item.future.set_exception(HTTPException(status_code=400, detail="Stock insuffisant"))
+                    continue
+                quantities[item.product_id] += delta
+                quantities_after.append(quantities[item.product_id])
+                product_totals = totals.setdefault(item.product_id, {"IN": 0, "OUT": 0})
+                product_totals[item.movement_type] += item.quantity
+                accepted.append(item)
+
+            changes = []
+            for product_id in sorted(totals):
+                quantity_in, quantity_out = totals[product_id]["IN"], totals[product_id]["OUT"]
+                change = apply_delta(db, product_id, quantity_in - quantity_out)
+                record_rollup(db, product_id, change.after.category_id, date.today(), quantity_in=quantity_in, quantity_out=quantity_out)
+                changes.append(change)
+
+            now = datetime.now()
+            movements = [
+                StockMovement(product_id=item.product_id, type=item.movement_type, quantity=item.quantity, movement_date=now)
+                for item in accepted
+            ]
+            db.add_all(movements)
+            db.flush()
+            results = [
+                {
+                    "movement": {
+                        "id": mv.id,
+                        "product_id": mv.product_id,
+                        "type": item.movement_type,
+                        "quantity": mv.quantity,
+                        "movement_date": now,
+                    },
+                    "product": _product_dict(products[item.product_id], quantity),
+                }
+                for item, mv, quantity in zip(accepted, movements, quantities_after)
+            ]
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            error = e if isinstance(e, HTTPException) else HTTPException(status_code=500, detail="Erreur d'écriture du stock")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(error)
+            self._record(len(batch), 0, time.perf_counter() - started)
+            return
+        finally:
+            db.close()
+
+        publish_changes(changes, [("movement.created", movement_event(result["movement"])) for result in results])
+        for item, result in zip(accepted, results):
+            item.future.set_result(result)
+        self._record(len(batch), len(accepted), time.perf_counter() - started)
+
+    def _reset_metrics(self):
+        self._batches = 0
+        self._movements = 0
+        self._committed = 0
+        self._max_batch_seen = 0
+        self._commit_seconds = 0.0
+        self._cancelled = 0
+        self._size_buckets: Dict[str, int] = {}
+
+    def _record(self, size: int, committed: int, seconds: float):
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        label = str(bucket) if bucket <= 2 else f"{bucket // 2 + 1}-{bucket}"
+        with self._metrics_lock:
+            self._batches += 1
+            self._movements += size
+            self._committed += committed
+            self._max_batch_seen = max(self._max_batch_seen, size)
+            self._commit_seconds += seconds
+            self._size_buckets[label] = self._size_buckets.get(label, 0) + 1
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            return {
+                "enabled": self.running,
+                "max_batch": self.max_batch,
+                "max_delay_ms": self.max_delay * 1000,
+                "queued": self._queue.qsize(),
+                "batches": self._batches,
+                "movements": self._movements,
+                "committed": self._committed,
+                "rejected": self._movements - self._committed,
+                "cancelled": self._cancelled,
+                "avg_batch_size": round(self._movements / self._batches, 2) if self._batches else 0,
+                "max_batch_size": self._max_batch_seen,
+                "avg_commit_ms": round(self._commit_seconds / self._batches * 1000, 3) if self._batches else 0,
+                "batch_size_histogram": dict(sorted(self._size_buckets.items(), key=lambda kv: int(kv[0].split("-")[-1]))),
+            }
+
+
+stock_group_writer = GroupCommitWriter(SessionLocal)
@@ -1,7 +1,17 @@
-from fastapi import FastAPI
+import math
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from routes import auth, products, categories, suppliers, orders, stock, stats, users, upload
+from routes import auth, products, categories, suppliers, orders, stock, stats, users, upload, export, events, locations
 from pathlib import Path
+from database import DB_ASYNC, SessionLocal
+from models import Product
+from search_index import product_index
+from stats_engine import stock_stats
+from stock_alerts import stock_alerts
+from event_bus import event_bus
+from group_commit import STOCK_GROUP_COMMIT, stock_group_writer
+from dependencies import reader_key
+from read_routing import READ_PIN_COOKIE, replica_router
 
 app = FastAPI(title="Stock Management App")
 from fastapi.middleware.cors import CORSMiddleware
@@ -18,8 +28,37 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Content-Disposition"],
 )
+@app.middleware("http")
+async def pin_writers_to_primary(request: Request, call_next):
+    # Read-your-writes: after a successful write its author reads from the
+    # primary for a while, the replicas may not have replayed it yet
+    # (logins and token refreshes change nothing the read routes show).
+    # The pin goes back to the client as a cookie: its next read may reach
+    # another worker
+    response = await call_next(request)
+    if (
+        replica_router.replicas
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+        and not request.url.path.startswith("/auth/")
+    ):
+        replica_router.pin(reader_key(request))
+        response.set_cookie(
+            READ_PIN_COOKIE,
+            f"{replica_router.pin_until():.3f}",
+            max_age=math.ceil(replica_router.pin_seconds),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
 # Routes
+if DB_ASYNC:
+    # Registered first, so these async handlers win over the sync ones on the same paths
+    for module in (products, stock, orders, stats):
+        app.include_router(module.async_router)
 app.include_router(auth.router)
 app.include_router(products.router)
 app.include_router(categories.router)
@@ -29,6 +68,52 @@ app.include_router(stock.router)
 app.include_router(stats.router)
 app.include_router(users.router)
 app.include_router(upload.router)
+app.include_router(export.router)
+app.include_router(events.router)
+app.include_router(locations.router)
+
+# New low-stock breaches and restocks are pushed on the "alerts" event topic
+stock_alerts.subscribe(lambda alert: event_bus.publish("alerts", alert["status"], alert))
+
+@app.on_event("startup")
+def build_search_index():
+    db = SessionLocal()
+    try:
+        product_index.rebuild(db.query(Product.id, Product.name, Product.sku, Product.description))
+    except Exception as e:
+        print(f"Search index build failed: {e}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def load_stock_stats():
+    db = SessionLocal()
+    try:
+        stock_stats.load(db)
+    except Exception as e:
+        print(f"Stock stats load failed: {e}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def load_stock_alerts():
+    db = SessionLocal()
+    try:
+        stock_alerts.load(db)
+    except Exception as e:
+        print(f"Stock alerts load failed: {e}")
+    finally:
+        db.close()
+
+@app.on_event("startup")
+def start_group_commit():
+    # Opt-in: STOCK_GROUP_COMMIT=1 routes single stock movements through the group writer
+    if STOCK_GROUP_COMMIT:
+        stock_group_writer.start()
+
+@app.on_event("shutdown")
+def stop_group_commit():
+    stock_group_writer.stop()
 
 @app.get("/")
 def root():
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, Numeric, Enum, ForeignKey, Date, TIMESTAMP, func
+from sqlalchemy import Boolean, Column, Integer, String, Float, Numeric, Enum, ForeignKey, Date, DateTime, TIMESTAMP, Index, func
+from sqlalchemy.dialects import mysql
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import enum
@@ -18,6 +19,24 @@ class User(Base):
     password = Column(String(255), nullable=False)
     role = Column(Enum(RoleEnum), nullable=False)
 
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False)
+    # Set once used (rotation) or on logout
+    revoked = Column(Boolean, nullable=False, default=False, server_default="0")
+
+class RevokedToken(Base):
+    # Access tokens refused before their expiry: one token (jti) or all of a user's tokens issued until revoked_at
+    __tablename__ = "revoked_tokens"
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(32), nullable=True, unique=True)
+    user_id = Column(Integer, nullable=False)
+    # Microseconds: a token issued in the same second, after the revocation, stays valid
+    revoked_at = Column(mysql.TIMESTAMP(fsp=6), nullable=False, server_default=func.now(6))
+    expires_at = Column(DateTime, nullable=False, index=True)
+
 class Category(Base):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True)
@@ -36,11 +55,22 @@ class Product(Base):
     name = Column(String(150), nullable=False)
     price = Column(Numeric(10, 2), nullable=False)  # DECIMAL(10,2) for accurate currency in DH
     quantity = Column(Integer, nullable=False)
-    sku = Column(String(100), nullable=True)
+    sku = Column(String(100), nullable=True, index=True)
     description = Column(String(500), nullable=True)
     category_id = Column(Integer, ForeignKey("categories.id"))
     supplier_id = Column(Integer, ForeignKey("suppliers.id"))
     image_url = Column(String(255), nullable=True)
+    reorder_point = Column(Integer, nullable=True)  # alert when quantity <= reorder_point
+    reorder_qty = Column(Integer, nullable=True)
+    # Part of quantity held in stock_levels; the rest has no location
+    located_quantity = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Keyset pagination sorts on (column, id)
+    __table_args__ = (
+        Index("ix_products_name_id", "name", "id"),
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_quantity_id", "quantity", "id"),
+    )
 
 class OrderStatus(str, enum.Enum):
     PENDING = "PENDING"
@@ -50,14 +80,34 @@ class OrderStatus(str, enum.Enum):
 class Order(Base):
     __tablename__ = "orders"
     id = Column(Integer, primary_key=True)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
-    quantity = Column(Integer, nullable=False)
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
     order_date = Column(Date)
-    
-    # Relationship to product
+
+    # Order lines, one per product
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan", order_by="OrderItem.id")
+
+    __table_args__ = (
+        Index("ix_orders_date_id", "order_date", "id"),
+        Index("ix_orders_status_date_id", "status", "order_date", "id"),
+    )
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    # Units already taken out of stock by POST /orders/fulfill
+    fulfilled_quantity = Column(Integer, nullable=False, default=0, server_default="0")
+
+    order = relationship("Order", back_populates="items")
     product = relationship("Product")
 
+    __table_args__ = (
+        Index("ix_order_items_order_id", "order_id", "id"),
+        Index("ix_order_items_product_order", "product_id", "order_id"),
+    )
+
 class StockType(str, enum.Enum):
     IN = "IN"
     OUT = "OUT"
@@ -69,6 +119,69 @@ class StockMovement(Base):
     type = Column(Enum(StockType), nullable=False)
     quantity = Column(Integer, nullable=False)
     movement_date = Column(TIMESTAMP, nullable=False, server_default=func.now())
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)
     
     # Relationship to product
     product = relationship("Product")
+
+    __table_args__ = (
+        Index("ix_stock_movements_date_id", "movement_date", "id"),
+        Index("ix_stock_movements_product_date_id", "product_id", "movement_date", "id"),
+        Index("ix_stock_movements_type_date_id", "type", "movement_date", "id"),
+    )
+
+class Location(Base):
+    __tablename__ = "locations"
+    id = Column(Integer, primary_key=True)
+    code = Column(String(50), nullable=False, unique=True)  # e.g. "A-03" for an aisle
+    name = Column(String(150), nullable=True)
+
+class StockLevel(Base):
+    """Quantity of a product at one location; products.quantity/located_quantity hold the totals."""
+    __tablename__ = "stock_levels"
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+    # The primary key answers "where is product X", this index "what is at location Y"
+    __table_args__ = (
+        Index("ix_stock_levels_location_product", "location_id", "product_id"),
+    )
+
+class StockTransfer(Base):
+    """Move between locations; the product total does not change, so no movement is written."""
+    __tablename__ = "stock_transfers"
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False, index=True)
+    from_location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)
+    to_location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)
+    quantity = Column(Integer, nullable=False)
+    transfer_date = Column(TIMESTAMP, nullable=False, server_default=func.now())
+
+class StockDailyRollup(Base):
+    """Daily IN/OUT totals per product, maintained by the stock movement writes."""
+    __tablename__ = "stock_daily_rollups"
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    category_id = Column(Integer, nullable=True)
+    quantity_in = Column(Integer, nullable=False, default=0)
+    quantity_out = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_stock_daily_rollups_product_day", "product_id", "day"),
+        Index("ix_stock_daily_rollups_category_day", "category_id", "day"),
+    )
+
+class StockSnapshot(Base):
+    """Per-product quantities captured at a point in time, anchor for as-of queries."""
+    __tablename__ = "stock_snapshots"
+    id = Column(Integer, primary_key=True)
+    taken_at = Column(DateTime, nullable=False, index=True)
+
+class StockSnapshotLine(Base):
+    __tablename__ = "stock_snapshot_lines"
+    snapshot_id = Column(Integer, ForeignKey("stock_snapshots.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    category_id = Column(Integer, nullable=True)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Numeric(10, 2), nullable=False)
@@ -0,0 +1,305 @@
+import bisect
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from models import StockMovement
+
+# Relative to the backend directory (not the working directory), so the API and
+# the archiving script started from elsewhere see the same archive
+STOCK_ARCHIVE_DIR = Path(__file__).resolve().parent / os.getenv("STOCK_ARCHIVE_DIR", "archives/stock_movements")
+
+COLUMNS = ("id", "product_id", "type", "quantity", "seconds", "location_id")
+# Missing from the months archived before locations existed; 0 stands for no location
+OPTIONAL_COLUMNS = ("location_id",)
+TYPES = ("IN", "OUT")
+# Unsigned array typecodes, narrowest first
+WIDTHS = [(code, array(code).itemsize) for code in ("B", "H", "I", "Q")]
+
+
+class ArchivedMovement(NamedTuple):
+    id: int
+    product_id: int
+    type: str
+    quantity: int
+    movement_date: datetime
+    location_id: Optional[int] = None
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def next_month(start: datetime) -> datetime:
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def _encode(values: List[int]) -> Tuple[int, array]:
+    """Frame-of-reference encoding: value - min, in the narrowest unsigned width that fits."""
+    base = min(values, default=0)
+    span = max(values, default=0) - base
+    for code, size in WIDTHS:
+        if span < 1 << (8 * size):
+            return base, array(code, [v - base for v in values])
+    raise ValueError("Valeur hors limites pour l'archive")
+
+
+class MonthArchive:
+    """One archived month: a manifest plus one memory-mapped file per column.
+
+    Rows are sorted by (movement_date, id) and ``seconds`` holds the offset
+    of movement_date from the start of the month, so a date range is found
+    by binary search on that column alone.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        manifest = json.loads((path / "manifest.json").read_text())
+        if manifest["byteorder"] != sys.byteorder:
+            raise ValueError(f"Archive {path.name} écrite sur une autre architecture")
+        self.start = datetime.fromisoformat(manifest["start"])
+        self.end = next_month(self.start)
+        self.rows = manifest["rows"]
+        self._columns = {}
+        for name in COLUMNS:
+            if name in OPTIONAL_COLUMNS and name not in manifest["columns"]:
+                continue
+            meta = manifest["columns"][name]
+            view = memoryview(array(meta["typecode"]))
+            if self.rows:
+                with open(path / f"{name}.col", "rb") as f:
+                    view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast(meta["typecode"])
+            self._columns[name] = (meta["base"], view)
+
+    def _index(self, moment: datetime, right: bool) -> int:
+        base, seconds = self._columns["seconds"]
+        offset = int((moment - self.start).total_seconds()) - base
+        if offset < 0:
+            return 0
+        return (bisect.bisect_right if right else bisect.bisect_left)(seconds, offset)
+
+    def row(self, i: int) -> ArchivedMovement:
+        v = {name: base + view[i] for name, (base, view) in self._columns.items()}
+        return ArchivedMovement(
+            v["id"], v["product_id"], TYPES[v["type"]], v["quantity"],
+            self.start + timedelta(seconds=v["seconds"]),
+            v.get("location_id") or None,
+        )
+
+    def iter_desc(self, since: Optional[datetime] = None, through: Optional[datetime] = None) -> Iterator[ArchivedMovement]:
+        """Rows with since <= movement_date <= through, newest first."""
+        lo = self._index(since, right=False) if since else 0
+        hi = self._index(through, right=True) if through else self.rows
+        for i in range(hi - 1, lo - 1, -1):
+            yield self.row(i)
+
+    def add_net(self, after: datetime, until: datetime, net: Dict[int, int]):
+        """Add IN - OUT per product for rows in (after, until] to ``net``."""
+        p_base, products = self._columns["product_id"]
+        t_base, types = self._columns["type"]
+        q_base, quantities = self._columns["quantity"]
+        for i in range(self._index(after, right=True), self._index(until, right=True)):
+            quantity = q_base + quantities[i]
+            if TYPES[t_base + types[i]] == "OUT":
+                quantity = -quantity
+            product_id = p_base + products[i]
+            net[product_id] = net.get(product_id, 0) + quantity
+
+
+def _version(path: Path) -> int:
+    return int(path.name.partition(".")[2] or 1)
+
+
+def month_dirs(root: Path) -> Dict[str, Path]:
+    """Directory of each archived month, oldest month first.
+
+    A month merged again later is written as "YYYY-MM.2", "YYYY-MM.3"...:
+    the highest version wins. Hidden directories are writes in progress.
+    """
+    latest: Dict[str, Path] = {}
+    for path in root.iterdir():
+        if path.name.startswith(".") or not (path / "manifest.json").exists():
+            continue
+        month = path.name.partition(".")[0]
+        if month not in latest or _version(path) > _version(latest[month]):
+            latest[month] = path
+    return dict(sorted(latest.items()))
+
+
+class MovementArchive:
+    """Read side of the archive: every month under ``root``, reloaded when it changes."""
+
+    def __init__(self, root: Path = STOCK_ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._months: Dict[str, MonthArchive] = {}
+        self._mtime = None
+
+    def months(self) -> List[MonthArchive]:
+        mtime = self.root.stat().st_mtime_ns if self.root.is_dir() else None
+        with self._lock:
+            if mtime != self._mtime:
+                paths = month_dirs(self.root).values() if mtime else []
+                # Months already mapped are kept; readers may still hold their views
+                self._months = {p.name: self._months.get(p.name) or MonthArchive(p) for p in paths}
+                self._mtime = mtime
+            return list(self._months.values())
+
+    def cutoff(self) -> Optional[datetime]:
+        """First instant still in the live table (None when nothing is archived)."""
+        months = self.months()
+        return months[-1].end if months else None
+
+    def iter_movements(
+        self,
+        before: Optional[Tuple[datetime, int]] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        movement_type: Optional[str] = None,
+        product_ids: Optional[Set[int]] = None,
+    ) -> Iterator[ArchivedMovement]:
+        """Archived movements newest first, strictly after the (movement_date, id) cursor ``before``.
+
+        ``date_to`` is exclusive, like the live ledger filter.
+        """
+        through = before[0] if before else None
+        for month in reversed(self.months()):
+            if date_from and month.end <= date_from:
+                break
+            if through and through < month.start:
+                continue
+            for mv in month.iter_desc(since=date_from, through=through):
+                if date_to and mv.movement_date >= date_to:
+                    continue
+                if before and (mv.movement_date, mv.id) >= before:
+                    continue
+                if movement_type and mv.type != movement_type:
+                    continue
+                if product_ids is not None and mv.product_id not in product_ids:
+                    continue
+                yield mv
+
+    def net_movements(self, after: datetime, until: datetime) -> Dict[int, int]:
+        """Net quantity per product for archived movements in (after, until]."""
+        net: Dict[int, int] = {}
+        for month in self.months():
+            if month.end > after and month.start <= until:
+                month.add_net(after, until, net)
+        return net
+
+
+movement_archive = MovementArchive()
+
+
+def _write_month(db: Session, start: datetime, target: Path, archived: Optional[MonthArchive] = None) -> List[int]:
+    """Write the month's live rows, merged with the ``archived`` ones, to ``target``.
+
+    Returns the ids of the live rows written, the only ones the caller may delete.
+    """
+    rows = [archived.row(i) for i in range(archived.rows)] if archived else []
+    # Whole rows, not ids: a deleted id can be handed out again by the database
+    offset = lambda mv: int((mv.movement_date - start).total_seconds())
+    identity = lambda mv: (mv.id, mv.product_id, mv.type, mv.quantity, offset(mv), mv.location_id)
+    known = {identity(mv) for mv in rows}
+    live = (
+        db.query(
+            StockMovement.id, StockMovement.product_id, StockMovement.type, StockMovement.quantity,
+            StockMovement.movement_date, StockMovement.location_id,
+        )
+        .filter(StockMovement.movement_date >= start, StockMovement.movement_date < next_month(start))
+        .yield_per(10000)
+    )
+    written = []
+    for movement_id, product_id, mv_type, quantity, moved_at, location_id in live:
+        written.append(movement_id)
+        mv_type = mv_type.value if hasattr(mv_type, "value") else str(mv_type)
+        mv = ArchivedMovement(movement_id, product_id, mv_type, quantity, moved_at, location_id)
+        if identity(mv) not in known:
+            rows.append(mv)
+
+    columns: Dict[str, List[int]] = {name: [] for name in COLUMNS}
+    for mv in sorted(rows, key=lambda mv: (offset(mv), mv.id)):
+        columns["id"].append(mv.id)
+        columns["product_id"].append(mv.product_id)
+        columns["type"].append(TYPES.index(mv.type))
+        columns["quantity"].append(mv.quantity)
+        columns["seconds"].append(offset(mv))
+        columns["location_id"].append(mv.location_id or 0)
+
+    manifest = {
+        "start": start.isoformat(),
+        "rows": len(columns["id"]),
+        "byteorder": sys.byteorder,
+        "archived_at": datetime.now().isoformat(timespec="seconds"),
+        "columns": {},
+    }
+    target.mkdir(parents=True)
+    for name, values in columns.items():
+        base, encoded = _encode(values)
+        with open(target / f"{name}.col", "wb") as f:
+            encoded.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        manifest["columns"][name] = {"typecode": encoded.typecode, "base": base}
+    (target / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return written
+
+
+def archive_months(db: Session, cutoff: datetime, root: Path = STOCK_ARCHIVE_DIR) -> List[dict]:
+    """Move every whole month of movements before ``cutoff`` from the table to ``root``.
+
+    Each month is written to a hidden directory and renamed into place
+    before its rows are deleted, so readers see either the live rows or the
+    archive; only the rows written are deleted. Rows found in a month that
+    is already archived (inserted or backdated since, or left by a run
+    interrupted after the rename) are merged into a new version of it.
+    """
+    oldest = (
+        db.query(StockMovement.movement_date)
+        .filter(StockMovement.movement_date < cutoff)
+        .order_by(StockMovement.movement_date)
+        .first()
+    )
+    if oldest is None:
+        return []
+
+    root.mkdir(parents=True, exist_ok=True)
+    report = []
+    start = month_start(oldest[0])
+    while start < cutoff:
+        end = next_month(start)
+        name = start.strftime("%Y-%m")
+        current = month_dirs(root).get(name)
+        has_live = db.query(StockMovement.id).filter(
+            StockMovement.movement_date >= start, StockMovement.movement_date < end
+        ).first()
+        if current is None or has_live:
+            target = root / (name if current is None else f"{name}.{_version(current) + 1}")
+            tmp = root / f".{target.name}.tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            written = _write_month(db, start, tmp, MonthArchive(current) if current else None)
+            tmp.rename(target)
+            if current:
+                # Readers still holding the old month keep their mappings
+                shutil.rmtree(current)
+            deleted = 0
+            for i in range(0, len(written), 1000):
+                deleted += (
+                    db.query(StockMovement)
+                    .filter(StockMovement.id.in_(written[i:i + 1000]))
+                    .delete(synchronize_session=False)
+                )
+            db.commit()
+            if written:
+                report.append({"month": target.name, "archived": len(written), "deleted": deleted})
+        start = end
+    return report
@@ -0,0 +1,153 @@
+from datetime import date, datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from models import Order, OrderItem, OrderStatus, Product, StockLevel, StockMovement
+from stock_rollups import record_rollup
+from stock_service import StockChange, apply_delta, movement_event
+
+
+class Allocation(NamedTuple):
+    order_id: int
+    item_id: int
+    product_id: int
+    ordered: int  # quantity still to deliver before this run
+    allocated: int
+
+    @property
+    def remaining(self) -> int:
+        return self.ordered - self.allocated
+
+
+def allocate_fifo(items: List[tuple], available: Dict[int, int], partial: bool = True) -> List[Allocation]:
+    """Share each product's available stock among order lines, oldest order first.
+
+    ``items`` are (order_id, item_id, product_id, remaining) tuples already
+    sorted by (order_date, order_id, item_id); a single pass keeps a running
+    stock per product. Without ``partial`` an order gets all its lines or
+    nothing, and the stock it could not use stays for the following orders.
+    """
+    left = {product_id: max(quantity or 0, 0) for product_id, quantity in available.items()}
+    allocations = []
+    for order_id, lines in groupby(items, key=itemgetter(0)):
+        lines = list(lines)
+        if not partial:
+            needed: Dict[int, int] = {}
+            for _, _, product_id, remaining in lines:
+                needed[product_id] = needed.get(product_id, 0) + remaining
+            whole = all(left.get(product_id, 0) >= quantity for product_id, quantity in needed.items())
+        for _, item_id, product_id, remaining in lines:
+            stock = left.get(product_id, 0)
+            allocated = min(remaining, stock) if partial else (remaining if whole else 0)
+            left[product_id] = stock - allocated
+            allocations.append(Allocation(order_id, item_id, product_id, remaining, allocated))
+    return allocations
+
+
+def fulfill_orders(
+    db: Session,
+    order_ids: Optional[List[int]] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    product_id: Optional[int] = None,
+    location_id: Optional[int] = None,
+    allow_partial: bool = True,
+):
+    """Allocate stock to the lines of the selected PENDING orders in FIFO order and deduct it.
+
+    Everything happens in the caller's transaction: one conditional stock
+    update and one rollup per product, the OUT movements as one insert, the
+    line updates as one executemany and one UPDATE for the orders now
+    complete. Returns (allocations, completed order ids, changes, movement
+    events); the caller commits and publishes.
+    """
+    query = (
+        db.query(OrderItem.order_id, OrderItem.id, OrderItem.product_id, OrderItem.quantity, OrderItem.fulfilled_quantity)
+        .join(Order, Order.id == OrderItem.order_id)
+        .filter(Order.status == OrderStatus.PENDING, OrderItem.quantity > OrderItem.fulfilled_quantity)
+    )
+    if order_ids is not None:
+        query = query.filter(Order.id.in_(order_ids))
+    if date_from:
+        query = query.filter(Order.order_date >= date_from)
+    if date_to:
+        query = query.filter(Order.order_date <= date_to)
+    if product_id is not None:
+        query = query.filter(OrderItem.product_id == product_id)
+    # Locked so two fulfillment runs cannot allocate the same lines
+    items = query.order_by(Order.order_date, Order.id, OrderItem.id).with_for_update().all()
+    if not items:
+        return [], set(), [], []
+
+    # Stock that can be taken: the given location's level, else the unlocated
+    # stock; the rows stay locked until the deductions below
+    product_ids = sorted({item.product_id for item in items})
+    if location_id is not None:
+        available = dict(
+            db.query(StockLevel.product_id, StockLevel.quantity)
+            .filter(StockLevel.location_id == location_id, StockLevel.product_id.in_(product_ids))
+            .with_for_update()
+            .all()
+        )
+    else:
+        available = dict(
+            db.query(Product.id, Product.quantity - Product.located_quantity)
+            .filter(Product.id.in_(product_ids))
+            .with_for_update()
+            .all()
+        )
+
+    allocations = allocate_fifo(
+        [(item.order_id, item.id, item.product_id, item.quantity - item.fulfilled_quantity) for item in items],
+        available, partial=allow_partial,
+    )
+    delivered = {item.id: item.fulfilled_quantity for item in items}
+
+    totals: Dict[int, int] = {}
+    for a in allocations:
+        if a.allocated:
+            totals[a.product_id] = totals.get(a.product_id, 0) + a.allocated
+
+    # Stock rows in id order so concurrent writers lock them in the same order
+    changes: List[StockChange] = []
+    for pid in sorted(totals):
+        change = apply_delta(db, pid, -totals[pid], location_id=location_id)
+        record_rollup(db, pid, change.after.category_id, date.today(), quantity_out=totals[pid])
+        changes.append(change)
+
+    filled = [a for a in allocations if a.allocated]
+    now = datetime.now()
+    movements = [
+        StockMovement(product_id=a.product_id, type="OUT", quantity=a.allocated, location_id=location_id, movement_date=now)
+        for a in filled
+    ]
+    db.add_all(movements)
+    completed = set()
+    if filled:
+        # ORM bulk UPDATE by primary key: a single executemany
+        db.execute(update(OrderItem), [
+            {"id": a.item_id, "fulfilled_quantity": delivered[a.item_id] + a.allocated}
+            for a in filled
+        ])
+        # Orders with no line left to deliver are complete
+        touched = {a.order_id for a in filled}
+        still_open = {
+            order_id for order_id, in
+            db.query(OrderItem.order_id)
+            .filter(OrderItem.order_id.in_(touched), OrderItem.quantity > OrderItem.fulfilled_quantity)
+            .distinct()
+        }
+        completed = touched - still_open
+        if completed:
+            db.execute(
+                update(Order)
+                .where(Order.id.in_(completed))
+                .values(status=OrderStatus.COMPLETED)
+                .execution_options(synchronize_session=False)
+            )
+    db.flush()
+    return allocations, completed, changes, [movement_event(mv) for mv in movements]
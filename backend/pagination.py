@@ -0,0 +1,38 @@
+import base64
+import json
+from typing import Any, List, Sequence
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last returned row as an opaque cursor."""
+    raw = json.dumps([str(v) if v is not None else None for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Decode a cursor produced by encode_cursor, casting each value with types."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [t(v) for t, v in zip(types, values)]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def keyset_filter(columns: Sequence[Any], values: Sequence[Any], descending: bool = False):
+    """Build the "row comes after the cursor" condition for a keyset page.
+
+    The comparison is expanded into OR/AND terms instead of a row constructor
+    so that MySQL can still use a composite index on the sort columns.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, after))
+    return or_(*clauses)
@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+from fastapi import HTTPException
+
+# bcrypt cost: each +1 doubles the time of a hash (12 ~ 250 ms on one core)
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+# Threads hashing at once (bcrypt releases the GIL, so up to one per core helps)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hashes queued beyond the running ones before logins are refused with a 503
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+_LEGACY_HASH = re.compile(r"^[0-9a-f]{64}$")
+
+
+def legacy_hash(password: str) -> str:
+    """The former scheme: unsalted SHA-256 hex digest, only kept to verify old accounts."""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+def hash_password(password: str, rounds: int = PASSWORD_BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+# Checked against when the account does not exist
+_DUMMY_HASH = hash_password("dummy").encode()
+
+
+def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+    """(matches, needs_rehash) for a stored bcrypt or legacy SHA-256 hash.
+
+    needs_rehash is set for legacy hashes and for bcrypt hashes made with
+    another cost than PASSWORD_BCRYPT_ROUNDS.
+    """
+    if not stored:
+        # Same work as a real check, so unknown emails cannot be told apart by timing
+        bcrypt.checkpw(password.encode(), _DUMMY_HASH)
+        return False, False
+    if _LEGACY_HASH.match(stored):
+        return hmac.compare_digest(legacy_hash(password), stored), True
+    try:
+        matches = bcrypt.checkpw(password.encode(), stored.encode())
+    except ValueError:
+        return False, False
+    return matches, matches and bcrypt_rounds(stored) != PASSWORD_BCRYPT_ROUNDS
+
+
+def bcrypt_rounds(stored: str) -> Optional[int]:
+    # $2b$12$<salt+hash>
+    parts = stored.split("$")
+    return int(parts[2]) if len(parts) > 3 and parts[2].isdigit() else None
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded pool of threads, off the request threads.
+
+    At most ``workers`` hashes run at once and ``max_pending`` wait; beyond
+    that new requests get a 503 at once rather than piling up behind a
+    burst of logins. Async callers await the result without blocking the
+    event loop; sync routes wait on it from their own worker thread.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_QUEUE):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._workers = workers
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._in_flight >= self._workers + self._max_pending:
+                raise HTTPException(status_code=503, detail="Serveur occupé, réessayez dans un instant")
+            self._in_flight += 1
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(hash_password, password))
+
+    async def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+        return await asyncio.wrap_future(self._submit(verify_password, password, stored))
+
+    def hash_sync(self, password: str) -> str:
+        return self._submit(hash_password, password).result()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self._workers,
+                "in_flight": self._in_flight,
+                "max_pending": self._max_pending,
+                "rounds": PASSWORD_BCRYPT_ROUNDS,
+            }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Recent checkout waits kept for the percentiles
+WAIT_SAMPLES = 2048
+
+
+class PoolMetrics:
+    """Checkout wait, occupancy and connection churn of the engine's pool.
+
+    Counts come from the pool events; the wait is timed by
+    MeasuredQueuePool around the checkout itself, so it includes the time
+    spent queueing for a free connection and opening an overflow one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._started = time.time()
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timed = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._connects = 0
+        self._closes = 0
+        self._invalidations = 0
+
+    def attach(self, engine):
+        # An AsyncEngine emits the pool events on its sync_engine
+        engine = getattr(engine, "sync_engine", engine)
+        self._pool = engine.pool
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "close", self._on_close)
+        event.listen(engine, "close_detached", self._on_close)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_invalidate)
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self._waits.append(seconds)
+            self._timed += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+            if timed_out:
+                self._timeouts += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self._checkouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._connects += 1
+
+    def _on_close(self, dbapi_connection, *args):
+        with self._lock:
+            self._closes += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self._invalidations += 1
+
+    def snapshot(self) -> dict:
+        pool = self._pool
+        with self._lock:
+            waits = sorted(self._waits)
+            minutes = max(time.time() - self._started, 1) / 60
+            stats = {
+                "checkouts": self._checkouts,
+                "checkout_wait_ms": {
+                    "mean": round(self._wait_total / self._timed * 1000, 3) if self._timed else None,
+                    "p50": round(waits[len(waits) // 2] * 1000, 3) if waits else None,
+                    "p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3) if waits else None,
+                    "max": round(self._wait_max * 1000, 3) if waits else None,
+                },
+                "timeouts": self._timeouts,
+                "connects": self._connects,
+                "closes": self._closes,
+                "invalidations": self._invalidations,
+                "connects_per_minute": round(self._connects / minutes, 2),
+                "uptime_seconds": int(time.time() - self._started),
+            }
+        if isinstance(pool, QueuePool):
+            stats["pool"] = {
+                "class": type(pool).__name__,
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+                "recycle": pool._recycle,
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # Connections opened beyond pool_size (negative while the pool is not full)
+                "overflow": pool.overflow(),
+            }
+        else:
+            stats["pool"] = {"class": type(pool).__name__ if pool else None}
+        return stats
+
+
+pool_metrics = PoolMetrics()
+# Pool of the async engine, when DB_ASYNC is on
+async_pool_metrics = PoolMetrics()
+
+
+class _MeasuredCheckout:
+    """Times each checkout of a QueuePool into ``metrics``."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class MeasuredQueuePool(_MeasuredCheckout, QueuePool):
+    """QueuePool timing each checkout for pool_metrics."""
+
+    metrics = pool_metrics
+
+
+class MeasuredAsyncQueuePool(_MeasuredCheckout, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
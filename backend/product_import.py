@@ -0,0 +1,215 @@
+import csv
+import io
+import json
+import time
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from models import Category, Product, Supplier
+from schemas import ProductCreate
+from search_index import product_index
+from stats_engine import product_state, stock_stats
+from stock_alerts import reorder_level, stock_alerts
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(filename: Optional[str]) -> str:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def iter_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, raw row) pairs from a binary CSV or NDJSON stream.
+
+    Rows are read one at a time so memory does not grow with the file size.
+    Blank CSV cells are dropped so they fall back to the schema defaults.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "ndjson":
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, e
+    else:
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {
+                k.strip(): v.strip() for k, v in row.items()
+                if k and v is not None and v.strip() != ""
+            }
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.errors: List[Dict] = []
+        self.failed = 0
+        # Lines superseded by a later line with the same SKU in the same chunk
+        self.skipped: List[Dict] = []
+        self.skipped_count = 0
+        self.started = time.perf_counter()
+
+    def error(self, line: int, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": message})
+
+    def skip(self, line: int, sku: str, replaced_by: int):
+        self.skipped_count += 1
+        if len(self.skipped) < MAX_REPORTED_ERRORS:
+            self.skipped.append({"line": line, "sku": sku, "replaced_by": replaced_by})
+
+    def as_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "skipped": self.skipped_count,
+            "skipped_lines": self.skipped,
+            "errors": self.errors,
+            "errors_truncated": max(0, self.failed - len(self.errors)),
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+def _validate(line_no: int, raw, report: ImportReport, category_ids: set, supplier_ids: set) -> Optional[dict]:
+    if isinstance(raw, Exception):
+        report.error(line_no, f"JSON invalide: {raw}")
+        return None
+    if not isinstance(raw, dict):
+        report.error(line_no, "Ligne invalide: objet attendu")
+        return None
+    try:
+        product = ProductCreate(**raw)
+    except ValidationError as e:
+        report.error(line_no, [
+            {"field": ".".join(str(p) for p in err["loc"]), "message": err["msg"]}
+            for err in e.errors()
+        ])
+        return None
+    if product.category_id is not None and product.category_id not in category_ids:
+        report.error(line_no, "Catégorie non trouvée")
+        return None
+    if product.supplier_id is not None and product.supplier_id not in supplier_ids:
+        report.error(line_no, "Fournisseur non trouvé")
+        return None
+    return product.model_dump(exclude_unset=True)
+
+
+def _insert_new(db: Session, rows: List[dict]) -> List[int]:
+    """Insert new products and return their ids.
+
+    Where the database returns the ids of a multi-row INSERT (SQLite,
+    MariaDB) the chunk is one statement; MySQL has no RETURNING, so there
+    each row is inserted on its own to learn its id. Finding the ids again
+    by SKU is not an option: SKUs are not unique, another request may be
+    inserting the same ones.
+    """
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        return list(db.scalars(insert(Product).returning(Product.id, sort_by_parameter_order=True), rows))
+    return [db.execute(insert(Product).values(**values)).inserted_primary_key[0] for values in rows]
+
+
+def _flush(db: Session, chunk: List[Tuple[int, dict]], report: ImportReport):
+    # Last occurrence of a SKU in the chunk wins; the earlier ones are reported as skipped
+    by_sku: Dict[str, Tuple[int, dict]] = {}
+    inserts: List[dict] = []
+    written: List[int] = []
+    for line_no, values in chunk:
+        sku = values.get("sku")
+        if sku:
+            if sku in by_sku:
+                report.skip(by_sku[sku][0], sku, line_no)
+            by_sku[sku] = (line_no, values)
+        else:
+            inserts.append(values)
+            written.append(line_no)
+    written.extend(line_no for line_no, _ in by_sku.values())
+
+    existing = {}
+    before = {}
+    if by_sku:
+        for row in (
+            db.query(Product.sku, Product.id, Product.category_id, Product.quantity, Product.price)
+            .filter(Product.sku.in_(list(by_sku)))
+            .order_by(Product.id.desc())
+        ):
+            existing[row.sku] = row.id
+            before[row.id] = product_state(row)
+
+    updates = []
+    for sku, (_, values) in by_sku.items():
+        if sku in existing:
+            updates.append({**values, "id": existing[sku]})
+        else:
+            inserts.append(values)
+
+    # New rows need every column; fill the ones the source row left out
+    defaults = ProductCreate.model_fields
+    inserts = [
+        {name: values.get(name, field.default) for name, field in defaults.items()}
+        for values in inserts
+    ]
+
+    try:
+        inserted_ids = _insert_new(db, inserts) if inserts else []
+        if updates:
+            db.execute(update(Product), updates)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for line_no in written:
+            report.error(line_no, f"Erreur base de données: {e.__class__.__name__}")
+        return
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+
+    changed_ids = inserted_ids + [values["id"] for values in updates]
+    for row in db.query(
+        Product.id, Product.name, Product.sku, Product.description,
+        Product.category_id, Product.quantity, Product.price,
+        Product.reorder_point, Product.reorder_qty,
+    ).filter(Product.id.in_(changed_ids)):
+        product_index.upsert(row.id, row.name, row.sku, row.description)
+        stock_stats.apply(before.get(row.id), product_state(row))
+        stock_alerts.observe(row.id, reorder_level(row))
+
+
+def import_products(db: Session, rows: Iterable[Tuple[int, object]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Validate and upsert products on SKU, committing once per chunk.
+
+    Rows without a SKU are always inserted. Each chunk is written with one
+    multi-row INSERT and one executemany UPDATE keyed on the primary key;
+    rows = inserted + updated + failed + skipped in the report.
+    """
+    report = ImportReport()
+    category_ids = {c for (c,) in db.query(Category.id)}
+    supplier_ids = {s for (s,) in db.query(Supplier.id)}
+
+    chunk: List[Tuple[int, dict]] = []
+    for line_no, raw in rows:
+        report.rows += 1
+        values = _validate(line_no, raw, report, category_ids, supplier_ids)
+        if values is None:
+            continue
+        chunk.append((line_no, values))
+        if len(chunk) >= chunk_size:
+            _flush(db, chunk, report)
+            chunk = []
+    if chunk:
+        _flush(db, chunk, report)
+    return report.as_dict()
@@ -0,0 +1,178 @@
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+
+from database import AsyncReplicaSessionLocals, ReplicaSessionLocals, replica_engines
+
+# A replica further behind than this (seconds) is skipped until it catches up
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+# How often the replication lag is measured
+DB_REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", "5"))
+# After a write, the same reader is served by the primary for this long
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+# Carries the end of the pin (epoch seconds) with the client, to every worker
+READ_PIN_COOKIE = "read_primary_until"
+
+
+def replication_lag(connection) -> Optional[float]:
+    """Seconds the server behind ``connection`` lags its source; None if replication is broken."""
+    if connection.dialect.name != "mysql":
+        # A plain second database (e.g. a local stand-in) has no replication to lag
+        return 0.0
+    for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"), ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+        try:
+            row = connection.execute(text(statement)).mappings().first()
+        except DBAPIError:
+            # SHOW REPLICA STATUS needs MySQL 8.0.22+
+            continue
+        if row is None:
+            # Not set up as a replica: a standalone copy, never behind
+            return 0.0
+        lag = row.get(column)
+        return float(lag) if lag is not None else None
+    return None
+
+
+class Replica:
+    def __init__(self, name: str, engine, session_factory, async_session_factory=None):
+        self.name = name
+        self.engine = engine
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        # Unknown until the first check
+        self.lag: Optional[float] = None
+
+
+class ReplicaRouter:
+    """Picks where a read-only request runs: a replica, or None for the primary.
+
+    Reads go round-robin to the replicas within ``max_lag`` seconds of the
+    primary. The primary serves them instead when every replica lags (or
+    cannot be reached), and for ``pin_seconds`` after the same reader's
+    last write, so that it sees its own changes. The pin travels with the
+    client in the ``READ_PIN_COOKIE`` cookie, so that a read landing on
+    another worker honours it too; this process also keeps its own pins
+    for the clients that do not send cookies back.
+    """
+
+    def __init__(
+        self,
+        replicas: List[Replica],
+        max_lag: float = DB_REPLICA_MAX_LAG,
+        check_seconds: float = DB_REPLICA_CHECK_SECONDS,
+        pin_seconds: float = READ_YOUR_WRITES_SECONDS,
+        probe: Callable = replication_lag,
+    ):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_seconds = check_seconds
+        self.pin_seconds = pin_seconds
+        self.probe = probe
+        # Guards _pins, _next and _counts: requests pin and pick from several threads
+        self._lock = threading.Lock()
+        self._pins: Dict[str, float] = {}
+        self._next = itertools.count()
+        self._checked_at: Optional[float] = None
+        self._check_lock = threading.Lock()
+        self._counts = {"replica": 0, "pinned": 0, "lagging": 0}
+
+    def pin(self, reader: str):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._pins) > 10000:
+                self._pins = {key: until for key, until in self._pins.items() if until > now}
+            self._pins[reader] = now + self.pin_seconds
+
+    def is_pinned(self, reader: str) -> bool:
+        with self._lock:
+            return self._pins.get(reader, 0) > time.monotonic()
+
+    def pin_until(self) -> float:
+        """Wall-clock end of a pin starting now, for the cookie."""
+        return time.time() + self.pin_seconds
+
+    def cookie_pinned(self, value: Optional[str]) -> bool:
+        """Whether a ``READ_PIN_COOKIE`` value still pins its reader to the primary."""
+        try:
+            until = float(value)
+        except (TypeError, ValueError):
+            return False
+        now = time.time()
+        # A pin is never longer than pin_seconds, whatever the client sends
+        return now < until <= now + self.pin_seconds + 1
+
+    def check_due(self) -> bool:
+        return self._checked_at is None or time.monotonic() - self._checked_at > self.check_seconds
+
+    def check_lag(self):
+        """Measure every replica's lag; a single request pays for it while the others use the last values."""
+        if not self._check_lock.acquire(blocking=self._checked_at is None):
+            return
+        try:
+            for replica in self.replicas:
+                try:
+                    with replica.engine.connect() as connection:
+                        lag = self.probe(connection)
+                except SQLAlchemyError as e:
+                    print(f"Replica {replica.name} unreachable: {e}")
+                    lag = None
+                if lag is None or lag > self.max_lag:
+                    if replica.lag is not None and replica.lag <= self.max_lag:
+                        print(f"Replica {replica.name} set aside (lag: {lag})")
+                replica.lag = lag
+            self._checked_at = time.monotonic()
+        finally:
+            self._check_lock.release()
+
+    def pick(self, reader: str, pinned: bool = False) -> Optional[Replica]:
+        """Replica for this read, or None for the primary (lag is not re-measured here).
+
+        ``pinned`` is True when the request itself carries a live pin.
+        """
+        if not self.replicas:
+            return None
+        healthy = [r for r in self.replicas if r.lag is not None and r.lag <= self.max_lag]
+        with self._lock:
+            if pinned or self._pins.get(reader, 0) > time.monotonic():
+                self._counts["pinned"] += 1
+                return None
+            if not healthy:
+                self._counts["lagging"] += 1
+                return None
+            self._counts["replica"] += 1
+            return healthy[next(self._next) % len(healthy)]
+
+    def session_factory(self, reader: str, pinned: bool = False):
+        if self.replicas and self.check_due():
+            self.check_lag()
+        replica = self.pick(reader, pinned)
+        return replica.session_factory if replica else None
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            pinned_readers = sum(1 for until in self._pins.values() if until > now)
+            reads = dict(self._counts)
+        return {
+            "replicas": [{"name": r.name, "lag_seconds": r.lag, "healthy": r.lag is not None and r.lag <= self.max_lag} for r in self.replicas],
+            "max_lag_seconds": self.max_lag,
+            "read_your_writes_seconds": self.pin_seconds,
+            "pinned_readers": pinned_readers,
+            "reads": reads,
+        }
+
+
+replica_router = ReplicaRouter([
+    Replica(
+        engine.url.render_as_string(hide_password=True),
+        engine,
+        session_factory,
+        AsyncReplicaSessionLocals[i] if AsyncReplicaSessionLocals else None,
+    )
+    for i, (engine, session_factory) in enumerate(zip(replica_engines, ReplicaSessionLocals))
+])
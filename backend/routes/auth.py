@@ -1,10 +1,17 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from pydantic import BaseModel
 from database import SessionLocal
 from models import User
-from tools.hash_password import hash_password
+from auth_tokens import (
+    ACCESS_TOKEN_MINUTES, TokenUser, create_access_token, create_refresh_token,
+    revocations, revoke_refresh_token, rotate_refresh_token,
+)
+from dependencies import get_db, get_current_user
+from passwords import password_hasher
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -12,37 +19,99 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
-def get_db():
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+def issue_tokens(db: Session, user: User) -> dict:
+    """Access + refresh token pair for ``user``; commits the refresh token."""
+    access_token = create_access_token(user)
+    refresh_token = create_refresh_token(db, user.id)
+    db.commit()
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_MINUTES * 60,
+    }
+
+def find_user(email: str) -> Optional[User]:
     db = SessionLocal()
     try:
-        yield db
+        user = db.query(User).filter(User.email == email).first()
+        if user:
+            db.expunge(user)
+        return user
     finally:
         db.close()
 
-def verify_password(plain_password, hashed_password):
-    return hash_password(plain_password) == hashed_password
+def finish_login(user: User, new_hash: Optional[str]) -> dict:
+    """Tokens for ``user``, saving ``new_hash`` first when the stored one was outdated.
+
+    The upgrade only replaces the hash that was verified: a password changed
+    meanwhile (or a concurrent login's upgrade) is left alone.
+    """
+    db = SessionLocal()
+    try:
+        if new_hash:
+            db.query(User).filter(User.id == user.id, User.password == user.password).update(
+                {User.password: new_hash}, synchronize_session=False
+            )
+        return issue_tokens(db, user)
+    finally:
+        db.close()
 
 @router.post("/login")
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest):
+    # bcrypt runs on the password hashing pool and the queries on the
+    # threadpool: the event loop is never blocked by a login
     try:
-        user = db.query(User).filter(User.email == request.email).first()
-        if not user or not verify_password(request.password, user.password):
+        user = await run_in_threadpool(find_user, request.email)
+        matches, needs_rehash = await password_hasher.verify(request.password, user.password if user else None)
+        if not user or not matches:
             raise HTTPException(status_code=401, detail="Email ou mot de passe invalide")
-        
+
+        # Legacy SHA-256 or outdated cost: upgrade while the password is at hand
+        new_hash = await password_hasher.hash(request.password) if needs_rehash else None
+
         # Handle role serialization
         role_value = user.role.value if hasattr(user.role, 'value') else str(user.role)
-        
+
         return {
             "user": {
                 "id": user.id,
                 "name": user.name,
                 "email": user.email,
                 "role": role_value
-            }
+            },
+            **await run_in_threadpool(finish_login, user, new_hash),
         }
+    except HTTPException:
+        raise
     except SQLAlchemyError as e:
         print(f"Database error: {e}")
         raise HTTPException(status_code=500, detail="Database connection error")
     except Exception as e:
         print(f"Login error: {e}")
         raise HTTPException(status_code=500, detail="Server error")
+
+@router.post("/refresh")
+def refresh(request: RefreshRequest, db: Session = Depends(get_db)):
+    """Trade a refresh token for a new pair; the old refresh token stops working."""
+    user_id = rotate_refresh_token(db, request.refresh_token)
+    # The role may have changed since the last token was issued
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        db.rollback()
+        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    return issue_tokens(db, user)
+
+@router.post("/logout")
+def logout(request: LogoutRequest, db: Session = Depends(get_db), current_user: TokenUser = Depends(get_current_user)):
+    revocations.revoke_token(db, current_user)
+    if request.refresh_token:
+        revoke_refresh_token(db, request.refresh_token)
+    db.commit()
+    return {"detail": "Déconnecté"}
@@ -1,34 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-from database import SessionLocal
-from models import Category, Product
+from dependencies import get_db
+from models import Category
 from schemas import CategoryCreate, CategoryUpdate
+from stats_engine import stock_stats
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/")
 def list_categories(db: Session = Depends(get_db)):
-    categories = db.query(Category).all()
+    # Totals come from the maintained per-category counters (one grouped
+    # aggregate when they are cold), never from one product query per category
+    stock_stats.ensure_loaded(db)
     result = []
-    for cat in categories:
-        products = db.query(Product).filter(Product.category_id == cat.id).all()
-        total_products = len(products)
-        total_quantity = sum(p.quantity for p in products)
-        total_value = sum(p.price * p.quantity for p in products)
+    for cat in db.query(Category).all():
+        total_products, total_quantity, total_value = stock_stats.category(cat.id)
         result.append({
             "id": cat.id,
             "name": cat.name,
             "total_products": total_products,
             "total_quantity": total_quantity,
-            "total_value": total_value
+            "total_value": float(total_value)
         })
     return result
 
@@ -58,4 +51,6 @@ def delete_category(category_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Catégorie non trouvée")
     db.delete(cat)
     db.commit()
+    # Its products are detached by the database; recount on next read
+    stock_stats.invalidate()
     return {"detail": "Catégorie supprimée"}
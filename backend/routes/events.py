@@ -0,0 +1,94 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from auth_tokens import TokenUser
+from dependencies import get_stream_user, role_dependency
+from event_bus import TOPICS, event_bus
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+KEEPALIVE_SECONDS = 15
+
+
+def _format(event) -> str:
+    payload = {"seq": event.seq, "type": event.type, "data": event.data, "ts": event.ts}
+    data = json.dumps(jsonable_encoder(payload), ensure_ascii=False)
+    return f"id: {event_bus.event_id(event)}\nevent: {event.topic}\ndata: {data}\n\n"
+
+
+def _reset(reason: str) -> str:
+    # The client missed events it cannot get back: reload the lists, then apply events.
+    # The id moves the browser's Last-Event-ID to the present for its next reconnect.
+    event_id = f"{event_bus.epoch}-{event_bus.metrics()['last_seq']}"
+    return f"id: {event_id}\nevent: reset\ndata: {json.dumps({'reason': reason})}\n\n"
+
+
+@router.get("/")
+async def stream_events(
+    request: Request,
+    topics: str = ",".join(TOPICS),
+    since: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None),
+    user: TokenUser = Depends(get_stream_user),
+):
+    """Server-sent events for the given topics (comma separated).
+
+    ``since`` (or the Last-Event-ID header the browser sends on reconnect)
+    resumes after that event id; without it only new events are sent.
+    EventSource cannot set headers: the access token may be passed as
+    ?access_token=. It is checked when the stream opens.
+    """
+    wanted = {t.strip() for t in topics.split(",") if t.strip()}
+    unknown = wanted - set(TOPICS)
+    if unknown or not wanted:
+        raise HTTPException(status_code=400, detail=f"Sujets invalides: {', '.join(sorted(unknown)) or topics}")
+    resume_from = last_event_id or since
+
+    async def body():
+        subscriber = event_bus.subscribe(wanted)
+        try:
+            yield f"retry: 3000\nevent: hello\ndata: {json.dumps({'epoch': event_bus.epoch, 'topics': sorted(wanted)})}\n\n"
+            last_seq = 0
+            if resume_from:
+                seq = event_bus.parse_id(resume_from)
+                backlog, complete = event_bus.since(seq or 0, wanted)
+                if seq is None or not complete:
+                    yield _reset("historique indisponible")
+                else:
+                    for event in backlog:
+                        yield _format(event)
+                    last_seq = backlog[-1].seq if backlog else seq
+
+            while True:
+                if subscriber.overflowed and subscriber.queue.empty():
+                    yield _reset("client trop lent")
+                    return
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    continue
+                if event.seq <= last_seq:
+                    continue  # already sent from the backlog
+                last_seq = event.seq
+                yield _format(event)
+        finally:
+            event_bus.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/stats")
+def event_stats(user: TokenUser = Depends(role_dependency("ADMIN"))):
+    return event_bus.metrics()
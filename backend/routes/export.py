@@ -0,0 +1,183 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Iterable, Iterator, List, Literal, Optional, Sequence
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from database import SessionLocal
+from models import Category, Order, OrderItem, Product, StockMovement
+from movement_archive import movement_archive
+from routes.orders import OrderStatusFilter, filter_orders
+from routes.products import filter_products
+from routes.stock import archive_product_ids, filter_movements, movement_window
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+# Rows fetched per round trip from the server-side cursor, and per chunk sent
+EXPORT_BATCH_SIZE = 1000
+
+PRODUCT_FIELDS = ["id", "name", "sku", "description", "price", "quantity", "category_id", "category_name", "supplier_id", "image_url", "reorder_point", "reorder_qty"]
+MOVEMENT_FIELDS = ["id", "product_id", "product_name", "sku", "type", "quantity", "movement_date", "location_id"]
+# One row per order line
+ORDER_FIELDS = ["id", "item_id", "product_id", "product_name", "quantity", "fulfilled_quantity", "status", "order_date"]
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+ExportFormat = Literal["csv", "ndjson"]
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return str(value)
+
+
+def _csv_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if hasattr(value, "value"):
+        return value.value
+    return value
+
+
+def _encode(rows: Iterable[Sequence], fields: List[str], fmt: str) -> Iterator[str]:
+    """Serialize rows in chunks of EXPORT_BATCH_SIZE; only one chunk is held at a time."""
+    rows = iter(rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(fields)
+    while True:
+        chunk = list(islice(rows, EXPORT_BATCH_SIZE))
+        if not chunk:
+            break
+        for row in chunk:
+            if fmt == "csv":
+                writer.writerow([_csv_value(v) for v in row])
+            else:
+                buffer.write(json.dumps(dict(zip(fields, row)), default=_json_default, ensure_ascii=False))
+                buffer.write("\n")
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _stream(name: str, fmt: str, fields: List[str], produce) -> StreamingResponse:
+    """Response fed by ``produce(db)``, a generator of rows.
+
+    The session is opened inside the generator, not through get_db, so it
+    lives exactly as long as the stream and is closed even if the client
+    disconnects halfway.
+    """
+    def body():
+        db = SessionLocal()
+        try:
+            yield from _encode(produce(db), fields, fmt)
+        finally:
+            db.close()
+
+    filename = f"{name}-{date.today().isoformat()}.{fmt}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/products")
+def export_products(
+    format: ExportFormat = "csv",
+    category_id: Optional[int] = None,
+    supplier_id: Optional[int] = None,
+    low_stock: Optional[int] = Query(None, ge=0),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+):
+    def produce(db):
+        query = filter_products(
+            db.query(
+                Product.id, Product.name, Product.sku, Product.description, Product.price, Product.quantity,
+                Product.category_id, Category.name, Product.supplier_id, Product.image_url,
+                Product.reorder_point, Product.reorder_qty,
+            ).outerjoin(Category, Category.id == Product.category_id),
+            category_id, supplier_id, low_stock, min_price, max_price,
+        )
+        yield from query.order_by(Product.id).yield_per(EXPORT_BATCH_SIZE)
+
+    return _stream("products", format, PRODUCT_FIELDS, produce)
+
+
+@router.get("/stock")
+def export_movements(
+    format: ExportFormat = "csv",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[Literal["IN", "OUT"]] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+):
+    start, end = movement_window(date_from, date_to)
+
+    def produce(db):
+        cutoff = movement_archive.cutoff()
+        query = filter_movements(
+            db.query(
+                StockMovement.id, StockMovement.product_id, Product.name, Product.sku,
+                StockMovement.type, StockMovement.quantity, StockMovement.movement_date, StockMovement.location_id,
+            ).join(Product, Product.id == StockMovement.product_id),
+            cutoff, start, end, type, product_id, category_id,
+        )
+        yield from query.order_by(StockMovement.movement_date.desc(), StockMovement.id.desc()).yield_per(EXPORT_BATCH_SIZE)
+
+        if cutoff is None or (start is not None and start >= cutoff):
+            return
+        # Then the archived months, naming their products one batch at a time
+        archived = movement_archive.iter_movements(
+            date_from=start, date_to=end, movement_type=type,
+            product_ids=archive_product_ids(db, product_id, category_id),
+        )
+        while True:
+            batch = list(islice(archived, EXPORT_BATCH_SIZE))
+            if not batch:
+                break
+            names = {
+                row.id: (row.name, row.sku) for row in
+                db.query(Product.id, Product.name, Product.sku).filter(Product.id.in_({mv.product_id for mv in batch}))
+            }
+            for mv in batch:
+                name, sku = names.get(mv.product_id, (None, None))
+                yield (mv.id, mv.product_id, name, sku, mv.type, mv.quantity, mv.movement_date, mv.location_id)
+
+    return _stream("stock", format, MOVEMENT_FIELDS, produce)
+
+
+@router.get("/orders")
+def export_orders(
+    format: ExportFormat = "csv",
+    status: Optional[OrderStatusFilter] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    product_id: Optional[int] = None,
+):
+    def produce(db):
+        query = filter_orders(
+            db.query(
+                Order.id, OrderItem.id, OrderItem.product_id, Product.name,
+                OrderItem.quantity, OrderItem.fulfilled_quantity, Order.status, Order.order_date,
+            )
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .join(Product, Product.id == OrderItem.product_id),
+            status, date_from, date_to, product_id,
+        )
+        yield from query.order_by(Order.id, OrderItem.id).yield_per(EXPORT_BATCH_SIZE)
+
+    return _stream("orders", format, ORDER_FIELDS, produce)
@@ -0,0 +1,119 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from dependencies import get_db, role_dependency
+from models import Location, Product, StockLevel, StockMovement, StockTransfer
+from auth_tokens import TokenUser
+from schemas import LocationCreate, LocationUpdate
+
+router = APIRouter(prefix="/locations", tags=["Locations"])
+
+@router.get("/")
+def list_locations(db: Session = Depends(get_db)):
+    totals = dict(
+        db.query(StockLevel.location_id, func.sum(StockLevel.quantity))
+        .group_by(StockLevel.location_id)
+        .all()
+    )
+    return [
+        {"id": loc.id, "code": loc.code, "name": loc.name, "total_quantity": int(totals.get(loc.id) or 0)}
+        for loc in db.query(Location).order_by(Location.code).all()
+    ]
+
+@router.get("/where")
+def where_is_product(product_id: Optional[int] = None, sku: Optional[str] = None, db: Session = Depends(get_db)):
+    """Locations holding a product, by id or SKU, largest quantity first."""
+    if product_id is None and not sku:
+        raise HTTPException(status_code=400, detail="Produit ou SKU requis")
+    query = db.query(Product)
+    product = query.filter(Product.id == product_id).first() if product_id is not None else query.filter(Product.sku == sku).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+
+    levels = (
+        db.query(Location.id, Location.code, Location.name, StockLevel.quantity)
+        .join(StockLevel, StockLevel.location_id == Location.id)
+        .filter(StockLevel.product_id == product.id, StockLevel.quantity > 0)
+        .order_by(StockLevel.quantity.desc(), Location.code)
+        .all()
+    )
+    return {
+        "product_id": product.id,
+        "sku": product.sku,
+        "quantity": product.quantity,
+        "unlocated_quantity": product.quantity - (product.located_quantity or 0),
+        "locations": [
+            {"location_id": row.id, "code": row.code, "name": row.name, "quantity": row.quantity}
+            for row in levels
+        ],
+    }
+
+@router.get("/{location_id}/stock")
+def location_stock(location_id: int, db: Session = Depends(get_db)):
+    loc = db.query(Location).filter(Location.id == location_id).first()
+    if not loc:
+        raise HTTPException(status_code=404, detail="Emplacement non trouvé")
+    rows = (
+        db.query(Product.id, Product.name, Product.sku, StockLevel.quantity)
+        .join(StockLevel, StockLevel.product_id == Product.id)
+        .filter(StockLevel.location_id == location_id, StockLevel.quantity > 0)
+        .order_by(Product.name)
+        .all()
+    )
+    return {
+        "location_id": loc.id,
+        "code": loc.code,
+        "name": loc.name,
+        "products": [
+            {"product_id": row.id, "name": row.name, "sku": row.sku, "quantity": row.quantity}
+            for row in rows
+        ],
+    }
+
+@router.post("/")
+def create_location(location: LocationCreate, db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"]))):
+    if db.query(Location).filter(Location.code == location.code).first():
+        raise HTTPException(status_code=400, detail="Code d'emplacement déjà utilisé")
+    new_loc = Location(code=location.code, name=location.name)
+    db.add(new_loc)
+    db.commit()
+    db.refresh(new_loc)
+    return new_loc
+
+@router.put("/{location_id}")
+def update_location(location_id: int, location: LocationUpdate, db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"]))):
+    loc = db.query(Location).filter(Location.id == location_id).first()
+    if not loc:
+        raise HTTPException(status_code=404, detail="Emplacement non trouvé")
+    if location.code and location.code != loc.code:
+        if db.query(Location).filter(Location.code == location.code).first():
+            raise HTTPException(status_code=400, detail="Code d'emplacement déjà utilisé")
+        loc.code = location.code
+    if location.name is not None:
+        loc.name = location.name
+    db.commit()
+    db.refresh(loc)
+    return loc
+
+@router.delete("/{location_id}")
+def delete_location(location_id: int, db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"]))):
+    loc = db.query(Location).filter(Location.id == location_id).first()
+    if not loc:
+        raise HTTPException(status_code=404, detail="Emplacement non trouvé")
+    held = db.query(func.sum(StockLevel.quantity)).filter(StockLevel.location_id == location_id).scalar()
+    if held:
+        raise HTTPException(status_code=400, detail="L'emplacement contient encore du stock")
+    # Movements and transfers keep a reference to it (foreign keys without ON DELETE)
+    used = (
+        db.query(StockMovement.id).filter(StockMovement.location_id == location_id).first()
+        or db.query(StockTransfer.id).filter(
+            or_(StockTransfer.from_location_id == location_id, StockTransfer.to_location_id == location_id)
+        ).first()
+    )
+    if used:
+        raise HTTPException(status_code=400, detail="L'emplacement a un historique de mouvements: suppression impossible")
+    db.query(StockLevel).filter(StockLevel.location_id == location_id).delete(synchronize_session=False)
+    db.delete(loc)
+    db.commit()
+    return {"message": "Emplacement supprimé"}
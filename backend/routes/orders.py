@@ -1,77 +1,274 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Order, Product
+from models import Order, OrderItem, Product
+from auth_tokens import TokenUser
 from datetime import date
-from schemas import OrderCreate, OrderUpdate
+from dependencies import get_async_db, get_db, role_dependency
+from order_fulfillment import fulfill_orders
+from pagination import encode_cursor, decode_cursor, keyset_filter
+from schemas import OrderCreate, OrderFulfill, OrderItemCreate, OrderUpdate
+from stock_service import publish_changes, resolve_location
+from event_bus import event_bus
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
+# Async versions of the hot reads, included ahead of ``router`` when DB_ASYNC is on
+async_router = APIRouter(prefix="/orders", tags=["Orders"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def order_event(order: Order, lines: List[dict]) -> dict:
+    """Compact event payload for an order."""
+    return {
+        "id": order.id,
+        "status": order.status,
+        "order_date": order.order_date,
+        "items": [
+            {"product_id": line["product_id"], "quantity": line["quantity"], "fulfilled_quantity": line.get("fulfilled_quantity") or 0}
+            for line in lines
+        ],
+    }
 
-@router.get("/")
-def list_orders(db: Session = Depends(get_db)):
-    orders = db.query(Order).join(Product).all()
-    result = []
-    for order in orders:
-        result.append({
-            "id": order.id,
-            "product_id": order.product_id,
-            "product_name": order.product.name if order.product else "Produit inconnu",
-            "quantity": order.quantity,
-            "status": order.status,
-            "order_date": order.order_date
+DEFAULT_PAGE_SIZE = 200
+
+OrderStatusFilter = Literal["PENDING", "COMPLETED", "CANCELLED"]
+
+def filter_orders(query, status=None, date_from=None, date_to=None, product_id=None):
+    """Apply the order list filters; date_to is inclusive."""
+    if status:
+        query = query.filter(Order.status == status)
+    if date_from:
+        query = query.filter(Order.order_date >= date_from)
+    if date_to:
+        query = query.filter(Order.order_date <= date_to)
+    if product_id is not None:
+        query = query.filter(Order.id.in_(select(OrderItem.order_id).where(OrderItem.product_id == product_id)))
+    return query
+
+def order_items_query(order_ids):
+    """Lines of the given orders with their product, as one select()."""
+    return (
+        select(
+            OrderItem.id, OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.fulfilled_quantity,
+            Product.name, Product.sku, Product.price,
+        )
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    )
+
+def group_order_items(rows) -> Dict[int, List[dict]]:
+    """Rows of order_items_query, grouped by order."""
+    items: Dict[int, List[dict]] = {}
+    for row in rows:
+        items.setdefault(row.order_id, []).append({
+            "id": row.id,
+            "product_id": row.product_id,
+            "product_name": row.name,
+            "sku": row.sku,
+            "price": float(row.price) if row.price is not None else None,
+            "quantity": row.quantity,
+            "fulfilled_quantity": row.fulfilled_quantity,
         })
-    return result
+    return items
+
+def load_order_items(db: Session, order_ids) -> Dict[int, List[dict]]:
+    """Lines of the given orders with their product, in one query."""
+    return group_order_items(db.execute(order_items_query(order_ids)).all()) if order_ids else {}
+
+def serialize_order(order: Order, lines: List[dict]) -> dict:
+    return {
+        "id": order.id,
+        "status": order.status,
+        "order_date": order.order_date,
+        "items": lines,
+        "quantity": sum(line["quantity"] for line in lines),
+        "fulfilled_quantity": sum(line["fulfilled_quantity"] for line in lines),
+        "amount": round(sum((line["price"] or 0) * line["quantity"] for line in lines), 2),
+    }
+
+def order_lines(db: Session, items: Optional[List[OrderItemCreate]], product_id: Optional[int], quantity: Optional[int]) -> List[dict]:
+    """Validated lines of a payload (items, or the single-line shorthand).
+
+    All product ids are checked with one query; lines for the same product
+    are merged.
+    """
+    if items is None and product_id is not None:
+        items = [OrderItemCreate(product_id=product_id, quantity=quantity or 1)]
+    if not items:
+        raise HTTPException(status_code=400, detail="La commande doit contenir au moins une ligne")
+
+    merged: Dict[int, int] = {}
+    for item in items:
+        merged[item.product_id] = merged.get(item.product_id, 0) + item.quantity
+    found = {pid for pid, in db.query(Product.id).filter(Product.id.in_(merged))}
+    missing = sorted(set(merged) - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Produit non trouvé: {', '.join(map(str, missing))}")
+    return [{"product_id": pid, "quantity": qty} for pid, qty in merged.items()]
+
+def insert_lines(db: Session, order_id: int, lines: List[dict]):
+    # One multi-row INSERT for all the lines
+    db.execute(insert(OrderItem), [{"order_id": order_id, **line} for line in lines])
+
+def order_list_query(status=None, date_from=None, date_to=None, product_id=None, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """select() of one page of orders, newest first, plus one row to detect the next page."""
+    query = filter_orders(select(Order), status, date_from, date_to, product_id)
+    keys = [Order.order_date, Order.id]
+    if cursor:
+        query = query.filter(keyset_filter(keys, decode_cursor(cursor, [date.fromisoformat, int]), descending=True))
+    return query.order_by(*[k.desc() for k in keys]).limit(limit + 1)
+
+def order_page(response: Response, orders: List[Order], limit: int) -> List[Order]:
+    """Trim the orders of order_list_query to ``limit``, announcing the next page in X-Next-Cursor."""
+    if len(orders) > limit:
+        orders = orders[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor([orders[-1].order_date, orders[-1].id])
+    return orders
+
+@router.get("/")
+def list_orders(
+    response: Response,
+    status: Optional[OrderStatusFilter] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    product_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """One page of orders, newest first, keyed on (order_date, id).
+
+    The lines of the whole page, with product name and price, come from a
+    single second query; the next page is announced in X-Next-Cursor.
+    """
+    query = order_list_query(status, date_from, date_to, product_id, limit, cursor)
+    orders = order_page(response, db.scalars(query).all(), limit)
+    items = load_order_items(db, [order.id for order in orders])
+    return [serialize_order(order, items.get(order.id, [])) for order in orders]
+
+@async_router.get("/")
+async def list_orders_async(
+    response: Response,
+    status: Optional[OrderStatusFilter] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    product_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Same two queries as list_orders, awaited on the async driver
+    query = order_list_query(status, date_from, date_to, product_id, limit, cursor)
+    orders = order_page(response, (await db.scalars(query)).all(), limit)
+    ids = [order.id for order in orders]
+    items = group_order_items((await db.execute(order_items_query(ids))).all()) if ids else {}
+    return [serialize_order(order, items.get(order.id, [])) for order in orders]
+
+@router.get("/{order_id}")
+def get_order(order_id: int, db: Session = Depends(get_db)):
+    order = db.query(Order).filter(Order.id == order_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Commande non trouvée")
+    return serialize_order(order, load_order_items(db, [order.id]).get(order.id, []))
 
 @router.post("/")
 def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    # Verify product exists
-    product = db.query(Product).filter(Product.id == order.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
-    
-    new_order = Order(
-        product_id=order.product_id,
-        quantity=order.quantity,
-        status=order.status,
-        order_date=date.today()
-    )
+    lines = order_lines(db, order.items, order.product_id, order.quantity)
+
+    new_order = Order(status=order.status, order_date=date.today())
     db.add(new_order)
+    db.flush()
+    insert_lines(db, new_order.id, lines)
     db.commit()
     db.refresh(new_order)
-    return new_order
+    event_bus.publish("orders", "created", order_event(new_order, lines))
+    return serialize_order(new_order, load_order_items(db, [new_order.id]).get(new_order.id, []))
+
+@router.post("/fulfill")
+def fulfill_pending_orders(payload: OrderFulfill, db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"]))):
+    """Deliver PENDING orders from stock, oldest first, in one transaction.
+
+    Each order is reported as filled, partial (PENDING with lines left to
+    deliver) or short (nothing available).
+    """
+    location_id = resolve_location(db, payload.location)
+    try:
+        allocations, completed, changes, movement_events = fulfill_orders(
+            db, order_ids=payload.order_ids, date_from=payload.date_from, date_to=payload.date_to,
+            product_id=payload.product_id, location_id=location_id, allow_partial=payload.allow_partial,
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    publish_changes(changes, [("movement.created", event) for event in movement_events])
+    report = {"filled": [], "partial": [], "short": []}
+    by_order: Dict[int, list] = {}
+    for a in allocations:
+        by_order.setdefault(a.order_id, []).append(a)
+    for order_id, lines in by_order.items():
+        allocated = sum(a.allocated for a in lines)
+        entry = {
+            "order_id": order_id,
+            "allocated": allocated,
+            "remaining": sum(a.remaining for a in lines),
+            "items": [
+                {"item_id": a.item_id, "product_id": a.product_id, "allocated": a.allocated, "remaining": a.remaining}
+                for a in lines
+            ],
+        }
+        report["filled" if order_id in completed else "partial" if allocated else "short"].append(entry)
+    if allocations:
+        event_bus.publish("orders", "fulfilled", {
+            "filled": [entry["order_id"] for entry in report["filled"]],
+            "partial": [entry["order_id"] for entry in report["partial"]],
+        })
+    report["movements"] = len(movement_events)
+    report["quantity"] = sum(a.allocated for a in allocations)
+    return report
 
 @router.put("/{order_id}")
 def update_order(order_id: int, order: OrderUpdate, db: Session = Depends(get_db)):
     db_order = db.query(Order).filter(Order.id == order_id).first()
     if not db_order:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
-    
-    if order.product_id is not None:
-        product = db.query(Product).filter(Product.id == order.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail="Produit non trouvé")
-        db_order.product_id = order.product_id
-    if order.quantity is not None:
-        db_order.quantity = order.quantity
+
+    if order.items is not None or order.product_id is not None or order.quantity is not None:
+        current = db.query(OrderItem).filter(OrderItem.order_id == order_id).order_by(OrderItem.id).all()
+        if any(item.fulfilled_quantity for item in current):
+            raise HTTPException(status_code=400, detail="Commande déjà livrée, en tout ou en partie: lignes non modifiables")
+        if order.items is None:
+            # Shorthand edit of a one-line order
+            if len(current) > 1:
+                raise HTTPException(status_code=400, detail="Commande à plusieurs lignes: utiliser items")
+            base = current[0] if current else None
+            lines = order_lines(
+                db, None,
+                order.product_id if order.product_id is not None else base and base.product_id,
+                order.quantity if order.quantity is not None else base and base.quantity,
+            )
+        else:
+            lines = order_lines(db, order.items, None, None)
+        db.query(OrderItem).filter(OrderItem.order_id == order_id).delete(synchronize_session=False)
+        insert_lines(db, order_id, lines)
     if order.status is not None:
         db_order.status = order.status
-    
+
     db.commit()
     db.refresh(db_order)
-    return db_order
+    items = load_order_items(db, [order_id]).get(order_id, [])
+    event_bus.publish("orders", "updated", order_event(db_order, items))
+    return serialize_order(db_order, items)
 
 @router.delete("/{order_id}")
 def delete_order(order_id: int, db: Session = Depends(get_db)):
     order = db.query(Order).filter(Order.id == order_id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
+    db.query(OrderItem).filter(OrderItem.order_id == order_id).delete(synchronize_session=False)
     db.delete(order)
     db.commit()
-    return {"detail": "Commande supprimée"}
\ No newline at end of file
+    event_bus.publish("orders", "deleted", {"id": order_id})
+    return {"detail": "Commande supprimée"}
@@ -1,47 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException
+from decimal import Decimal
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Product, User, Category
-from dependencies import role_dependency
+from models import Product, Category
+from auth_tokens import TokenUser
+from dependencies import get_async_read_db, get_db, get_read_db, role_dependency
 from schemas import ProductCreate, ProductUpdate
+from pagination import encode_cursor, decode_cursor, keyset_filter
+from event_bus import event_bus
+from search_index import product_index
+from stats_engine import product_state, stock_stats
+from stock_alerts import reorder_level, stock_alerts
+from product_import import DEFAULT_CHUNK_SIZE, detect_format, import_products, iter_rows
 
 router = APIRouter(prefix="/products", tags=["Products"])
+# Async versions of the hot reads, included ahead of ``router`` when DB_ASYNC is on
+async_router = APIRouter(prefix="/products", tags=["Products"])
+
+PRODUCT_SORTS = {
+    "id": (Product.id, int),
+    "name": (Product.name, str),
+    "price": (Product.price, Decimal),
+    "quantity": (Product.quantity, int),
+}
+
+
+def product_event(product: Product) -> dict:
+    """Compact event payload for a product."""
+    return {
+        "id": product.id,
+        "name": product.name,
+        "sku": product.sku,
+        "price": product.price,
+        "quantity": product.quantity,
+        "category_id": product.category_id,
+        "supplier_id": product.supplier_id,
+        "reorder_point": product.reorder_point,
+    }
+
+
+def serialize_product(product: Product, category_name: Optional[str]) -> dict:
+    return {
+        "id": product.id,
+        "name": product.name,
+        "price": product.price,
+        "quantity": product.quantity,
+        "sku": product.sku,
+        "description": product.description,
+        "category_id": product.category_id,
+        "supplier_id": product.supplier_id,
+        "image_url": product.image_url,
+        "reorder_point": product.reorder_point,
+        "reorder_qty": product.reorder_qty,
+        "category_name": category_name
+    }
+
+
+def filter_products(query, category_id=None, supplier_id=None, low_stock=None, min_price=None, max_price=None):
+    """Filters shared by the product list and its export."""
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if supplier_id is not None:
+        query = query.filter(Product.supplier_id == supplier_id)
+    if low_stock is not None:
+        query = query.filter(Product.quantity <= low_stock)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    return query
+
+
+def product_list_query(category_id=None, supplier_id=None, low_stock=None, min_price=None, max_price=None,
+                       sort_by="id", order="asc", limit=None, cursor=None):
+    """One joined select() of the product list, for the sync and async routes.
+
+    With ``limit``, one row more than the page is fetched so that
+    product_page can tell whether another page follows.
+    """
+    sort_column, sort_type = PRODUCT_SORTS[sort_by]
+    descending = order == "desc"
+    query = select(Product, Category.name).outerjoin(Category, Category.id == Product.category_id)
+
+    query = filter_products(query, category_id, supplier_id, low_stock, min_price, max_price)
+
+    keys = [sort_column] if sort_by == "id" else [sort_column, Product.id]
+    if cursor:
+        types = [sort_type] if sort_by == "id" else [sort_type, int]
+        query = query.filter(keyset_filter(keys, decode_cursor(cursor, types), descending))
+    query = query.order_by(*[k.desc() if descending else k.asc() for k in keys])
+    return query if limit is None else query.limit(limit + 1)
+
+
+def product_page(response: Response, rows, sort_by: str, limit: Optional[int]) -> list:
+    """Serialize the rows of product_list_query, announcing the next page in X-Next-Cursor."""
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        values = [last.id] if sort_by == "id" else [getattr(last, sort_by), last.id]
+        response.headers["X-Next-Cursor"] = encode_cursor(values)
+    return [serialize_product(p, name) for p, name in rows]
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
 # GET all products
 @router.get("/")
-def list_products(db: Session = Depends(get_db)):
-    products = db.query(Product).all()
-    result = []
-    for product in products:
-        product_dict = {
-            "id": product.id,
-            "name": product.name,
-            "price": product.price,
-            "quantity": product.quantity,
-            "sku": product.sku,
-            "description": product.description,
-            "category_id": product.category_id,
-            "supplier_id": product.supplier_id,
-            "image_url": product.image_url,
-            "category_name": None
-        }
-        if product.category_id:
-            category = db.query(Category).filter(Category.id == product.category_id).first()
-            if category:
-                product_dict["category_name"] = category.name
-        result.append(product_dict)
-    return result
+def list_products(
+    response: Response,
+    category_id: Optional[int] = None,
+    supplier_id: Optional[int] = None,
+    low_stock: Optional[int] = Query(None, ge=0, description="Seuil: quantité <= low_stock"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort_by: Literal["id", "name", "price", "quantity"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    # One joined query; without ``limit`` the whole filtered catalog is returned
+    # as before, with ``limit`` the next page is announced in X-Next-Cursor.
+    query = product_list_query(category_id, supplier_id, low_stock, min_price, max_price, sort_by, order, limit, cursor)
+    return product_page(response, db.execute(query).all(), sort_by, limit)
+
+@async_router.get("/")
+async def list_products_async(
+    response: Response,
+    category_id: Optional[int] = None,
+    supplier_id: Optional[int] = None,
+    low_stock: Optional[int] = Query(None, ge=0, description="Seuil: quantité <= low_stock"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    sort_by: Literal["id", "name", "price", "quantity"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    # Same select(), awaited on the async driver instead of blocking a thread
+    query = product_list_query(category_id, supplier_id, low_stock, min_price, max_price, sort_by, order, limit, cursor)
+    return product_page(response, (await db.execute(query)).all(), sort_by, limit)
+
+# GET ranked, typo-tolerant search on name / sku / description
+@router.get("/search")
+def search_products(q: str = Query(..., min_length=1), limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_read_db)):
+    hits = product_index.search(q, limit=limit)
+    if not hits:
+        return []
+    rows = (
+        db.query(Product, Category.name)
+        .outerjoin(Category, Category.id == Product.category_id)
+        .filter(Product.id.in_([product_id for product_id, _ in hits]))
+        .all()
+    )
+    by_id = {p.id: serialize_product(p, name) for p, name in rows}
+    return [{**by_id[product_id], "score": score} for product_id, score in hits if product_id in by_id]
 
 # POST create product
 @router.post("/")
-def create_product(product: ProductCreate, db: Session = Depends(get_db), user: User = Depends(role_dependency(["ADMIN", "MANAGER"]))):
+def create_product(product: ProductCreate, db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"]))):
     # only ADMIN or MANAGER can create products
     new_product = Product(
         name=product.name, 
@@ -51,26 +169,50 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db), user:
         description=product.description,
         category_id=product.category_id,
         supplier_id=product.supplier_id,
-        image_url=product.image_url if hasattr(product, 'image_url') else None
+        image_url=product.image_url if hasattr(product, 'image_url') else None,
+        reorder_point=product.reorder_point,
+        reorder_qty=product.reorder_qty,
     )
     db.add(new_product)
     db.commit()
     db.refresh(new_product)
+    product_index.upsert_product(new_product)
+    stock_stats.apply(None, product_state(new_product))
+    stock_alerts.observe(new_product.id, reorder_level(new_product))
+    event_bus.publish("products", "created", product_event(new_product))
     return new_product
 
+# POST bulk import (CSV or NDJSON), upsert on sku
+@router.post("/import")
+def import_products_file(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"])),
+):
+    fmt = format or detect_format(file.filename)
+    report = import_products(db, iter_rows(file.file, fmt), chunk_size=chunk_size)
+    # One summary event rather than one per row: clients reload the list
+    event_bus.publish("products", "imported", {"inserted": report["inserted"], "updated": report["updated"]})
+    return report
+
 # PUT update product
 @router.put("/{product_id}")
-def update_product(product_id: int, product_data: ProductUpdate, db: Session = Depends(get_db), user: User = Depends(role_dependency(["ADMIN", "MANAGER"]))):
+def update_product(product_id: int, product_data: ProductUpdate, db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"]))):
     # only ADMIN or MANAGER can update products
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if not db_product:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
+    before = product_state(db_product)
     
     if product_data.name is not None:
         db_product.name = product_data.name
     if product_data.price is not None:
         db_product.price = product_data.price
     if product_data.quantity is not None:
+        if product_data.quantity < (db_product.located_quantity or 0):
+            raise HTTPException(status_code=400, detail="Quantité inférieure au stock rangé dans les emplacements")
         db_product.quantity = product_data.quantity
     if product_data.sku is not None:
         db_product.sku = product_data.sku
@@ -82,22 +224,36 @@ def update_product(product_id: int, product_data: ProductUpdate, db: Session = D
         db_product.supplier_id = product_data.supplier_id
     if hasattr(product_data, 'image_url') and product_data.image_url is not None:
         db_product.image_url = product_data.image_url
+    # An explicit null clears the reorder point (and its alert)
+    if "reorder_point" in product_data.model_fields_set:
+        db_product.reorder_point = product_data.reorder_point
+    if "reorder_qty" in product_data.model_fields_set:
+        db_product.reorder_qty = product_data.reorder_qty
         
     db.commit()
     db.refresh(db_product)
+    product_index.upsert_product(db_product)
+    stock_stats.apply(before, product_state(db_product))
+    stock_alerts.observe(db_product.id, reorder_level(db_product))
+    event_bus.publish("products", "updated", product_event(db_product))
     return db_product
 
 # DELETE product
 @router.delete("/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db), user: User = Depends(role_dependency("ADMIN"))):
+def delete_product(product_id: int, db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency("ADMIN"))):
     # only ADMIN can delete products
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
     
+    before = product_state(product)
     try:
         db.delete(product)
         db.commit()
+        product_index.remove(product_id)
+        stock_stats.apply(before, None)
+        stock_alerts.observe(product_id, None)
+        event_bus.publish("products", "deleted", {"id": product_id})
         return {"detail": "Produit supprimé"}
     except Exception as e:
         db.rollback()
@@ -1,64 +1,142 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Optional
 from fastapi import APIRouter, Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from database import SessionLocal
-from models import Product, Category, Order
+from sqlalchemy import func, select
+from auth_tokens import TokenUser
+from dependencies import get_async_read_db, get_read_db, role_dependency
+from database import SessionLocal, async_engine
+from pool_metrics import async_pool_metrics, pool_metrics
+from read_routing import replica_router
+from models import Category, Order, OrderItem
+from stats_engine import stock_stats
+from stock_history import stock_as_of
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
+# Async versions of the hot reads, included ahead of ``router`` when DB_ASYNC is on
+async_router = APIRouter(prefix="/stats", tags=["Stats"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.get("/pool")
+def get_pool_stats(user: TokenUser = Depends(role_dependency("ADMIN"))):
+    """Database connection pool of this worker process: occupancy, checkout wait and churn."""
+    stats = pool_metrics.snapshot()
+    if async_engine is not None:
+        stats["async"] = async_pool_metrics.snapshot()
+    if replica_router.replicas:
+        stats["read_routing"] = replica_router.metrics()
+    return stats
 
+def category_names_query():
+    return select(Category.id, Category.name).order_by(Category.id)
 
-@router.get("/")
-def get_stats(db: Session = Depends(get_db)):
-    # Get all products for value calculation
-    all_products = db.query(Product).all()
-    
-    # Products count per category (including categories with zero products)
-    prod_by_cat_q = (
-        db.query(Category.name, func.count(Product.id))
-        .outerjoin(Product, Product.category_id == Category.id)
-        .group_by(Category.id)
-        .all()
+
+def orders_by_status_query(as_of: Optional[date] = None):
+    query = select(Order.status, func.count(Order.id))
+    if as_of is not None:
+        query = query.where(Order.order_date <= as_of)
+    return query.group_by(Order.status)
+
+
+def order_items_by_status_query(as_of: Optional[date] = None):
+    """Order lines and ordered units per order status, in one grouped join."""
+    query = select(Order.status, func.count(OrderItem.id), func.sum(OrderItem.quantity)).join(
+        OrderItem, OrderItem.order_id == Order.id
     )
-    
-    # Calculate value per category
+    if as_of is not None:
+        query = query.where(Order.order_date <= as_of)
+    return query.group_by(Order.status)
+
+
+def count_by_status(rows) -> dict:
+    return {getattr(status, "value", str(status)): int(count) for status, count in rows}
+
+
+def items_by_status(rows) -> dict:
+    return {
+        getattr(status, "value", str(status)): {"lines": int(lines), "quantity": int(quantity or 0)}
+        for status, lines, quantity in rows
+    }
+
+
+def live_stats(categories, orders_rows, items_rows) -> dict:
+    """Current figures: products from the maintained counters, orders from the given rows."""
     products_by_category = []
-    for name, count in prod_by_cat_q:
-        category_products = [p for p in all_products if p.category_id and db.query(Category).filter(Category.id == p.category_id).first().name == name]
-        value = sum((p.price or 0) * (p.quantity or 0) for p in category_products)
+    for category_id, name in categories:
+        count, _, value = stock_stats.category(category_id)
         products_by_category.append({
             "category": name,
             "count": int(count),
             "value": float(value)
         })
 
-    # Total stock (sum of quantities)
-    total_stock = db.query(func.sum(Product.quantity)).scalar() or 0
-    try:
-        total_stock = int(total_stock)
-    except Exception:
-        total_stock = 0
-    
-    # Total stock value
-    stock_value = sum((p.price or 0) * (p.quantity or 0) for p in all_products)
-
-    # Orders count by status
-    orders_by_status_q = (
-        db.query(Order.status, func.count(Order.id))
-        .group_by(Order.status)
-        .all()
-    )
-    orders_by_status = {str(status): int(count) for status, count in orders_by_status_q}
-
+    total_stock, stock_value = stock_stats.totals()
     return {
         "products_by_category": products_by_category,
         "total_stock": total_stock,
         "stock_value": float(stock_value),
-        "orders_by_status": orders_by_status,
+        "orders_by_status": count_by_status(orders_rows),
+        "order_items_by_status": items_by_status(items_rows),
+    }
+
+
+@router.get("/")
+def get_stats(as_of: Optional[date] = None, db: Session = Depends(get_read_db)):
+    if as_of is not None:
+        return get_stats_as_of(as_of, db)
+
+    # Product figures come from the maintained counters: O(categories),
+    # (re)loaded from the primary whose writes keep them up to date
+    stock_stats.ensure_fresh(SessionLocal)
+    return live_stats(
+        db.execute(category_names_query()).all(),
+        db.execute(orders_by_status_query()).all(),
+        db.execute(order_items_by_status_query()).all(),
+    )
+
+@async_router.get("/")
+async def get_stats_async(as_of: Optional[date] = None, db: AsyncSession = Depends(get_async_read_db)):
+    if as_of is not None:
+        # The history is rebuilt by stock_history's sync code (snapshot plus movements)
+        return await db.run_sync(lambda session: get_stats_as_of(as_of, session))
+
+    # A reload of the counters is a sync full-table aggregate: keep it off the event loop
+    if stock_stats.needs_load():
+        await run_in_threadpool(stock_stats.ensure_fresh, SessionLocal)
+    return live_stats(
+        (await db.execute(category_names_query())).all(),
+        (await db.execute(orders_by_status_query())).all(),
+        (await db.execute(order_items_by_status_query())).all(),
+    )
+
+
+def get_stats_as_of(as_of: date, db: Session):
+    # Same figures at the end of ``as_of``, from the nearest snapshot plus movements
+    positions, source = stock_as_of(db, datetime.combine(as_of, time.max))
+
+    by_category = {}
+    for p in positions.values():
+        counters = by_category.setdefault(p.category_id, [0, Decimal(0)])
+        counters[0] += 1
+        counters[1] += p.quantity * p.price
+
+    products_by_category = []
+    for category_id, name in db.execute(category_names_query()).all():
+        count, value = by_category.get(category_id, (0, Decimal(0)))
+        products_by_category.append({
+            "category": name,
+            "count": int(count),
+            "value": float(value)
+        })
+
+    return {
+        "products_by_category": products_by_category,
+        "total_stock": sum(p.quantity for p in positions.values()),
+        "stock_value": float(sum((p.quantity * p.price for p in positions.values()), Decimal(0))),
+        "orders_by_status": count_by_status(db.execute(orders_by_status_query(as_of)).all()),
+        "order_items_by_status": items_by_status(db.execute(order_items_by_status_query(as_of)).all()),
+        "as_of": as_of,
+        "source": source,
     }
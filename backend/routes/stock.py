@@ -1,96 +1,388 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import Product, StockMovement
-from schemas import StockAdjust, StockMovementCreate
+from auth_tokens import TokenUser
+from dependencies import get_async_read_db, get_db, get_read_db, role_dependency
+from schemas import StockAdjust, StockBatch, StockMovementCreate, StockTransferCreate
+from pagination import encode_cursor, decode_cursor, keyset_filter
+from forecast import forecast_rows
+from stats_engine import stock_stats
+from stock_alerts import stock_alerts
+from movement_archive import movement_archive
+from stock_history import stock_as_of, take_snapshot
+from stock_rollups import movement_day, record_rollup, stock_trend, stock_value_evolution
+from stock_service import apply_delta, move_stock, movement_event, publish_changes, resolve_location, transfer_stock
+from event_bus import event_bus
+from group_commit import stock_group_writer
 
 router = APIRouter(prefix="/stock", tags=["Stock"])
+# Async versions of the hot reads, included ahead of ``router`` when DB_ASYNC is on
+async_router = APIRouter(prefix="/stock", tags=["Stock"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+DEFAULT_PAGE_SIZE = 200
+
+
+def movement_window(date_from: Optional[date], date_to: Optional[date]):
+    """[start, end) datetimes for inclusive date_from / date_to filters."""
+    start = datetime.combine(date_from, time.min) if date_from is not None else None
+    end = datetime.combine(date_to + timedelta(days=1), time.min) if date_to is not None else None
+    return start, end
+
+
+def filter_movements(query, cutoff, start, end, type=None, product_id=None, category_id=None):
+    """Filters shared by the movement ledger and its export (query joined to Product)."""
+    if cutoff is not None:
+        query = query.filter(StockMovement.movement_date >= cutoff)
+    if start is not None:
+        query = query.filter(StockMovement.movement_date >= start)
+    if end is not None:
+        query = query.filter(StockMovement.movement_date < end)
+    if type is not None:
+        query = query.filter(StockMovement.type == type)
+    if product_id is not None:
+        query = query.filter(StockMovement.product_id == product_id)
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    return query
+
+
+def category_products_query(category_id: int):
+    return select(Product.id).where(Product.category_id == category_id)
+
+
+def archive_product_ids(db: Session, product_id: Optional[int], category_id: Optional[int]):
+    """Product filter for archived movements, which carry no category."""
+    if product_id is not None:
+        return {product_id}
+    if category_id is not None:
+        return set(db.scalars(category_products_query(category_id)))
+    return None
+
+
+def movement_list_query(cutoff, start, end, type, product_id, category_id, before, limit: int):
+    """select() of the live movements of a page, newest first, plus one row to detect the next page."""
+    query = filter_movements(
+        select(StockMovement, Product.name, Product.sku).join(Product, Product.id == StockMovement.product_id),
+        cutoff, start, end, type, product_id, category_id,
+    )
+    keys = [StockMovement.movement_date, StockMovement.id]
+    if before:
+        query = query.filter(keyset_filter(keys, before, descending=True))
+    return query.order_by(*[k.desc() for k in keys]).limit(limit + 1)
+
+
+def reaches_archive(result: list, limit: int, cutoff, start) -> bool:
+    """Whether the page must be completed from the archived months."""
+    return len(result) <= limit and cutoff is not None and (start is None or start < cutoff)
+
+
+def read_archive(before, start, end, type, product_ids, count: int):
+    """Up to ``count`` archived movements after the cursor (blocking file reads)."""
+    return list(islice(
+        movement_archive.iter_movements(
+            before=tuple(before) if before else None,
+            date_from=start, date_to=end, movement_type=type, product_ids=product_ids,
+        ),
+        count,
+    ))
+
+
+def product_names_query(archived):
+    return select(Product.id, Product.name, Product.sku).where(Product.id.in_({mv.product_id for mv in archived}))
+
+
+def serialize_movement(mv, product_name: Optional[str], sku: Optional[str]) -> dict:
+    """A live (StockMovement) or archived (ArchivedMovement) movement."""
+    return {
+        "id": mv.id,
+        "product_id": mv.product_id,
+        "product_name": product_name,
+        "sku": sku,
+        "type": getattr(mv.type, "value", mv.type),
+        "quantity": mv.quantity,
+        "movement_date": mv.movement_date,
+        "location_id": mv.location_id,
+    }
+
+
+def movement_page(response: Response, result: list, limit: int) -> list:
+    """Trim a page to ``limit``, announcing the next one in X-Next-Cursor."""
+    if len(result) > limit:
+        result = result[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor([result[-1]["movement_date"], result[-1]["id"]])
+    return result
+
+
+def list_movement_page(
+    db: Session,
+    response: Response,
+    limit: int,
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[str] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+):
+    """One page of movements, newest first, keyed on (movement_date, id).
+
+    Once the live table runs out, the page is completed from the archived
+    months (see movement_archive), which are all older than the live rows.
+    """
+    start, end = movement_window(date_from, date_to)
+    cutoff = movement_archive.cutoff()
+    before = decode_cursor(cursor, [datetime.fromisoformat, int]) if cursor else None
+    query = movement_list_query(cutoff, start, end, type, product_id, category_id, before, limit)
+    result = [serialize_movement(mv, name, sku) for mv, name, sku in db.execute(query).all()]
+
+    if reaches_archive(result, limit, cutoff, start):
+        archived = read_archive(
+            before, start, end, type, archive_product_ids(db, product_id, category_id), limit + 1 - len(result),
+        )
+        names = {row.id: (row.name, row.sku) for row in db.execute(product_names_query(archived))} if archived else {}
+        result += [serialize_movement(mv, *names.get(mv.product_id, (None, None))) for mv in archived]
+    return movement_page(response, result, limit)
 
 @router.get("/")
-def list_movements(db: Session = Depends(get_db)):
-    movements = (
-        db.query(StockMovement)
-        .join(Product, Product.id == StockMovement.product_id)
-        .order_by(StockMovement.movement_date.desc())
-        .all()
+def list_movements(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[Literal["IN", "OUT"]] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    return list_movement_page(
+        db, response, limit, cursor,
+        date_from=date_from, date_to=date_to, type=type,
+        product_id=product_id, category_id=category_id,
     )
-    result = []
-    for mv in movements:
-        mv_type = mv.type.value if hasattr(mv.type, "value") else str(mv.type)
-        result.append(
+
+@async_router.get("/")
+async def list_movements_async(
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[Literal["IN", "OUT"]] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    # list_movement_page with its queries awaited on the async driver
+    start, end = movement_window(date_from, date_to)
+    cutoff = movement_archive.cutoff()
+    before = decode_cursor(cursor, [datetime.fromisoformat, int]) if cursor else None
+    query = movement_list_query(cutoff, start, end, type, product_id, category_id, before, limit)
+    result = [serialize_movement(mv, name, sku) for mv, name, sku in (await db.execute(query)).all()]
+
+    if reaches_archive(result, limit, cutoff, start):
+        product_ids = {product_id} if product_id is not None else None
+        if product_id is None and category_id is not None:
+            product_ids = set((await db.scalars(category_products_query(category_id))).all())
+        # The archive files are read in the threadpool, off the event loop
+        archived = await run_in_threadpool(read_archive, before, start, end, type, product_ids, limit + 1 - len(result))
+        names = {
+            row.id: (row.name, row.sku) for row in (await db.execute(product_names_query(archived))).all()
+        } if archived else {}
+        result += [serialize_movement(mv, *names.get(mv.product_id, (None, None))) for mv in archived]
+    return movement_page(response, result, limit)
+
+@router.get("/trend")
+def get_stock_trend(
+    days: int = Query(7, ge=1, le=366),
+    category_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    if product_id is not None:
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Produit non trouvé")
+        current_stock = product.quantity
+    else:
+        # Read models follow the primary's writes: never (re)load them from a replica
+        stock_stats.ensure_fresh(SessionLocal)
+        if category_id is not None:
+            current_stock = stock_stats.category(category_id)[1]
+        else:
+            current_stock = stock_stats.totals()[0]
+    return stock_trend(db, days, current_stock, category_id=category_id, product_id=product_id)
+
+@router.get("/evolution-value")
+def get_stock_evolution_value(
+    months: int = Query(6, ge=1, le=24),
+    category_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    stock_stats.ensure_fresh(SessionLocal)
+    if category_id is not None:
+        current_value = stock_stats.category(category_id)[2]
+    else:
+        current_value = stock_stats.totals()[1]
+    return stock_value_evolution(db, months, current_value, category_id=category_id)
+
+@router.get("/as-of")
+def get_stock_as_of(
+    date: date,
+    category_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    # Stock at the end of the given day
+    positions, source = stock_as_of(db, datetime.combine(date, time.max))
+    positions = [
+        p for p in positions.values()
+        if (category_id is None or p.category_id == category_id)
+        and (product_id is None or p.product_id == product_id)
+    ]
+    names = dict(
+        db.query(Product.id, Product.name).filter(Product.id.in_([p.product_id for p in positions])).all()
+    ) if positions else {}
+    return {
+        "as_of": date,
+        "source": source,
+        "total_stock": sum(p.quantity for p in positions),
+        "stock_value": float(sum((p.quantity * p.price for p in positions), Decimal(0))),
+        "products": [
             {
-                "id": mv.id,
-                "product_id": mv.product_id,
-                "product_name": mv.product.name if mv.product else None,
-                "sku": getattr(mv.product, "sku", None) if mv.product else None,
-                "type": mv_type,
-                "quantity": mv.quantity,
-                "movement_date": mv.movement_date,
+                "product_id": p.product_id,
+                "product_name": names.get(p.product_id),
+                "category_id": p.category_id,
+                "quantity": p.quantity,
+                "value": float(p.quantity * p.price),
             }
-        )
+            for p in sorted(positions, key=lambda p: p.product_id)
+        ],
+    }
+
+@router.get("/alerts")
+def list_stock_alerts(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    category_id: Optional[int] = None,
+    supplier_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+):
+    # Breached products come from the in-process alert index; only those rows are read
+    stock_alerts.ensure_fresh(SessionLocal)
+    breaches = stock_alerts.breaches()
+    if not breaches:
+        return []
+    query = db.query(Product.id, Product.name, Product.sku, Product.category_id, Product.supplier_id).filter(
+        Product.id.in_([product_id for product_id, _ in breaches])
+    )
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if supplier_id is not None:
+        query = query.filter(Product.supplier_id == supplier_id)
+    products = {p.id: p for p in query}
+
+    result = []
+    for product_id, level in breaches:
+        product = products.get(product_id)
+        if product is None:
+            continue
+        shortfall = level.reorder_point - level.quantity
+        result.append({
+            "product_id": product_id,
+            "product_name": product.name,
+            "sku": product.sku,
+            "category_id": product.category_id,
+            "supplier_id": product.supplier_id,
+            "quantity": level.quantity,
+            "reorder_point": level.reorder_point,
+            "reorder_qty": level.reorder_qty,
+            "suggested_qty": max(level.reorder_qty or 0, shortfall),
+        })
+        if limit is not None and len(result) >= limit:
+            break
+    return result
+
+@router.get("/forecast")
+def get_stock_forecast(
+    category_id: Optional[int] = None,
+    supplier_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    reorder_only: bool = False,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    query = db.query(Product.id, Product.name, Product.sku, Product.quantity, Product.reorder_qty, Product.supplier_id)
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if supplier_id is not None:
+        query = query.filter(Product.supplier_id == supplier_id)
+    if product_id is not None:
+        query = query.filter(Product.id == product_id)
+    rows = query.all()
+    names = {r.id: (r.name, r.sku) for r in rows}
+    result = forecast_rows(db, rows, limit=limit, reorder_only=reorder_only)
+    for item in result:
+        item["product_name"], item["sku"] = names[item["product_id"]]
     return result
 
+@router.get("/group-commit/stats")
+def get_group_commit_stats(user: TokenUser = Depends(role_dependency("ADMIN"))):
+    return stock_group_writer.metrics()
+
+@router.post("/snapshots")
+def create_snapshot(db: Session = Depends(get_db), user: TokenUser = Depends(role_dependency("ADMIN"))):
+    snapshot = take_snapshot(db)
+    return {"id": snapshot.id, "taken_at": snapshot.taken_at}
+
 @router.post("/")
 def create_movement(mv: StockMovementCreate, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == mv.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
-
-    if mv.type == "OUT":
-        if product.quantity < mv.quantity:
-            raise HTTPException(status_code=400, detail="Stock insuffisant")
-        product.quantity -= mv.quantity
-    else:
-        product.quantity += mv.quantity
+    if mv.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantité invalide")
+    location_id = resolve_location(db, mv.location)
+    if stock_group_writer.running and location_id is None:
+        return stock_group_writer.submit(mv.product_id, mv.type, mv.quantity)
 
-    new_mv = StockMovement(product_id=mv.product_id, type=mv.type, quantity=mv.quantity)
+    change = move_stock(db, mv.product_id, mv.type, mv.quantity, location_id=location_id)
+    new_mv = StockMovement(product_id=mv.product_id, type=mv.type, quantity=mv.quantity, location_id=location_id)
     db.add(new_mv)
     db.commit()
+    publish_changes([change], [("movement.created", movement_event(new_mv))])
     db.refresh(new_mv)
-    db.refresh(product)
     return {
         "movement": new_mv,
-        "product": product,
+        "product": db.get(Product, mv.product_id),
     }
 
 @router.get("/product/{product_id}")
-def list_movements_by_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
+def list_movements_by_product(
+    product_id: int,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    type: Optional[Literal["IN", "OUT"]] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    if not db.query(Product.id).filter(Product.id == product_id).first():
         raise HTTPException(status_code=404, detail="Produit non trouvé")
 
-    movements = (
-        db.query(StockMovement)
-        .filter(StockMovement.product_id == product_id)
-        .order_by(StockMovement.movement_date.desc())
-        .all()
+    return list_movement_page(
+        db, response, limit, cursor,
+        date_from=date_from, date_to=date_to, type=type, product_id=product_id,
     )
-    result = []
-    for mv in movements:
-        mv_type = mv.type.value if hasattr(mv.type, "value") else str(mv.type)
-        result.append(
-            {
-                "id": mv.id,
-                "product_id": mv.product_id,
-                "product_name": product.name,
-                "sku": product.sku,
-                "type": mv_type,
-                "quantity": mv.quantity,
-                "movement_date": mv.movement_date,
-            }
-        )
-    return result
 
 @router.put("/{movement_id}")
 def update_movement(movement_id: int, mv: StockMovementCreate, db: Session = Depends(get_db)):
-    existing = db.query(StockMovement).filter(StockMovement.id == movement_id).first()
+    existing = db.query(StockMovement).filter(StockMovement.id == movement_id).with_for_update().first()
     if not existing:
         raise HTTPException(status_code=404, detail="Mouvement non trouvé")
 
@@ -99,29 +391,21 @@ def update_movement(movement_id: int, mv: StockMovementCreate, db: Session = Dep
     existing_type = existing.type.value if hasattr(existing.type, "value") else str(existing.type)
     if existing_type != mv.type:
         raise HTTPException(status_code=400, detail="Modification du type non supportée")
+    if mv.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantité invalide")
 
     diff = mv.quantity - existing.quantity
     if diff == 0:
         return existing
 
-    product = db.query(Product).filter(Product.id == existing.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
-
-    if mv.type == "OUT":
-        if diff > 0 and product.quantity < diff:
-            raise HTTPException(status_code=400, detail="Stock insuffisant")
-        product.quantity -= diff
-    else:
-        product.quantity += diff
-
+    change = move_stock(db, existing.product_id, mv.type, diff, day=movement_day(existing), location_id=existing.location_id)
     existing.quantity = mv.quantity
     db.commit()
+    publish_changes([change], [("movement.updated", movement_event(existing))])
     db.refresh(existing)
-    db.refresh(product)
     return {
         "movement": existing,
-        "product": product,
+        "product": db.get(Product, existing.product_id),
     }
 
 @router.post("/add")
@@ -131,19 +415,19 @@ def add_stock(payload: StockAdjust, db: Session = Depends(get_db)):
     if payload.quantity <= 0:
         raise HTTPException(status_code=400, detail="Quantité invalide")
 
-    product = db.query(Product).filter(Product.id == payload.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
+    location_id = resolve_location(db, payload.location)
+    if stock_group_writer.running and location_id is None:
+        return stock_group_writer.submit(payload.product_id, "IN", payload.quantity)
 
-    product.quantity += payload.quantity
-    mv = StockMovement(product_id=payload.product_id, type="IN", quantity=payload.quantity)
+    change = move_stock(db, payload.product_id, "IN", payload.quantity, location_id=location_id)
+    mv = StockMovement(product_id=payload.product_id, type="IN", quantity=payload.quantity, location_id=location_id)
     db.add(mv)
     db.commit()
+    publish_changes([change], [("movement.created", movement_event(mv))])
     db.refresh(mv)
-    db.refresh(product)
     return {
         "movement": mv,
-        "product": product,
+        "product": db.get(Product, payload.product_id),
     }
 
 @router.post("/remove")
@@ -153,38 +437,97 @@ def remove_stock(payload: StockAdjust, db: Session = Depends(get_db)):
     if payload.quantity <= 0:
         raise HTTPException(status_code=400, detail="Quantité invalide")
 
-    product = db.query(Product).filter(Product.id == payload.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
-    if product.quantity < payload.quantity:
-        raise HTTPException(status_code=400, detail="Stock insuffisant")
+    location_id = resolve_location(db, payload.location)
+    if stock_group_writer.running and location_id is None:
+        return stock_group_writer.submit(payload.product_id, "OUT", payload.quantity)
 
-    product.quantity -= payload.quantity
-    mv = StockMovement(product_id=payload.product_id, type="OUT", quantity=payload.quantity)
+    change = move_stock(db, payload.product_id, "OUT", payload.quantity, location_id=location_id)
+    mv = StockMovement(product_id=payload.product_id, type="OUT", quantity=payload.quantity, location_id=location_id)
     db.add(mv)
     db.commit()
+    publish_changes([change], [("movement.created", movement_event(mv))])
     db.refresh(mv)
-    db.refresh(product)
     return {
         "movement": mv,
-        "product": product,
+        "product": db.get(Product, payload.product_id),
+    }
+
+@router.post("/batch")
+def apply_stock_batch(payload: StockBatch, db: Session = Depends(get_db)):
+    # All lines are applied in one transaction: any invalid line rejects the batch
+    if not payload.lines:
+        raise HTTPException(status_code=400, detail="Aucune ligne")
+    for index, line in enumerate(payload.lines):
+        if line.quantity <= 0:
+            raise HTTPException(status_code=400, detail=f"Quantité invalide (ligne {index + 1})")
+
+    locations = {code: resolve_location(db, code) for code in {line.location for line in payload.lines}}
+
+    # One conditional update per (product, location) on the net quantity, in
+    # id order so concurrent batches take their row locks in the same order.
+    # Lines count in the order given: the stock must cover the lowest running
+    # total of each (product, location), so an OUT is refused when only a
+    # later IN of the batch would cover it
+    totals = {}
+    for line in payload.lines:
+        key = (line.product_id, locations[line.location] or 0)
+        product_totals = totals.setdefault(key, {"IN": 0, "OUT": 0, "lowest": 0})
+        product_totals[line.movement_type] += line.quantity
+        product_totals["lowest"] = min(product_totals["lowest"], product_totals["IN"] - product_totals["OUT"])
+
+    changes = []
+    for product_id, location_id in sorted(totals):
+        quantity_in, quantity_out, lowest = (totals[product_id, location_id][k] for k in ("IN", "OUT", "lowest"))
+        try:
+            change = apply_delta(db, product_id, quantity_in - quantity_out, location_id=location_id or None, lowest=lowest)
+        except HTTPException as e:
+            db.rollback()
+            raise HTTPException(status_code=e.status_code, detail=f"{e.detail} (produit {product_id})")
+        record_rollup(db, product_id, change.after.category_id, date.today(), quantity_in=quantity_in, quantity_out=quantity_out)
+        changes.append(change)
+
+    db.add_all([
+        StockMovement(product_id=line.product_id, type=line.movement_type, quantity=line.quantity, location_id=locations[line.location])
+        for line in payload.lines
+    ])
+    db.commit()
+    publish_changes(changes, [("movement.batch", {"movements": len(payload.lines), "product_ids": sorted({p for p, _ in totals})})])
+    return {
+        "movements": len(payload.lines),
+        "products": [{"product_id": pid, "quantity": quantity} for pid, quantity in {c.product_id: c.after.quantity for c in changes}.items()],
     }
 
+@router.post("/transfer")
+def transfer_between_locations(payload: StockTransferCreate, db: Session = Depends(get_db)):
+    if payload.quantity <= 0:
+        raise HTTPException(status_code=400, detail="Quantité invalide")
+    from_id = resolve_location(db, payload.from_location)
+    to_id = resolve_location(db, payload.to_location)
+    if from_id == to_id:
+        raise HTTPException(status_code=400, detail="Emplacements de départ et d'arrivée identiques")
+
+    transfer = transfer_stock(db, payload.product_id, payload.quantity, from_id, to_id)
+    db.commit()
+    db.refresh(transfer)
+    event_bus.publish("stock", "transfer", {
+        "id": transfer.id,
+        "product_id": transfer.product_id,
+        "from_location_id": from_id,
+        "to_location_id": to_id,
+        "quantity": transfer.quantity,
+    })
+    return transfer
+
 @router.delete("/{movement_id}")
 def delete_movement(movement_id: int, db: Session = Depends(get_db)):
-    mv = db.query(StockMovement).filter(StockMovement.id == movement_id).first()
+    mv = db.query(StockMovement).filter(StockMovement.id == movement_id).with_for_update().first()
     if not mv:
         raise HTTPException(status_code=404, detail="Mouvement non trouvé")
 
-    product = db.query(Product).filter(Product.id == mv.product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Produit non trouvé")
-
-    if mv.type == "OUT":
-        product.quantity += mv.quantity
-    else:
-        product.quantity -= mv.quantity
-
+    # Retract the movement: its quantity is taken back out of the rollup
+    change = move_stock(db, mv.product_id, mv.type, -mv.quantity, day=movement_day(mv), location_id=mv.location_id)
+    deleted = movement_event(mv)
     db.delete(mv)
     db.commit()
+    publish_changes([change], [("movement.deleted", deleted)])
     return {"detail": "Mouvement supprimé"}
@@ -1,22 +1,40 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Supplier
+from dependencies import get_db
+from models import Product, Supplier
+from forecast import forecast_rows
 from schemas import SupplierCreate, SupplierUpdate
 
 router = APIRouter(prefix="/suppliers", tags=["Suppliers"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.get("/")
 def list_suppliers(db: Session = Depends(get_db)):
     return db.query(Supplier).all()
 
+@router.get("/{supplier_id}/reorder-suggestions")
+def reorder_suggestions(supplier_id: int, db: Session = Depends(get_db)):
+    sup = db.query(Supplier).filter(Supplier.id == supplier_id).first()
+    if not sup:
+        raise HTTPException(status_code=404, detail="Fournisseur non trouvé")
+    rows = (
+        db.query(Product.id, Product.name, Product.sku, Product.price, Product.quantity, Product.reorder_qty)
+        .filter(Product.supplier_id == supplier_id)
+        .all()
+    )
+    by_id = {r.id: r for r in rows}
+    lines = forecast_rows(db, rows, reorder_only=True)
+    for line in lines:
+        product = by_id[line["product_id"]]
+        line["product_name"], line["sku"] = product.name, product.sku
+        line["amount"] = round(float(product.price) * line["suggested_qty"], 2)
+    return {
+        "supplier_id": sup.id,
+        "supplier_name": sup.name,
+        "lines": lines,
+        "total_qty": sum(line["suggested_qty"] for line in lines),
+        "total_amount": round(sum(line["amount"] for line in lines), 2),
+    }
+
 @router.post("/")
 def create_supplier(supplier: SupplierCreate, db: Session = Depends(get_db)):
     new_sup = Supplier(name=supplier.name, phone=supplier.phone, email=supplier.email)
@@ -1,30 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from database import SessionLocal
 from models import User
-from tools.hash_password import hash_password
+from passwords import password_hasher
 from schemas import UserCreate, UserUpdate, UserOut
-from dependencies import get_current_user, role_dependency
+from auth_tokens import TokenUser, revocations
+from dependencies import get_db, get_current_user, role_dependency
 from typing import List
 from fastapi import status
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 @router.post("/")
-def create_user(user: UserCreate, db: Session = Depends(get_db), current_user: User = Depends(role_dependency("ADMIN"))):
+def create_user(user: UserCreate, db: Session = Depends(get_db), current_user: TokenUser = Depends(role_dependency("ADMIN"))):
     existing = db.query(User).filter(User.email == user.email).first()
     if existing:
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
-    hashed_pwd = hash_password(user.password)
+    hashed_pwd = password_hasher.hash_sync(user.password)
     db_user = User(
         name=user.name,
         email=user.email,
@@ -38,7 +29,7 @@ def create_user(user: UserCreate, db: Session = Depends(get_db), current_user: U
 
 
 @router.get("/", response_model=List[UserOut])
-def list_users(db: Session = Depends(get_db), current_user: User = Depends(role_dependency(["ADMIN", "MANAGER"]))):
+def list_users(db: Session = Depends(get_db), current_user: TokenUser = Depends(role_dependency(["ADMIN", "MANAGER"]))):
     users = db.query(User).all()
     if not users:
         raise HTTPException(status_code=404, detail="Aucun utilisateur trouvé")
@@ -46,7 +37,7 @@ def list_users(db: Session = Depends(get_db), current_user: User = Depends(role_
 
 
 @router.get("/{user_id}", response_model=UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_user(user_id: int, db: Session = Depends(get_db), current_user: TokenUser = Depends(get_current_user)):
     target = db.query(User).filter(User.id == user_id).first()
     if not target:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
@@ -57,26 +48,34 @@ def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = D
 
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(role_dependency("ADMIN"))):
+def delete_user(user_id: int, db: Session = Depends(get_db), current_user: TokenUser = Depends(role_dependency("ADMIN"))):
     target = db.query(User).filter(User.id == user_id).first()
     if not target:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     db.delete(target)
+    revocations.revoke_user(db, user_id)
     db.commit()
     return {"detail": "Utilisateur supprimé"}
 
 
 @router.put("/{user_id}")
-def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db)):
+def update_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db), current_user: TokenUser = Depends(get_current_user)):
+    # Users edit their own account; only an admin edits others or changes a role
+    if current_user.role != "ADMIN" and (current_user.id != user_id or user.role is not None):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès interdit")
     db_user = db.query(User).filter(User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    credentials_changed = bool(user.password) or (user.role is not None and user.role != db_user.role)
     if user.password:
-        db_user.password = hash_password(user.password)
+        db_user.password = password_hasher.hash_sync(user.password)
     if user.name is not None:
         db_user.name = user.name
     if user.role is not None:
         db_user.role = user.role
+    if credentials_changed:
+        # Tokens issued before carry the old role or survive the old password
+        revocations.revoke_user(db, user_id)
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Literal
+from datetime import date
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Optional, Literal
 
 
 class ProductCreate(BaseModel):
@@ -11,6 +12,8 @@ class ProductCreate(BaseModel):
     category_id: Optional[int] = None
     supplier_id: Optional[int] = None
     image_url: Optional[str] = None
+    reorder_point: Optional[int] = Field(None, ge=0)
+    reorder_qty: Optional[int] = Field(None, ge=1)
 
 
 class ProductUpdate(BaseModel):
@@ -22,6 +25,8 @@ class ProductUpdate(BaseModel):
     category_id: Optional[int] = None
     supplier_id: Optional[int] = None
     image_url: Optional[str] = None
+    reorder_point: Optional[int] = Field(None, ge=0)
+    reorder_qty: Optional[int] = Field(None, ge=1)
 
 
 class CategoryCreate(BaseModel):
@@ -44,22 +49,43 @@ class SupplierUpdate(BaseModel):
     email: Optional[EmailStr] = None
 
 
-class OrderCreate(BaseModel):
+class OrderItemCreate(BaseModel):
     product_id: int
-    quantity: int
+    quantity: int = Field(..., ge=1)
+
+
+class OrderCreate(BaseModel):
+    items: Optional[List[OrderItemCreate]] = None
+    # Single-line shorthand, same as one entry in items
+    product_id: Optional[int] = None
+    quantity: Optional[int] = Field(None, ge=1)
     status: Optional[Literal["PENDING", "COMPLETED", "CANCELLED"]] = "PENDING"
 
 
 class OrderUpdate(BaseModel):
+    # Replaces every line of the order
+    items: Optional[List[OrderItemCreate]] = None
+    # Single-line shorthand, only for orders with one line
     product_id: Optional[int] = None
-    quantity: Optional[int] = None
+    quantity: Optional[int] = Field(None, ge=1)
     status: Optional[Literal["PENDING", "COMPLETED", "CANCELLED"]] = None
 
 
+class OrderFulfill(BaseModel):
+    # Either explicit orders or a filter over the PENDING ones (none = all of them)
+    order_ids: Optional[List[int]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    product_id: Optional[int] = None
+    location: Optional[str] = None
+    allow_partial: bool = True
+
+
 class StockMovementCreate(BaseModel):
     product_id: int
     type: Literal["IN", "OUT"]
     quantity: int
+    location: Optional[str] = None  # location code; none = stock held at no location
 
 
 class StockAdjust(BaseModel):
@@ -69,6 +95,34 @@ class StockAdjust(BaseModel):
     movement_type: Literal["IN", "OUT"]
 
 
+class StockBatchLine(BaseModel):
+    product_id: int
+    quantity: int
+    movement_type: Literal["IN", "OUT"]
+    location: Optional[str] = None
+
+
+class StockTransferCreate(BaseModel):
+    product_id: int
+    quantity: int
+    from_location: Optional[str] = None
+    to_location: Optional[str] = None
+
+
+class LocationCreate(BaseModel):
+    code: str
+    name: Optional[str] = None
+
+
+class LocationUpdate(BaseModel):
+    code: Optional[str] = None
+    name: Optional[str] = None
+
+
+class StockBatch(BaseModel):
+    lines: List[StockBatchLine]
+
+
 # User schemas
 class UserCreate(BaseModel):
     name: str
@@ -0,0 +1,210 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+FIELD_WEIGHTS = {"name": 3, "sku": 2, "description": 1}
+# Share of a query word's trigrams a vocabulary word must contain to match it
+MIN_WORD_SIMILARITY = 0.5
+MAX_WORD_MATCHES = 30
+# Lower bound on the candidates ranked exactly per query
+MIN_SCORED = 200
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse everything but letters/digits to spaces."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def word_trigrams(word: str) -> Set[str]:
+    """pg_trgm style trigrams: the word is padded with two leading and one trailing space."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ProductSearchIndex:
+    """In-memory search index over product name, SKU and description.
+
+    Two levels keep queries cheap at 100k products: each field has an inverted
+    index word -> product ids, and the vocabulary itself is indexed by trigram.
+    A query word is first matched against the vocabulary (typos and prefixes
+    included), then the matching words' posting sets are combined with C-level
+    set operations. Every query word must match (AND semantics).
+
+    The index lives in the worker process: it is built at startup and kept up
+    to date by the product write paths of that process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._postings: Dict[str, Dict[str, Set[int]]] = {f: defaultdict(set) for f in FIELD_WEIGHTS}
+        self._vocab: Dict[str, int] = defaultdict(int)
+        self._vocab_grams: Dict[str, Set[str]] = defaultdict(set)
+        self._skus: Dict[str, Set[int]] = defaultdict(set)
+        self._docs: Dict[int, Tuple[Dict[str, Set[str]], str]] = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def rebuild(self, rows: Iterable[Tuple[int, str, Optional[str], Optional[str]]]):
+        """Replace the index content with (id, name, sku, description) rows."""
+        with self._lock:
+            self._clear()
+            for row in rows:
+                self._add(*row)
+
+    def upsert(self, product_id: int, name: str, sku: Optional[str], description: Optional[str]):
+        with self._lock:
+            self._remove(product_id)
+            self._add(product_id, name, sku, description)
+
+    def upsert_product(self, product):
+        self.upsert(product.id, product.name, product.sku, product.description)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            self._remove(product_id)
+
+    def _add(self, product_id, name, sku, description):
+        fields = {
+            "name": set(normalize(name).split()),
+            "sku": set(normalize(sku).split()),
+            "description": set(normalize(description).split()),
+        }
+        for field, words in fields.items():
+            for word in words:
+                self._postings[field][word].add(product_id)
+                self._vocab[word] += 1
+                if self._vocab[word] == 1:
+                    for gram in word_trigrams(word):
+                        self._vocab_grams[gram].add(word)
+        compact_sku = normalize(sku).replace(" ", "")
+        if compact_sku:
+            self._skus[compact_sku].add(product_id)
+        self._docs[product_id] = (fields, compact_sku)
+
+    def _remove(self, product_id):
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        fields, compact_sku = doc
+        for field, words in fields.items():
+            for word in words:
+                ids = self._postings[field][word]
+                ids.discard(product_id)
+                if not ids:
+                    del self._postings[field][word]
+                self._vocab[word] -= 1
+                if not self._vocab[word]:
+                    del self._vocab[word]
+                    for gram in word_trigrams(word):
+                        self._vocab_grams[gram].discard(word)
+                        if not self._vocab_grams[gram]:
+                            del self._vocab_grams[gram]
+        if compact_sku:
+            self._skus[compact_sku].discard(product_id)
+            if not self._skus[compact_sku]:
+                del self._skus[compact_sku]
+
+    def _match_words(self, word: str) -> List[Tuple[float, str]]:
+        """Vocabulary words similar to ``word`` as (similarity, word), best first."""
+        grams = word_trigrams(word)
+        postings = sorted((self._vocab_grams.get(g, ()) for g in grams), key=len)
+        required = max(1, math.ceil(MIN_WORD_SIMILARITY * len(postings)))
+        # A word sharing `required` trigrams must appear in one of the
+        # (len - required + 1) rarest posting sets; the others are only probed.
+        prefix = len(postings) - required + 1
+        hits: Dict[str, int] = defaultdict(int)
+        for posting in postings[:prefix]:
+            for candidate in posting:
+                hits[candidate] += 1
+        for posting in postings[prefix:]:
+            for candidate in hits:
+                if candidate in posting:
+                    hits[candidate] += 1
+
+        matches = []
+        for candidate, count in hits.items():
+            if count < required:
+                continue
+            if candidate == word:
+                similarity = 1.0
+            else:
+                similarity = count / (len(grams) + len(word_trigrams(candidate)) - count)
+                if candidate.startswith(word):
+                    similarity = max(similarity, 0.5)
+            matches.append((similarity, candidate))
+        matches.sort(reverse=True)
+        return matches[:MAX_WORD_MATCHES]
+
+    def _tiers(self, word: str) -> List[Tuple[float, Set[int]]]:
+        tiers = []
+        for similarity, match in self._match_words(word):
+            for field, weight in FIELD_WEIGHTS.items():
+                ids = self._postings[field].get(match)
+                if ids:
+                    tiers.append((similarity * weight, ids))
+        tiers.sort(key=lambda t: -t[0])
+        return tiers
+
+    def search(self, query: str, limit: int = 20) -> List[Tuple[int, float]]:
+        """Return up to ``limit`` (product_id, score) pairs, best first."""
+        words = list(dict.fromkeys(normalize(query).split()))
+        if not words:
+            return []
+        with self._lock:
+            exact_sku = set(self._skus.get("".join(words), ()))
+            word_tiers = [self._tiers(word) for word in words]
+            if not all(word_tiers):
+                word_tiers = []
+            # The word with the fewest matching products drives the scan; the
+            # other words are only probed, so common words cost no set copies.
+            sizes = [sum(len(ids) for _, ids in tiers) for tiers in word_tiers]
+            order = sorted(range(len(word_tiers)), key=lambda i: sizes[i])
+
+            def score(product_id):
+                total = 0.0
+                for tiers in word_tiers:
+                    for tier_score, ids in tiers:
+                        if product_id in ids:
+                            total += tier_score
+                            break
+                    else:
+                        return None
+                total /= len(words) * FIELD_WEIGHTS["name"]
+                if product_id in exact_sku:
+                    total += 2
+                return total
+
+            # Candidates are visited in the order of the driving word's best
+            # tiers and only the first `pool` are ranked exactly, which bounds
+            # the work for very common words.
+            pool = max(MIN_SCORED, limit * 10)
+            scored = {product_id: score(product_id) or 2.0 for product_id in exact_sku}
+            for _, ids in (word_tiers[order[0]] if order else ()):
+                for product_id in ids:
+                    if product_id not in scored:
+                        value = score(product_id)
+                        if value is not None:
+                            scored[product_id] = value
+                            if len(scored) >= pool:
+                                break
+                if len(scored) >= pool:
+                    break
+
+        results = sorted(scored.items(), key=lambda r: (-r[1], r[0]))[:limit]
+        return [(product_id, round(s, 4)) for product_id, s in results]
+
+
+product_index = ProductSearchIndex()
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from decimal import Decimal
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Product
+
+# Counters are per worker process; reload them from the database this often
+# so writes made by other workers (or by hand) are eventually picked up.
+STATS_RESYNC_SECONDS = float(os.getenv("STATS_RESYNC_SECONDS", "60"))
+
+
+class ProductState(NamedTuple):
+    category_id: Optional[int]
+    quantity: int
+    price: Decimal
+
+
+def product_state(product) -> Optional[ProductState]:
+    """Capture the fields the counters depend on (None for a missing product)."""
+    if product is None:
+        return None
+    return ProductState(product.category_id, int(product.quantity or 0), Decimal(str(product.price or 0)))
+
+
+class StockStats:
+    """Per-category product count, stock quantity and stock value.
+
+    Loaded with one grouped aggregate over products, then maintained by the
+    product and stock write paths through apply(before, after), so reads
+    never touch the products table.
+    """
+
+    def __init__(self, resync_seconds: float = STATS_RESYNC_SECONDS):
+        self._lock = threading.Lock()
+        self._resync_seconds = resync_seconds
+        self._by_category: Dict[Optional[int], list] = {}
+        self._loaded_at: Optional[float] = None
+
+    def load(self, db: Session):
+        rows = (
+            db.query(
+                Product.category_id,
+                func.count(Product.id),
+                func.coalesce(func.sum(Product.quantity), 0),
+                func.coalesce(func.sum(Product.price * Product.quantity), 0),
+            )
+            .group_by(Product.category_id)
+            .all()
+        )
+        with self._lock:
+            self._by_category = {
+                category_id: [int(count), int(quantity), Decimal(str(value))]
+                for category_id, count, quantity, value in rows
+            }
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self, db: Session):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self._resync_seconds:
+            self.load(db)
+
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self._resync_seconds
+
+    def ensure_fresh(self, session_factory):
+        """ensure_loaded with a session of its own, only opened when a reload is due."""
+        if not self.needs_load():
+            return
+        with session_factory() as db:
+            self.ensure_loaded(db)
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def apply(self, before: Optional[ProductState], after: Optional[ProductState]):
+        """Move one product's contribution from its ``before`` to its ``after`` state."""
+        if before == after:
+            return
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for state, sign in ((before, -1), (after, 1)):
+                if state is None:
+                    continue
+                counters = self._by_category.setdefault(state.category_id, [0, 0, Decimal(0)])
+                counters[0] += sign
+                counters[1] += sign * state.quantity
+                counters[2] += sign * state.quantity * state.price
+
+    def category(self, category_id: Optional[int]):
+        """Return (count, quantity, value) for a category."""
+        with self._lock:
+            count, quantity, value = self._by_category.get(category_id, (0, 0, Decimal(0)))
+        return count, quantity, value
+
+    def totals(self):
+        """Return (total quantity, total value) across all products."""
+        with self._lock:
+            quantity = sum(c[1] for c in self._by_category.values())
+            value = sum((c[2] for c in self._by_category.values()), Decimal(0))
+        return quantity, value
+
+
+stock_stats = StockStats()
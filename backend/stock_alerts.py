@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy.orm import Session
+
+from models import Product
+from stats_engine import STATS_RESYNC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ReorderLevel(NamedTuple):
+    quantity: int
+    reorder_point: int
+    reorder_qty: Optional[int]
+
+    @property
+    def margin(self) -> int:
+        """Units left above the reorder point (<= 0 means the product must be reordered)."""
+        return self.quantity - self.reorder_point
+
+
+def reorder_level(product) -> Optional[ReorderLevel]:
+    """Capture the fields the alerts depend on (None when no reorder point is set)."""
+    if product is None or product.reorder_point is None:
+        return None
+    return ReorderLevel(int(product.quantity or 0), int(product.reorder_point), product.reorder_qty)
+
+
+class StockAlerts:
+    """Products at or below their reorder point, maintained incrementally.
+
+    Every product with a reorder point is tracked with its quantity; the
+    breached ones are kept apart, so listing alerts costs O(k log k) for k
+    alerts whatever the catalog size. Stock writes report quantity changes
+    through set_quantity(), product writes through observe().
+
+    Subscribers are called with an alert dict when a product crosses its
+    reorder point (``"status": "breach"``) and when it is restocked above it
+    (``"status": "resolved"``), after the change has been committed.
+    """
+
+    def __init__(self, resync_seconds: float = STATS_RESYNC_SECONDS):
+        self._lock = threading.Lock()
+        self._resync_seconds = resync_seconds
+        self._levels: Dict[int, ReorderLevel] = {}
+        self._breached: Dict[int, ReorderLevel] = {}
+        self._subscribers: List[Callable[[dict], None]] = []
+        self._loaded_at: Optional[float] = None
+
+    def subscribe(self, callback: Callable[[dict], None]) -> Callable[[], None]:
+        """Register ``callback``; returns a function that unsubscribes it."""
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+    def load(self, db: Session):
+        rows = (
+            db.query(Product.id, Product.quantity, Product.reorder_point, Product.reorder_qty)
+            .filter(Product.reorder_point.isnot(None))
+            .all()
+        )
+        levels = {row.id: reorder_level(row) for row in rows}
+        with self._lock:
+            notify = self._loaded_at is not None
+            previous = self._breached
+            self._levels = levels
+            self._breached = {pid: level for pid, level in levels.items() if level.margin <= 0}
+            self._loaded_at = time.monotonic()
+            events = [] if not notify else (
+                [self._event(pid, level, "breach") for pid, level in self._breached.items() if pid not in previous]
+                + [self._event(pid, levels.get(pid), "resolved") for pid in previous if pid not in self._breached]
+            )
+        self._notify(events)
+
+    def ensure_loaded(self, db: Session):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self._resync_seconds:
+            self.load(db)
+
+    def needs_load(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self._resync_seconds
+
+    def ensure_fresh(self, session_factory):
+        """ensure_loaded with a session of its own, only opened when a reload is due."""
+        if not self.needs_load():
+            return
+        with session_factory() as db:
+            self.ensure_loaded(db)
+
+    def observe(self, product_id: int, level: Optional[ReorderLevel]):
+        """Record a product's current level (None once it is deleted or has no reorder point)."""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            event = self._set(product_id, level)
+        self._notify([event] if event else [])
+
+    def set_quantity(self, product_id: int, quantity: int):
+        """Record a committed quantity change for a product."""
+        with self._lock:
+            level = self._levels.get(product_id)
+            if self._loaded_at is None or level is None:
+                return
+            event = self._set(product_id, level._replace(quantity=quantity))
+        self._notify([event] if event else [])
+
+    def _set(self, product_id: int, level: Optional[ReorderLevel]) -> Optional[dict]:
+        was_breached = product_id in self._breached
+        if level is None:
+            self._levels.pop(product_id, None)
+            self._breached.pop(product_id, None)
+            return self._event(product_id, None, "resolved") if was_breached else None
+        self._levels[product_id] = level
+        if level.margin <= 0:
+            self._breached[product_id] = level
+            return None if was_breached else self._event(product_id, level, "breach")
+        self._breached.pop(product_id, None)
+        return self._event(product_id, level, "resolved") if was_breached else None
+
+    @staticmethod
+    def _event(product_id: int, level: Optional[ReorderLevel], status: str) -> dict:
+        event = {"product_id": product_id, "status": status}
+        if level is not None:
+            event.update(level._asdict())
+        return event
+
+    def _notify(self, events: List[dict]):
+        for event in events:
+            for callback in list(self._subscribers):
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception("Abonné aux alertes de stock en échec")
+
+    def breaches(self, limit: Optional[int] = None) -> List[tuple]:
+        """(product_id, level) of breached products, most depleted first."""
+        with self._lock:
+            items = list(self._breached.items())
+        items.sort(key=lambda item: (item[1].margin, item[0]))
+        return items[:limit] if limit is not None else items
+
+
+stock_alerts = StockAlerts()
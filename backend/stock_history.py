@@ -0,0 +1,179 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import case, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from models import Product, StockMovement, StockSnapshot, StockSnapshotLine
+from movement_archive import archive_months, movement_archive
+
+
+class StockPosition(NamedTuple):
+    product_id: int
+    category_id: Optional[int]
+    quantity: int
+    price: Decimal
+
+
+def take_snapshot(db: Session, taken_at: Optional[datetime] = None) -> StockSnapshot:
+    """Copy every product's quantity and price into a new snapshot, set-based.
+
+    ``taken_at`` is read after the copy, in the same transaction: the copy
+    share-locks the product rows until the commit, so a stock write either
+    is in the copied quantities with a movement dated before ``taken_at``,
+    or waits and dates its movement after it. Replaying the movements from
+    ``taken_at`` then counts each one exactly once.
+    """
+    snapshot = StockSnapshot(taken_at=taken_at or datetime.now())
+    db.add(snapshot)
+    db.flush()
+    db.execute(
+        insert(StockSnapshotLine).from_select(
+            ["snapshot_id", "product_id", "category_id", "quantity", "price"],
+            select(literal(snapshot.id), Product.id, Product.category_id, Product.quantity, Product.price)
+            .with_for_update(read=True),
+        )
+    )
+    if taken_at is None:
+        snapshot.taken_at = datetime.now()
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
+
+
+def net_movements(db: Session, after: datetime, until: datetime) -> Dict[int, int]:
+    """Net quantity (IN - OUT) per product for movements in (after, until].
+
+    The part of the window before the archive cutoff is read from the
+    archived months, the rest from stock_movements.
+    """
+    net: Dict[int, int] = {}
+    cutoff = movement_archive.cutoff()
+    if cutoff and after < cutoff:
+        net = movement_archive.net_movements(after, until)
+        after = max(after, cutoff - timedelta(microseconds=1))
+    if cutoff and until < cutoff:
+        return net
+    signed = case((StockMovement.type == "IN", StockMovement.quantity), else_=-StockMovement.quantity)
+    rows = (
+        db.query(StockMovement.product_id, func.sum(signed))
+        .filter(StockMovement.movement_date > after, StockMovement.movement_date <= until)
+        .group_by(StockMovement.product_id)
+        .all()
+    )
+    for product_id, quantity in rows:
+        net[product_id] = net.get(product_id, 0) + int(quantity or 0)
+    return net
+
+
+def _current_positions(db: Session) -> Dict[int, StockPosition]:
+    return {
+        row.id: StockPosition(row.id, row.category_id, int(row.quantity or 0), Decimal(str(row.price or 0)))
+        for row in db.query(Product.id, Product.category_id, Product.quantity, Product.price)
+    }
+
+
+def _snapshot_positions(db: Session, snapshot: StockSnapshot) -> Dict[int, StockPosition]:
+    return {
+        row.product_id: StockPosition(row.product_id, row.category_id, int(row.quantity), Decimal(str(row.price)))
+        for row in db.query(StockSnapshotLine).filter(StockSnapshotLine.snapshot_id == snapshot.id)
+    }
+
+
+def stock_as_of(db: Session, at: datetime) -> Tuple[Dict[int, StockPosition], dict]:
+    """Reconstruct per-product stock at ``at``.
+
+    Starts from the closest anchor in time: the last snapshot before ``at``
+    (replayed forward), the first snapshot after it or the live product
+    table (both replayed backward). Only the movements between the anchor
+    and ``at`` are read. Returns the positions and a description of the
+    anchor used.
+    """
+    now = datetime.now()
+    anchors = []
+    if at < now:
+        anchors.append((now - at, "current", None))
+    before = (
+        db.query(StockSnapshot).filter(StockSnapshot.taken_at <= at)
+        .order_by(StockSnapshot.taken_at.desc()).first()
+    )
+    if before:
+        anchors.append((at - before.taken_at, "forward", before))
+    after = (
+        db.query(StockSnapshot).filter(StockSnapshot.taken_at > at)
+        .order_by(StockSnapshot.taken_at.asc()).first()
+    )
+    if after:
+        anchors.append((after.taken_at - at, "backward", after))
+    if not anchors:
+        # ``at`` is in the future and there is no snapshot at all
+        return _current_positions(db), {"anchor": "current"}
+
+    _, direction, snapshot = min(anchors, key=lambda a: a[0])
+    if direction == "current":
+        positions = _current_positions(db)
+        delta = net_movements(db, at, now)
+        sign = -1
+        source = {"anchor": "current"}
+    elif direction == "forward":
+        positions = _snapshot_positions(db, snapshot)
+        delta = net_movements(db, snapshot.taken_at, at)
+        sign = 1
+        source = {"anchor": "snapshot", "snapshot_id": snapshot.id, "taken_at": snapshot.taken_at}
+    else:
+        positions = _snapshot_positions(db, snapshot)
+        delta = net_movements(db, at, snapshot.taken_at)
+        sign = -1
+        source = {"anchor": "snapshot", "snapshot_id": snapshot.id, "taken_at": snapshot.taken_at}
+
+    missing = [product_id for product_id in delta if product_id not in positions]
+    if missing:
+        # Products created after the snapshot: take their category and price from today
+        for row in db.query(Product.id, Product.category_id, Product.price).filter(Product.id.in_(missing)):
+            positions[row.id] = StockPosition(row.id, row.category_id, 0, Decimal(str(row.price or 0)))
+    for product_id, net in delta.items():
+        position = positions.get(product_id)
+        if position is not None:
+            positions[product_id] = position._replace(quantity=position.quantity + sign * net)
+    source["products_replayed"] = len(delta)
+    return positions, source
+
+
+def take_snapshot_as_of(db: Session, at: datetime) -> StockSnapshot:
+    """Snapshot the stock as it was at ``at``, reconstructed from the ledger."""
+    positions, _ = stock_as_of(db, at)
+    snapshot = StockSnapshot(taken_at=at)
+    db.add(snapshot)
+    db.flush()
+    db.bulk_insert_mappings(StockSnapshotLine, [
+        {
+            "snapshot_id": snapshot.id,
+            "product_id": p.product_id,
+            "category_id": p.category_id,
+            "quantity": p.quantity,
+            "price": p.price,
+        }
+        for p in positions.values()
+    ])
+    db.commit()
+    db.refresh(snapshot)
+    return snapshot
+
+
+def archive_closed_months(db: Session, keep_months: int = 12) -> List[dict]:
+    """Archive the movements of every month older than the last ``keep_months``.
+
+    A snapshot is first taken at the cutoff while its movements are still
+    in the table: it carries the balances forward, so as-of queries after
+    the cutoff never read the archive.
+    """
+    today = date.today()
+    months = today.year * 12 + today.month - 1 - keep_months
+    cutoff = datetime(months // 12, months % 12 + 1, 1)
+    has_old = db.query(StockMovement.id).filter(StockMovement.movement_date < cutoff).first()
+    if not has_old:
+        return []
+    if not db.query(StockSnapshot.id).filter(StockSnapshot.taken_at == cutoff).first():
+        take_snapshot_as_of(db, cutoff)
+    return archive_months(db, cutoff)
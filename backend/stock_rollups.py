@@ -0,0 +1,171 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Product, StockDailyRollup, StockMovement
+from movement_archive import movement_archive
+
+MONTHS_FR = ["Jan", "Fév", "Mar", "Avr", "Mai", "Juin", "Jul", "Aoû", "Sep", "Oct", "Nov", "Déc"]
+
+
+def movement_day(movement: StockMovement) -> date:
+    """Day a movement is rolled up under (today for a movement not flushed yet)."""
+    return movement.movement_date.date() if movement.movement_date else date.today()
+
+
+def record_rollup(db: Session, product_id: int, category_id: Optional[int], day: date, quantity_in: int = 0, quantity_out: int = 0):
+    """Add signed IN/OUT quantities to a product's rollup row for ``day``.
+
+    Runs inside the caller's transaction so the rollup commits (or rolls
+    back) together with the movement it mirrors.
+    """
+    if not quantity_in and not quantity_out:
+        return
+    bump = (
+        update(StockDailyRollup)
+        .where(StockDailyRollup.day == day, StockDailyRollup.product_id == product_id)
+        .values(
+            quantity_in=StockDailyRollup.quantity_in + quantity_in,
+            quantity_out=StockDailyRollup.quantity_out + quantity_out,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if db.execute(bump).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.add(StockDailyRollup(
+                day=day, product_id=product_id, category_id=category_id,
+                quantity_in=quantity_in, quantity_out=quantity_out,
+            ))
+    except IntegrityError:
+        # Another transaction created the row first
+        db.execute(bump)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute the rollup rows from the movement ledger; returns the row count.
+
+    Days before the archive cutoff are kept as they are: their movements
+    are no longer in the table.
+    """
+    cutoff = movement_archive.cutoff()
+    day = func.date(StockMovement.movement_date)
+    query = (
+        db.query(
+            day.label("day"),
+            StockMovement.product_id,
+            Product.category_id,
+            StockMovement.type,
+            func.sum(StockMovement.quantity),
+        )
+        .join(Product, Product.id == StockMovement.product_id)
+        .group_by(day, StockMovement.product_id, Product.category_id, StockMovement.type)
+    )
+    if cutoff:
+        query = query.filter(StockMovement.movement_date >= cutoff)
+    rows = query.all()
+    rollups = {}
+    for movement_date, product_id, category_id, movement_type, quantity in rows:
+        if isinstance(movement_date, str):
+            movement_date = date.fromisoformat(movement_date)
+        key = (movement_date, product_id)
+        rollup = rollups.setdefault(key, {
+            "day": movement_date, "product_id": product_id, "category_id": category_id,
+            "quantity_in": 0, "quantity_out": 0,
+        })
+        movement_type = movement_type.value if hasattr(movement_type, "value") else str(movement_type)
+        rollup["quantity_in" if movement_type == "IN" else "quantity_out"] += int(quantity)
+
+    stale = db.query(StockDailyRollup)
+    if cutoff:
+        stale = stale.filter(StockDailyRollup.day >= cutoff.date())
+    stale.delete(synchronize_session=False)
+    if rollups:
+        db.bulk_insert_mappings(StockDailyRollup, list(rollups.values()))
+    db.commit()
+    return len(rollups)
+
+
+def _filtered(query, category_id: Optional[int], product_id: Optional[int]):
+    if category_id is not None:
+        query = query.filter(StockDailyRollup.category_id == category_id)
+    if product_id is not None:
+        query = query.filter(StockDailyRollup.product_id == product_id)
+    return query
+
+
+def stock_trend(db: Session, days: int, current_stock: int, category_id: Optional[int] = None, product_id: Optional[int] = None) -> List[dict]:
+    """Daily entries, exits and end-of-day stock for the last ``days`` days.
+
+    End-of-day stock is walked back from the current stock using the net
+    of each later day, so only rollup rows inside the window are read.
+    """
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+    rows = _filtered(
+        db.query(
+            StockDailyRollup.day,
+            func.sum(StockDailyRollup.quantity_in),
+            func.sum(StockDailyRollup.quantity_out),
+        ).filter(StockDailyRollup.day >= start),
+        category_id, product_id,
+    ).group_by(StockDailyRollup.day).all()
+    by_day = {d if isinstance(d, date) else date.fromisoformat(d): (int(i or 0), int(o or 0)) for d, i, o in rows}
+
+    result = []
+    stock = current_stock
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        quantity_in, quantity_out = by_day.get(day, (0, 0))
+        result.append({
+            "date": day.isoformat(),
+            "entrees": quantity_in,
+            "sorties": quantity_out,
+            "net": quantity_in - quantity_out,
+            "stock": stock,
+        })
+        stock -= quantity_in - quantity_out
+    result.reverse()
+    return result
+
+
+def stock_value_evolution(db: Session, months: int, current_value: Decimal, category_id: Optional[int] = None) -> List[dict]:
+    """Stock value at the end of each of the last ``months`` months.
+
+    Each month-end value is the current value minus the net movements after
+    it, valued at the current product price, read from one grouped query.
+    """
+    today = date.today()
+    first_months = []
+    year, month = today.year, today.month
+    for _ in range(months):
+        first_months.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+
+    net_value = (StockDailyRollup.quantity_in - StockDailyRollup.quantity_out) * Product.price
+    year_col = func.extract("year", StockDailyRollup.day)
+    month_col = func.extract("month", StockDailyRollup.day)
+    rows = _filtered(
+        db.query(year_col, month_col, func.sum(net_value))
+        .join(Product, Product.id == StockDailyRollup.product_id)
+        .filter(StockDailyRollup.day >= first_months[-1]),
+        category_id, None,
+    ).group_by(year_col, month_col).all()
+    by_month = {(int(y), int(m)): Decimal(str(v or 0)) for y, m, v in rows}
+
+    result = []
+    value = Decimal(str(current_value))
+    for first in first_months:
+        result.append({
+            "month": MONTHS_FR[first.month - 1],
+            "valeur": round(float(value), 2),
+            "date": first.isoformat(),
+        })
+        value -= by_month.get((first.year, first.month), Decimal(0))
+    result.reverse()
+    return result
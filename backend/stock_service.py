@@ -0,0 +1,195 @@
+from datetime import date
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Location, Product, StockLevel, StockTransfer
+from stats_engine import ProductState, product_state, stock_stats
+from event_bus import event_bus
+from forecast import demand_cache
+from stock_alerts import stock_alerts
+from stock_rollups import record_rollup
+
+
+class StockChange(NamedTuple):
+    product_id: int
+    before: ProductState
+    after: ProductState
+    location_id: Optional[int] = None
+    location_quantity: Optional[int] = None
+
+
+def resolve_location(db: Session, code: Optional[str]) -> Optional[int]:
+    """Id of the location with this code (None for no location); 404 if unknown."""
+    if code is None or code == "":
+        return None
+    location_id = db.query(Location.id).filter(Location.code == code).scalar()
+    if location_id is None:
+        raise HTTPException(status_code=404, detail="Emplacement non trouvé")
+    return location_id
+
+
+def apply_level_delta(db: Session, product_id: int, location_id: int, delta: int, lowest: Optional[int] = None) -> int:
+    """Add ``delta`` to a product's quantity at one location; returns the new level.
+
+    Same conditional-update scheme as apply_delta: a decrement only matches
+    while the location holds enough, an increment creates the row if needed.
+    """
+    lowest = min(delta, 0 if lowest is None else lowest)
+    stmt = (
+        update(StockLevel)
+        .where(StockLevel.product_id == product_id, StockLevel.location_id == location_id)
+        .values(quantity=StockLevel.quantity + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if lowest < 0:
+        stmt = stmt.where(StockLevel.quantity + lowest >= 0)
+    if not db.execute(stmt).rowcount:
+        if lowest < 0:
+            raise HTTPException(status_code=400, detail="Stock insuffisant à cet emplacement")
+        try:
+            with db.begin_nested():
+                db.add(StockLevel(product_id=product_id, location_id=location_id, quantity=delta))
+        except IntegrityError:
+            # Another transaction created the row first
+            db.execute(stmt)
+    return db.query(StockLevel.quantity).filter(
+        StockLevel.product_id == product_id, StockLevel.location_id == location_id
+    ).scalar()
+
+
+def apply_delta(db: Session, product_id: int, delta: int, location_id: Optional[int] = None, lowest: Optional[int] = None) -> StockChange:
+    """Add ``delta`` to a product's quantity with one conditional UPDATE.
+
+    A decrement only matches the row while enough stock is left, so
+    concurrent requests can never take the stock below zero or lose each
+    other's updates, and no lock is held before the write itself. With a
+    location the level there moves too and counts in located_quantity;
+    without one, only the stock held at no location can be taken.
+
+    When ``delta`` nets several changes applied in order, ``lowest`` is the
+    lowest running total they reach: the stock must cover that, not just
+    the net, as if each change had been applied on its own.
+    """
+    lowest = min(delta, 0 if lowest is None else lowest)
+    location_quantity = None
+    if location_id is not None:
+        location_quantity = apply_level_delta(db, product_id, location_id, delta, lowest)
+    values = {"quantity": Product.quantity + delta}
+    if location_id is not None:
+        values["located_quantity"] = Product.located_quantity + delta
+    stmt = (
+        update(Product)
+        .where(Product.id == product_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if lowest < 0 and location_id is None:
+        stmt = stmt.where(Product.quantity + lowest >= Product.located_quantity)
+    matched = db.execute(stmt).rowcount
+
+    row = (
+        db.query(Product.id, Product.category_id, Product.quantity, Product.price)
+        .filter(Product.id == product_id)
+        .first()
+    )
+    if row is None:
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+    if not matched:
+        raise HTTPException(status_code=400, detail="Stock insuffisant")
+    after = product_state(row)
+    return StockChange(product_id, after._replace(quantity=after.quantity - delta), after, location_id, location_quantity)
+
+
+def move_stock(db: Session, product_id: int, movement_type: str, quantity: int, day: Optional[date] = None, location_id: Optional[int] = None) -> StockChange:
+    """Apply an IN/OUT of ``quantity`` (negative to retract one) and roll it up.
+
+    The caller adds the StockMovement row and commits; on any error it must
+    roll back, which also undoes the quantity change.
+    """
+    movement_type = movement_type.value if hasattr(movement_type, "value") else str(movement_type)
+    delta = quantity if movement_type == "IN" else -quantity
+    change = apply_delta(db, product_id, delta, location_id=location_id)
+    if movement_type == "IN":
+        record_rollup(db, product_id, change.after.category_id, day or date.today(), quantity_in=quantity)
+    else:
+        record_rollup(db, product_id, change.after.category_id, day or date.today(), quantity_out=quantity)
+    return change
+
+
+def transfer_stock(db: Session, product_id: int, quantity: int, from_location_id: Optional[int], to_location_id: Optional[int]) -> StockTransfer:
+    """Move ``quantity`` between two locations (None = stock held at no location).
+
+    Only the levels and located_quantity change; the product total, the
+    movement ledger and the rollups do not. The caller commits.
+    """
+    if not db.query(Product.id).filter(Product.id == product_id).first():
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+    if from_location_id is not None:
+        apply_level_delta(db, product_id, from_location_id, -quantity)
+    else:
+        # Taken from the stock held at no location
+        moved = db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.quantity - Product.located_quantity >= quantity)
+            .values(located_quantity=Product.located_quantity + quantity)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not moved:
+            raise HTTPException(status_code=400, detail="Stock insuffisant")
+    if to_location_id is not None:
+        apply_level_delta(db, product_id, to_location_id, quantity)
+    else:
+        db.execute(
+            update(Product)
+            .where(Product.id == product_id)
+            .values(located_quantity=Product.located_quantity - quantity)
+            .execution_options(synchronize_session=False)
+        )
+    transfer = StockTransfer(
+        product_id=product_id, from_location_id=from_location_id,
+        to_location_id=to_location_id, quantity=quantity,
+    )
+    db.add(transfer)
+    return transfer
+
+
+def movement_event(movement) -> dict:
+    """Compact event payload for a stock movement (ORM object or dict)."""
+    get = movement.get if isinstance(movement, dict) else lambda key: getattr(movement, key)
+    mv_type = get("type")
+    return {
+        "id": get("id"),
+        "product_id": get("product_id"),
+        "type": mv_type.value if hasattr(mv_type, "value") else str(mv_type),
+        "quantity": get("quantity"),
+        "movement_date": get("movement_date"),
+        "location_id": get("location_id"),
+    }
+
+
+def publish_changes(changes: Iterable[StockChange], movements: Iterable[Tuple[str, dict]] = ()):
+    """Propagate committed changes to the in-process read models and the event feed.
+
+    ``movements`` are (event type, payload) pairs for the movement rows
+    written with the changes.
+    """
+    demand_cache.invalidate()
+    for change in changes:
+        stock_stats.apply(change.before, change.after)
+        if change.after.quantity != change.before.quantity:
+            stock_alerts.set_quantity(change.product_id, change.after.quantity)
+            event = {
+                "product_id": change.product_id,
+                "category_id": change.after.category_id,
+                "quantity": change.after.quantity,
+                "delta": change.after.quantity - change.before.quantity,
+            }
+            if change.location_id is not None:
+                event.update(location_id=change.location_id, location_quantity=change.location_quantity)
+            event_bus.publish("stock", "quantity", event)
+    for type, data in movements:
+        event_bus.publish("stock", type, data)
@@ -0,0 +1,70 @@
+import pytest
+from fastapi import HTTPException
+
+import auth_tokens
+from auth_tokens import (
+    RevocationList, TokenUser, authenticate, create_access_token, create_refresh_token, decode_token,
+    rotate_refresh_token,
+)
+from models import RefreshToken, User
+
+
+def token_user(token: str) -> TokenUser:
+    claims = decode_token(token, "access")
+    return TokenUser(int(claims["sub"]), claims["role"], claims["jti"], float(claims["iat"]), int(claims["exp"]))
+
+
+@pytest.fixture
+def user(db, monkeypatch):
+    # A revocation list of its own: the module-level one is shared by the whole process
+    monkeypatch.setattr(auth_tokens, "revocations", RevocationList())
+    user = User(name="U", email="u@example.com", password="x", role="MANAGER")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_rotation_consumes_the_refresh_token(db, user):
+    token = create_refresh_token(db, user.id)
+    db.commit()
+    assert rotate_refresh_token(db, token) == user.id
+    db.commit()
+    assert db.query(RefreshToken.revoked).scalar() is True
+
+
+def test_reused_refresh_token_revokes_the_user(db, user):
+    access = create_access_token(user)
+    stolen = create_refresh_token(db, user.id)
+    db.commit()
+    rotate_refresh_token(db, stolen)
+    current = create_refresh_token(db, user.id)
+    db.commit()
+
+    with pytest.raises(HTTPException) as e:
+        rotate_refresh_token(db, stolen)
+    assert (e.value.status_code, e.value.detail) == (401, "Jeton révoqué")
+
+    # Every refresh token and the access tokens issued so far stop working
+    with pytest.raises(HTTPException):
+        rotate_refresh_token(db, current)
+    with pytest.raises(HTTPException) as e:
+        authenticate(access)
+    assert e.value.detail == "Jeton révoqué"
+    # A new login right after, even within the same second, is accepted
+    assert authenticate(create_access_token(user)).id == user.id
+
+
+def test_user_revocation_survives_a_reload(db, user):
+    access = create_access_token(user)
+    stolen = create_refresh_token(db, user.id)
+    db.commit()
+    rotate_refresh_token(db, stolen)
+    db.commit()
+    with pytest.raises(HTTPException):
+        rotate_refresh_token(db, stolen)
+
+    # As another worker sees it, from the revoked_tokens table
+    other = RevocationList()
+    other.load(db)
+    assert other.is_revoked(token_user(access))
+    assert not other.is_revoked(token_user(create_access_token(user)))
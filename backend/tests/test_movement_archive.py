@@ -0,0 +1,100 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+from models import Location, Product, StockMovement
+from movement_archive import MovementArchive, archive_months
+
+
+def add_movement(db, moved_at, quantity, movement_type="IN", location_id=None):
+    db.add(StockMovement(product_id=1, type=movement_type, quantity=quantity, movement_date=moved_at, location_id=location_id))
+    db.commit()
+
+
+def test_an_archived_month_reads_back_as_it_was_written(db, tmp_path):
+    rng = random.Random(1)
+    db.add_all([Product(id=i, name=f"P{i}", price=1, quantity=0) for i in (1, 2, 300)])
+    db.add_all([Location(id=i, code=f"L{i}") for i in (1, 2)])
+    # Ids far from zero and quantities past 65535: the encoding must shift and widen
+    rows = [
+        StockMovement(
+            id=100000 + i * 3,
+            product_id=rng.choice([1, 2, 300]),
+            type=rng.choice(["IN", "OUT"]),
+            quantity=rng.choice([1, 250, 70000]),
+            movement_date=datetime(2024, 3, 1) + timedelta(seconds=rng.randint(0, 31 * 86400 - 1), microseconds=rng.randint(0, 999999)),
+            location_id=rng.choice([None, 1, 2]),
+        )
+        for i in range(500)
+    ]
+    db.add_all(rows)
+    db.commit()
+    expected = sorted(
+        ((mv.id, mv.product_id, mv.type, mv.quantity, mv.movement_date.replace(microsecond=0), mv.location_id) for mv in rows),
+        key=lambda row: (row[4], row[0]),
+        reverse=True,
+    )
+
+    assert archive_months(db, datetime(2024, 4, 1), tmp_path) == [{"month": "2024-03", "archived": 500, "deleted": 500}]
+    manifest = json.loads((tmp_path / "2024-03" / "manifest.json").read_text())
+    assert manifest["columns"]["id"] == {"typecode": "H", "base": 100000}
+    assert manifest["columns"]["quantity"]["typecode"] == "I"
+
+    archive = MovementArchive(tmp_path)
+    assert archive.cutoff() == datetime(2024, 4, 1)
+    assert list(archive.iter_movements()) == expected
+
+    # Date range, cursor and filters, as the movement listing uses them
+    since, until = datetime(2024, 3, 10), datetime(2024, 3, 20)
+    before = expected[100][4], expected[100][0]
+    filtered = list(archive.iter_movements(before=before, date_from=since, date_to=until, movement_type="OUT", product_ids={300}))
+    assert filtered and filtered == [
+        row for row in expected
+        if since <= row[4] < until and (row[4], row[0]) < before and row[2] == "OUT" and row[1] == 300
+    ]
+    net = {}
+    for row in expected:
+        if since < row[4] <= until:
+            net[row[1]] = net.get(row[1], 0) + (row[3] if row[2] == "IN" else -row[3])
+    assert net and archive.net_movements(since, until) == net
+
+
+def test_rows_backdated_into_an_archived_month_are_merged(db, tmp_path):
+    db.add(Product(name="P", price=1, quantity=0))
+    add_movement(db, datetime(2024, 1, 5), 2)
+    add_movement(db, datetime(2024, 1, 20), 3)
+    archive_months(db, datetime(2024, 2, 1), tmp_path)
+
+    add_movement(db, datetime(2024, 1, 10), 7, "OUT")
+    report = archive_months(db, datetime(2024, 2, 1), tmp_path)
+
+    assert report == [{"month": "2024-01.2", "archived": 1, "deleted": 1}]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2024-01.2"]
+    assert db.query(StockMovement).count() == 0
+    archived = MovementArchive(tmp_path).iter_movements()
+    assert [(mv.movement_date.day, mv.type, mv.quantity) for mv in archived] == [(20, "IN", 3), (10, "OUT", 7), (5, "IN", 2)]
+
+
+def test_an_archived_month_without_new_rows_is_left_alone(db, tmp_path):
+    db.add(Product(name="P", price=1, quantity=0))
+    add_movement(db, datetime(2024, 1, 5), 2)
+    archive_months(db, datetime(2024, 2, 1), tmp_path)
+    add_movement(db, datetime(2024, 2, 5), 1)
+
+    assert archive_months(db, datetime(2024, 2, 1), tmp_path) == []
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2024-01"]
+    assert db.query(StockMovement).count() == 1
+
+
+def test_rows_left_by_an_interrupted_run_are_not_archived_twice(db, tmp_path):
+    db.add(Product(name="P", price=1, quantity=0))
+    add_movement(db, datetime(2024, 1, 5), 2)
+    archive_months(db, datetime(2024, 2, 1), tmp_path)
+    # As if the run had stopped between the rename and the delete
+    db.add(StockMovement(id=1, product_id=1, type="IN", quantity=2, movement_date=datetime(2024, 1, 5)))
+    db.commit()
+
+    archive_months(db, datetime(2024, 2, 1), tmp_path)
+
+    assert db.query(StockMovement).count() == 0
+    assert [(mv.id, mv.quantity) for mv in MovementArchive(tmp_path).iter_movements()] == [(1, 2)]
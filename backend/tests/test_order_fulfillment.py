@@ -0,0 +1,33 @@
+from order_fulfillment import allocate_fifo
+
+
+def allocated(allocations):
+    return [(a.order_id, a.item_id, a.allocated) for a in allocations]
+
+
+def test_partial_serves_the_oldest_order_first():
+    items = [(1, 1, 10, 5), (2, 2, 10, 5), (3, 3, 10, 5)]
+    assert allocated(allocate_fifo(items, {10: 7})) == [(1, 1, 5), (2, 2, 2), (3, 3, 0)]
+
+
+def test_partial_shares_stock_per_product():
+    items = [(1, 1, 10, 4), (1, 2, 11, 4), (2, 3, 11, 4)]
+    allocations = allocate_fifo(items, {10: 1, 11: 6})
+    assert allocated(allocations) == [(1, 1, 1), (1, 2, 4), (2, 3, 2)]
+    assert [a.remaining for a in allocations] == [3, 0, 2]
+
+
+def test_all_or_nothing_leaves_the_stock_to_the_next_orders():
+    # Order 1 cannot get product 11: it gets nothing and product 10 goes to order 2
+    items = [(1, 1, 10, 5), (1, 2, 11, 5), (2, 3, 10, 3)]
+    assert allocated(allocate_fifo(items, {10: 5, 11: 2}, partial=False)) == [(1, 1, 0), (1, 2, 0), (2, 3, 3)]
+
+
+def test_all_or_nothing_adds_up_the_lines_of_a_product():
+    items = [(1, 1, 10, 3), (1, 2, 10, 3), (2, 3, 10, 5)]
+    assert allocated(allocate_fifo(items, {10: 5}, partial=False)) == [(1, 1, 0), (1, 2, 0), (2, 3, 5)]
+
+
+def test_missing_or_negative_stock_allocates_nothing():
+    items = [(1, 1, 10, 2), (1, 2, 11, 2), (1, 3, 12, 2)]
+    assert allocated(allocate_fifo(items, {10: -4, 11: None})) == [(1, 1, 0), (1, 2, 0), (1, 3, 0)]
@@ -0,0 +1,43 @@
+import pytest
+
+from models import Product
+from product_import import _insert_new, import_products
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "row-by-row"])
+def returning(request, db, monkeypatch):
+    # MySQL has no RETURNING: run the import both ways on SQLite
+    monkeypatch.setattr(db.get_bind().dialect, "insert_executemany_returning_sort_by_parameter_order", request.param)
+    return request.param
+
+
+def test_insert_new_returns_the_ids_in_row_order(db, returning):
+    db.add(Product(name="Other", sku="S1", price=1, quantity=0))
+    db.flush()
+    rows = [{"name": name, "sku": sku, "price": 1, "quantity": 0} for name, sku in [("A", "S1"), ("B", None), ("C", "S2")]]
+
+    ids = _insert_new(db, rows)
+
+    assert [db.get(Product, i).name for i in ids] == ["A", "B", "C"]
+
+
+def test_import_upserts_on_sku_and_reports_repeats(db, returning):
+    db.add(Product(name="Old", sku="S2", price=1, quantity=9))
+    db.commit()
+    rows = [
+        (2, {"name": "A", "sku": "S1", "price": "1", "quantity": "5"}),
+        (3, {"name": "B", "sku": "S1", "price": "1", "quantity": "7"}),
+        (4, {"name": "C", "price": "2", "quantity": "3"}),
+        (5, {"name": "D", "sku": "S2", "price": "1", "quantity": "1"}),
+        (6, {"name": "E", "price": "oops"}),
+    ]
+
+    report = import_products(db, rows, chunk_size=3)
+
+    assert {k: report[k] for k in ("rows", "inserted", "updated", "failed", "skipped")} == {
+        "rows": 5, "inserted": 2, "updated": 1, "failed": 1, "skipped": 1,
+    }
+    assert report["skipped_lines"] == [{"line": 2, "sku": "S1", "replaced_by": 3}]
+    assert sorted((p.name, p.sku, p.quantity) for p in db.query(Product)) == [
+        ("B", "S1", 7), ("C", None, 3), ("D", "S2", 1),
+    ]
@@ -0,0 +1,50 @@
+import pytest
+from fastapi import HTTPException
+
+from models import Product, StockDailyRollup, StockMovement
+from routes.stock import apply_stock_batch
+from schemas import StockBatch
+
+
+@pytest.fixture
+def products(db):
+    db.add_all([Product(id=1, name="P1", price=10, quantity=5), Product(id=2, name="P2", price=10, quantity=1)])
+    db.commit()
+
+
+def batch(*lines):
+    return StockBatch(lines=[
+        {"product_id": product_id, "movement_type": movement_type, "quantity": quantity}
+        for product_id, movement_type, quantity in lines
+    ])
+
+
+def state(db):
+    db.expire_all()
+    return (
+        {p.id: p.quantity for p in db.query(Product)},
+        db.query(StockMovement).count(),
+        db.query(StockDailyRollup).count(),
+    )
+
+
+@pytest.mark.parametrize("lines, status", [
+    ([(1, "IN", 3), (2, "OUT", 2)], 400),  # not enough of product 2
+    ([(1, "OUT", 1), (3, "IN", 1)], 404),  # unknown product
+    ([(1, "IN", 3), (2, "IN", 0)], 400),  # invalid quantity
+    ([(1, "OUT", 6), (1, "IN", 10)], 400),  # covered only by a later line
+])
+def test_one_invalid_line_rejects_the_whole_batch(db, products, lines, status):
+    with pytest.raises(HTTPException) as e:
+        apply_stock_batch(batch(*lines), db)
+    assert e.value.status_code == status
+    assert state(db) == ({1: 5, 2: 1}, 0, 0)
+
+
+def test_lines_of_the_same_product_add_up(db, products):
+    result = apply_stock_batch(batch((1, "IN", 2), (2, "OUT", 1), (1, "OUT", 4), (1, "IN", 1)), db)
+
+    assert result == {"movements": 4, "products": [{"product_id": 1, "quantity": 4}, {"product_id": 2, "quantity": 0}]}
+    assert state(db) == ({1: 4, 2: 0}, 4, 2)
+    rollup = db.query(StockDailyRollup).filter(StockDailyRollup.product_id == 1).one()
+    assert (rollup.quantity_in, rollup.quantity_out) == (3, 4)
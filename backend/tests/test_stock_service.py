@@ -0,0 +1,89 @@
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from models import Location, Product, StockDailyRollup, StockLevel
+from stock_service import apply_delta, move_stock
+
+
+@pytest.fixture
+def product(db):
+    db.add(Location(id=1, code="A-1"))
+    product = Product(id=1, name="P", price=10, quantity=5)
+    db.add(product)
+    db.commit()
+    return product
+
+
+def quantities(db):
+    db.expire_all()
+    product = db.get(Product, 1)
+    level = db.get(StockLevel, (1, 1))
+    return product.quantity, product.located_quantity, level.quantity if level else None
+
+
+def test_out_beyond_the_stock_is_rejected_and_changes_nothing(db, product):
+    with pytest.raises(HTTPException) as e:
+        move_stock(db, 1, "OUT", 6)
+    db.rollback()
+    assert (e.value.status_code, e.value.detail) == (400, "Stock insuffisant")
+    assert quantities(db) == (5, 0, None)
+    assert db.query(StockDailyRollup).count() == 0
+
+    move_stock(db, 1, "OUT", 5)
+    db.commit()
+    assert quantities(db) == (0, 0, None)
+
+
+def test_the_database_decides_not_a_stale_read(db, product):
+    assert product.quantity == 5
+    # Another request takes the stock after this session read it
+    db.execute(update(Product).where(Product.id == 1).values(quantity=0))
+    with pytest.raises(HTTPException):
+        apply_delta(db, 1, -5)
+
+
+def test_lowest_running_total_must_be_covered(db, product):
+    # OUT 6 then IN 10: the net is +4 but the stock dips to -1 on the way
+    with pytest.raises(HTTPException):
+        apply_delta(db, 1, 4, lowest=-6)
+    db.rollback()
+    assert quantities(db) == (5, 0, None)
+
+    change = apply_delta(db, 1, 4, lowest=-5)
+    db.commit()
+    assert (change.before.quantity, change.after.quantity) == (5, 9)
+
+
+def test_lowest_is_checked_at_the_location(db, product):
+    apply_delta(db, 1, 3, location_id=1)
+    db.commit()
+    with pytest.raises(HTTPException) as e:
+        apply_delta(db, 1, 1, location_id=1, lowest=-4)
+    db.rollback()
+    assert e.value.detail == "Stock insuffisant à cet emplacement"
+    assert quantities(db) == (8, 3, 3)
+
+
+def test_product_and_location_levels_stay_consistent(db, product):
+    move_stock(db, 1, "IN", 4, location_id=1)
+    db.commit()
+    assert quantities(db) == (9, 4, 4)
+
+    # Stock held at a location is only taken out through it
+    with pytest.raises(HTTPException):
+        move_stock(db, 1, "OUT", 6)
+    db.rollback()
+    with pytest.raises(HTTPException):
+        move_stock(db, 1, "OUT", 5, location_id=1)
+    db.rollback()
+    assert quantities(db) == (9, 4, 4)
+
+    move_stock(db, 1, "OUT", 5)
+    move_stock(db, 1, "OUT", 4, location_id=1)
+    db.commit()
+    assert quantities(db) == (0, 0, 0)
+    rollup = db.query(StockDailyRollup).one()
+    assert (rollup.day, rollup.quantity_in, rollup.quantity_out) == (date.today(), 4, 9)
@@ -0,0 +1,25 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import SessionLocal
+from movement_archive import STOCK_ARCHIVE_DIR
+from stock_history import archive_closed_months
+
+
+if __name__ == "__main__":
+	# A lancer une fois par mois (cron), ex: le 1er à 2h
+	parser = argparse.ArgumentParser(description="Archive les mouvements de stock des mois clos")
+	parser.add_argument("--keep-months", type=int, default=12, help="mois gardés dans la table (défaut: 12)")
+	args = parser.parse_args()
+
+	db = SessionLocal()
+	try:
+		report = archive_closed_months(db, keep_months=args.keep_months)
+	finally:
+		db.close()
+	for month in report:
+		print(f"{month['month']}: {month['archived']} mouvements archivés, {month['deleted']} supprimés")
+	print(f"Archives dans {STOCK_ARCHIVE_DIR.resolve()}" if report else "Aucun mois à archiver")
@@ -0,0 +1,137 @@
+"""Benchmark the hot read routes on the sync and the async database path.
+
+Seeds a throwaway SQLite file (or uses --url, e.g. the MySQL database,
+which must then already hold data), starts the application twice with
+uvicorn, with DB_ASYNC=0 then DB_ASYNC=1, and fires the same concurrent
+reads at each: requests/sec and p50/p99 latency per route, side by side.
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND))
+
+from bench_db import recreate_tables
+
+ROUTES = ["/products/?limit=50", "/stock/?limit=50", "/orders/?limit=50", "/stats/"]
+
+
+def seed(url, products, movements, orders):
+	os.environ["DATABASE_URL"] = url
+	from sqlalchemy import insert
+
+	from database import SessionLocal, engine
+	from models import Base, Category, Order, OrderItem, Product, StockMovement
+
+	recreate_tables(engine, Base.metadata)
+	rng = random.Random(1)
+	now = datetime.now()
+	db = SessionLocal()
+	db.execute(insert(Category), [{"name": f"C{i}"} for i in range(10)])
+	db.execute(insert(Product), [
+		{"name": f"P{i}", "sku": f"SKU{i}", "price": rng.randint(1, 500), "quantity": rng.randint(0, 1000), "category_id": i % 10 + 1}
+		for i in range(products)
+	])
+	db.execute(insert(StockMovement), [
+		{"product_id": rng.randint(1, products), "type": rng.choice(["IN", "OUT"]), "quantity": rng.randint(1, 20),
+		 "movement_date": now - timedelta(minutes=i)}
+		for i in range(movements)
+	])
+	db.execute(insert(Order), [
+		{"status": rng.choice(["PENDING", "COMPLETED", "CANCELLED"]), "order_date": date.today() - timedelta(days=i % 365)}
+		for i in range(orders)
+	])
+	db.execute(insert(OrderItem), [
+		{"order_id": i // 3 + 1, "product_id": rng.randint(1, products), "quantity": rng.randint(1, 5), "fulfilled_quantity": 0}
+		for i in range(orders * 3)
+	])
+	db.commit()
+	db.close()
+
+
+def start_server(url, db_async, port):
+	env = dict(os.environ, DATABASE_URL=url, DB_ASYNC="1" if db_async else "0")
+	server = subprocess.Popen(
+		[sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+		cwd=BACKEND, env=env,
+	)
+	for _ in range(200):
+		try:
+			urllib.request.urlopen(f"http://127.0.0.1:{port}/stats/")
+			return server
+		except (urllib.error.URLError, ConnectionError):
+			time.sleep(0.1)
+	server.kill()
+	raise RuntimeError("le serveur n'a pas démarré")
+
+
+def get(url):
+	start = time.perf_counter()
+	try:
+		with urllib.request.urlopen(url) as resp:
+			resp.read()
+			ok = resp.status == 200
+	except urllib.error.HTTPError:
+		ok = False
+	return time.perf_counter() - start, ok
+
+
+def run(base_url, route, concurrency, requests):
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=concurrency) as pool:
+		results = list(pool.map(get, [base_url + route] * requests))
+	elapsed = time.perf_counter() - start
+	latencies = sorted(latency for latency, _ in results)
+	return {
+		"rps": requests / elapsed,
+		"p50": latencies[len(latencies) // 2] * 1000,
+		"p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+		"errors": sum(1 for _, ok in results if not ok),
+	}
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--url", help="base de données existante (SQLite temporaire par défaut)")
+	parser.add_argument("--products", type=int, default=2000)
+	parser.add_argument("--movements", type=int, default=20000)
+	parser.add_argument("--orders", type=int, default=2000)
+	parser.add_argument("--concurrency", type=int, default=200)
+	parser.add_argument("--requests", type=int, default=1000, help="requêtes par route et par mode")
+	parser.add_argument("--port", type=int, default=8766)
+	args = parser.parse_args()
+
+	url = args.url
+	if not url:
+		url = f"sqlite:///{tempfile.mkdtemp()}/bench_async.db"
+		seed(url, args.products, args.movements, args.orders)
+
+	results = {}
+	for db_async in (False, True):
+		server = start_server(url, db_async, args.port)
+		try:
+			base_url = f"http://127.0.0.1:{args.port}"
+			for route in ROUTES:
+				run(base_url, route, 10, 50)  # warm-up
+				results[(route, db_async)] = run(base_url, route, args.concurrency, args.requests)
+		finally:
+			server.terminate()
+			server.wait()
+
+	print(f"concurrence {args.concurrency}, {args.requests} requêtes par route")
+	print(f"{'route':<22} {'mode':<6} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'erreurs':>8}")
+	for route in ROUTES:
+		for db_async in (False, True):
+			r = results[(route, db_async)]
+			mode = "async" if db_async else "sync"
+			print(f"{route:<22} {mode:<6} {r['rps']:>8.1f} {r['p50']:>9.1f} {r['p99']:>9.1f} {r['errors']:>8}")
@@ -0,0 +1,71 @@
+"""Benchmark the authentication cost of one protected request.
+
+Compares the previous X-User-ID scheme (one User query per request) with
+the signed access token (signature, expiry and revocation checked in
+memory), against a throwaway SQLite database by default. --url points it
+at a scratch MySQL database instead, where the query also pays a network
+round trip; its tables are dropped and recreated, so it needs --reset.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_db import add_reset_argument, recreate_tables
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from auth_tokens import create_access_token, revocations
+from dependencies import get_current_user
+from models import Base, User
+
+
+def legacy_get_current_user(x_user_id, db):
+	user = db.query(User).filter(User.id == x_user_id).first()
+	if not user:
+		raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+	return user
+
+
+def per_call_us(fn, requests):
+	start = time.perf_counter()
+	for _ in range(requests):
+		fn()
+	return (time.perf_counter() - start) / requests * 1e6
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--url", default="sqlite://")
+	parser.add_argument("--users", type=int, default=1000)
+	parser.add_argument("--requests", type=int, default=20000)
+	parser.add_argument("--revoked", type=int, default=10000, help="entrées dans la liste de révocation")
+	add_reset_argument(parser)
+	args = parser.parse_args()
+
+	engine = create_engine(args.url)
+	recreate_tables(engine, Base.metadata, args.reset)
+	Session = sessionmaker(bind=engine)
+	db = Session()
+	db.execute(insert(User), [
+		{"name": f"U{i}", "email": f"u{i}@example.com", "password": "x", "role": "MANAGER"}
+		for i in range(args.users)
+	])
+	db.commit()
+	user = db.query(User).filter(User.id == args.users // 2).first()
+
+	# A realistic revocation list: the lookup stays a dict access
+	revocations.load(db)
+	for i in range(args.revoked):
+		revocations._tokens[f"revoked{i}"] = time.time() + 900
+	header = "Bearer " + create_access_token(user)
+
+	legacy_us = per_call_us(lambda: legacy_get_current_user(user.id, db), args.requests)
+	token_us = per_call_us(lambda: get_current_user(header), args.requests)
+	print(f"{'schéma':<28} {'µs / requête':>14} {'requêtes SQL':>14}")
+	print(f"{'X-User-ID + requête User':<28} {legacy_us:>14.1f} {1:>14}")
+	print(f"{'jeton signé (HS256)':<28} {token_us:>14.1f} {0:>14}")
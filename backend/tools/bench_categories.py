@@ -0,0 +1,87 @@
+"""Benchmark GET /categories as the product count grows.
+
+Runs against a throwaway SQLite database by default (or --url, whose
+tables are dropped and recreated: --reset is required unless it is
+SQLite) and times
+the previous implementation (one product query per category) against the
+current one, cold (counters loaded with one grouped aggregate) and warm.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_db import add_reset_argument, recreate_tables
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Category, Product
+from routes.categories import list_categories
+from stats_engine import stock_stats
+
+
+def legacy_list_categories(db):
+	result = []
+	for cat in db.query(Category).all():
+		products = db.query(Product).filter(Product.category_id == cat.id).all()
+		result.append({
+			"id": cat.id,
+			"total_products": len(products),
+			"total_quantity": sum(p.quantity for p in products),
+			"total_value": sum(p.price * p.quantity for p in products),
+		})
+	return result
+
+
+def timed(fn, repeat):
+	best = float("inf")
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		best = min(best, time.perf_counter() - start)
+	return best * 1000
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--url", default="sqlite://")
+	parser.add_argument("--categories", type=int, default=200)
+	parser.add_argument("--sizes", default="1000,10000,50000")
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--skip-legacy", action="store_true")
+	add_reset_argument(parser)
+	args = parser.parse_args()
+
+	engine = create_engine(args.url)
+	recreate_tables(engine, Base.metadata, args.reset)
+	db = sessionmaker(bind=engine)()
+	db.execute(insert(Category), [{"name": f"Catégorie {i}"} for i in range(args.categories)])
+	db.commit()
+
+	print(f"{'produits':>10} {'ancien (ms)':>12} {'à froid (ms)':>13} {'à chaud (ms)':>13}")
+	count = 0
+	for size in (int(s) for s in args.sizes.split(",")):
+		rows = [
+			{"name": f"P{i}", "price": round(random.uniform(1, 500), 2), "quantity": random.randint(0, 200),
+			 "category_id": random.randint(1, args.categories)}
+			for i in range(count, size)
+		]
+		for i in range(0, len(rows), 5000):
+			db.execute(insert(Product), rows[i:i + 5000])
+		db.commit()
+		count = size
+
+		legacy = "-" if args.skip_legacy else f"{timed(lambda: legacy_list_categories(db), args.repeat):.1f}"
+
+		def cold():
+			stock_stats.invalidate()
+			list_categories(db)
+
+		cold_ms = timed(cold, args.repeat)
+		warm_ms = timed(lambda: list_categories(db), args.repeat)
+		db.expunge_all()
+		print(f"{size:>10} {legacy:>12} {cold_ms:>13.1f} {warm_ms:>13.1f}")
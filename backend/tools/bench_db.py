@@ -0,0 +1,18 @@
+"""Database set-up shared by the benchmarks, which drop and recreate the tables they fill."""
+import sys
+
+
+def add_reset_argument(parser):
+	parser.add_argument("--reset", action="store_true", help="autorise la suppression des tables d'une base non SQLite")
+
+
+def recreate_tables(engine, metadata, reset=False):
+	"""Drop and recreate the tables; never on a real database by accident.
+
+	Only a SQLite database (the throwaway default) is reset without
+	--reset; any other --url stops the benchmark before anything is dropped.
+	"""
+	if engine.dialect.name != "sqlite" and not reset:
+		sys.exit("--url hors SQLite: ses tables seraient supprimées, relancer avec --reset pour confirmer")
+	metadata.drop_all(engine)
+	metadata.create_all(engine)
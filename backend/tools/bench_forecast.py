@@ -0,0 +1,72 @@
+"""Benchmark demand forecasting over a synthetic sales history.
+
+Fills a throwaway SQLite database (or --url, whose tables are dropped and
+recreated: --reset is required unless it is SQLite) with daily OUT rollups for
+--products products over --days days, each product selling on a random
+share of the days, then times load_demand (one read plus the NumPy pass)
+and the forecast over the whole catalog.
+"""
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_db import add_reset_argument, recreate_tables
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from forecast import forecast, load_demand
+from models import Base, Product, StockDailyRollup
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--url", default="sqlite://")
+	parser.add_argument("--products", type=int, default=100000)
+	parser.add_argument("--days", type=int, default=730)
+	parser.add_argument("--sale-rate", type=float, default=0.05, help="part des jours avec au moins une vente")
+	add_reset_argument(parser)
+	args = parser.parse_args()
+
+	engine = create_engine(args.url)
+	recreate_tables(engine, Base.metadata, args.reset)
+	db = sessionmaker(bind=engine)()
+	rng = np.random.default_rng(1)
+
+	start = time.perf_counter()
+	for i in range(0, args.products, 10000):
+		db.execute(insert(Product), [
+			{"id": pid, "name": f"P{pid}", "price": 10, "quantity": int(rng.integers(0, 500))}
+			for pid in range(i + 1, min(i + 10000, args.products) + 1)
+		])
+	today = date.today()
+	rows = 0
+	for offset in range(args.days):
+		day = today - timedelta(days=offset)
+		sellers = np.flatnonzero(rng.random(args.products) < args.sale_rate) + 1
+		quantities = rng.poisson(3, len(sellers)) + 1
+		db.execute(insert(StockDailyRollup), [
+			{"day": day, "product_id": int(pid), "quantity_in": 0, "quantity_out": int(q)}
+			for pid, q in zip(sellers, quantities)
+		])
+		rows += len(sellers)
+	db.commit()
+	print(f"{rows} lignes de rollup ({args.products} produits x {args.days} jours) en {time.perf_counter() - start:.1f}s")
+
+	start = time.perf_counter()
+	demand = load_demand(db, history_days=args.days)
+	load_s = time.perf_counter() - start
+
+	ids = np.arange(1, args.products + 1, dtype=np.int64)
+	quantities = rng.integers(0, 500, args.products).astype(np.float64)
+	start = time.perf_counter()
+	result = forecast(demand, ids, quantities, np.zeros(args.products))
+	forecast_ms = (time.perf_counter() - start) * 1000
+
+	print(f"load_demand: {load_s:.2f}s, forecast sur {args.products} produits: {forecast_ms:.1f} ms")
+	print(f"à commander: {int((result['suggested_qty'] > 0).sum())} produits")
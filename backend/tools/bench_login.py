@@ -0,0 +1,111 @@
+"""Load test for POST /auth/login.
+
+Starts the application with uvicorn against a throwaway SQLite file (or
+--url, whose tables are dropped and recreated: --reset is required unless
+it is SQLite) holding bcrypt and legacy SHA-256 accounts, fires concurrent logins
+and reports logins/sec with p50/p99 latency. Legacy accounts are rehashed
+on their first login, so they cost one more hash the first time only.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_db import add_reset_argument, recreate_tables
+
+
+def login(base_url, email, password):
+	body = json.dumps({"email": email, "password": password}).encode()
+	req = urllib.request.Request(f"{base_url}/auth/login", data=body, headers={"Content-Type": "application/json"})
+	start = time.perf_counter()
+	try:
+		with urllib.request.urlopen(req) as resp:
+			status = resp.status
+	except urllib.error.HTTPError as e:
+		status = e.code
+	return time.perf_counter() - start, status
+
+
+def percentile(values, p):
+	return values[min(len(values) - 1, int(len(values) * p))]
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--url", help="base de données (SQLite temporaire par défaut)")
+	parser.add_argument("--users", type=int, default=50)
+	parser.add_argument("--legacy", type=int, default=10, help="comptes encore en SHA-256")
+	parser.add_argument("--concurrency", type=int, default=20)
+	parser.add_argument("--requests", type=int, default=200)
+	parser.add_argument("--rounds", type=int, help="coût bcrypt (PASSWORD_BCRYPT_ROUNDS)")
+	parser.add_argument("--port", type=int, default=8765)
+	add_reset_argument(parser)
+	args = parser.parse_args()
+
+	# Settings are read at import time
+	tmpdir = tempfile.mkdtemp()
+	os.environ["DATABASE_URL"] = args.url or f"sqlite:///{tmpdir}/bench_login.db"
+	if args.rounds:
+		os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.rounds)
+
+	import uvicorn
+	from sqlalchemy import insert
+
+	from database import SessionLocal, engine
+	from main import app
+	from models import Base, User
+	from passwords import PASSWORD_BCRYPT_ROUNDS, hash_password, legacy_hash, password_hasher
+
+	recreate_tables(engine, Base.metadata, args.reset)
+	# One bcrypt hash shared by all modern accounts: seeding stays fast
+	shared = hash_password("secret")
+	db = SessionLocal()
+	db.execute(insert(User), [
+		{
+			"name": f"U{i}",
+			"email": f"u{i}@example.com",
+			"password": legacy_hash("secret") if i < args.legacy else shared,
+			"role": "MANAGER",
+		}
+		for i in range(args.users)
+	])
+	db.commit()
+	db.close()
+
+	server = uvicorn.Server(uvicorn.Config(app, port=args.port, log_level="warning"))
+	threading.Thread(target=server.run, daemon=True).start()
+	while not server.started:
+		time.sleep(0.05)
+	base_url = f"http://127.0.0.1:{args.port}"
+
+	emails = [f"u{i % args.users}@example.com" for i in range(args.requests)]
+	start = time.perf_counter()
+	with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+		results = list(pool.map(lambda email: login(base_url, email, "secret"), emails))
+	elapsed = time.perf_counter() - start
+	server.should_exit = True
+
+	latencies = sorted(latency for latency, _ in results)
+	statuses = {}
+	for _, status in results:
+		statuses[status] = statuses.get(status, 0) + 1
+	db = SessionLocal()
+	still_legacy = sum(1 for (pw,) in db.query(User.password) if len(pw) == 64)
+	db.close()
+
+	print(f"bcrypt rounds       {PASSWORD_BCRYPT_ROUNDS}")
+	print(f"hash workers        {password_hasher.metrics()['workers']}")
+	print(f"concurrence         {args.concurrency}")
+	print(f"connexions/s        {len(results) / elapsed:.1f}")
+	print(f"p50 / p99 (ms)      {percentile(latencies, 0.50) * 1000:.1f} / {percentile(latencies, 0.99) * 1000:.1f}")
+	print(f"statuts HTTP        {statuses}")
+	print(f"comptes SHA-256     {args.legacy} -> {still_legacy}")
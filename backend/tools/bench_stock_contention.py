@@ -0,0 +1,114 @@
+"""Concurrent OUT requests on one hot SKU: checks for oversell and reports throughput.
+
+Each worker thread removes one unit per transaction until the stock is
+exhausted. With the conditional-update engine (default) the number of
+accepted removals must equal the initial stock and the final quantity must
+be 0. --legacy runs the previous read / check / write code for comparison
+(on MySQL it loses updates and oversells under contention).
+
+Defaults to a throwaway SQLite file; pass --url with --reset to target a
+scratch MySQL database, e.g. --url mysql+pymysql://root:@localhost/stock_bench
+--reset (its tables are dropped and recreated).
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_db import add_reset_argument, recreate_tables
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Product, StockMovement
+from stock_service import move_stock
+
+
+def remove_one_atomic(db, product_id):
+	move_stock(db, product_id, "OUT", 1)
+	db.add(StockMovement(product_id=product_id, type="OUT", quantity=1))
+	db.commit()
+
+
+def remove_one_legacy(db, product_id):
+	product = db.query(Product).filter(Product.id == product_id).first()
+	if product.quantity < 1:
+		raise HTTPException(status_code=400, detail="Stock insuffisant")
+	product.quantity -= 1
+	db.add(StockMovement(product_id=product_id, type="OUT", quantity=1))
+	db.commit()
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--url", default=None)
+	parser.add_argument("--threads", type=int, default=16)
+	parser.add_argument("--stock", type=int, default=2000)
+	parser.add_argument("--legacy", action="store_true")
+	add_reset_argument(parser)
+	args = parser.parse_args()
+
+	url = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+	connect_args = {"timeout": 30, "check_same_thread": False} if url.startswith("sqlite") else {}
+	engine = create_engine(url, pool_size=args.threads, connect_args=connect_args)
+	recreate_tables(engine, Base.metadata, args.reset)
+	Session = sessionmaker(bind=engine)
+
+	db = Session()
+	hot = Product(name="SKU chaud", price=10, quantity=args.stock, sku="HOT-1")
+	db.add(hot)
+	db.commit()
+	product_id = hot.id
+	db.close()
+
+	remove_one = remove_one_legacy if args.legacy else remove_one_atomic
+	accepted = [0] * args.threads
+	retries = [0] * args.threads
+
+	def worker(n):
+		db = Session()
+		try:
+			while True:
+				try:
+					remove_one(db, product_id)
+					accepted[n] += 1
+				except HTTPException:
+					db.rollback()
+					return
+				except OperationalError:
+					# Lock wait timeout / deadlock: retry the request
+					db.rollback()
+					retries[n] += 1
+		finally:
+			db.close()
+
+	threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+	start = time.perf_counter()
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	elapsed = time.perf_counter() - start
+
+	db = Session()
+	final = db.query(Product.quantity).filter(Product.id == product_id).scalar()
+	movements = db.query(func.count(StockMovement.id)).scalar()
+	db.close()
+
+	total = sum(accepted)
+	print(f"moteur:            {'legacy (lecture/écriture)' if args.legacy else 'update conditionnel'}")
+	print(f"threads:           {args.threads}")
+	print(f"stock initial:     {args.stock}")
+	print(f"sorties acceptées: {total}  (mouvements: {movements}, réessais: {sum(retries)})")
+	print(f"stock final:       {final}")
+	print(f"survente:          {max(0, total - args.stock)}  / mises à jour perdues: {total - (args.stock - final)}")
+	print(f"débit:             {total / elapsed:.0f} sorties/s sur un SKU")
+	ok = total == args.stock and final == 0 and movements == total
+	print("OK: aucune survente" if ok else "ECHEC: stock incohérent")
+	sys.exit(0 if ok else 1)
@@ -1,10 +1,9 @@
-import hashlib
-from typing import Optional
+import sys
+from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def hash_password(password: str) -> str:
-	"""Return a SHA-256 hex digest for the given password."""
-	return hashlib.sha256(password.encode()).hexdigest()
+from passwords import hash_password, verify_password  # noqa: E402,F401  (re-exported for the scripts)
 
 
 if __name__ == "__main__":
@@ -12,5 +11,7 @@ if __name__ == "__main__":
 
 	parser = argparse.ArgumentParser()
 	parser.add_argument("password", nargs="?", default="1234")
+	parser.add_argument("--rounds", type=int, default=None, help="coût bcrypt (défaut: PASSWORD_BCRYPT_ROUNDS)")
 	args = parser.parse_args()
-	print("Hash pour le mot de passe:", hash_password(args.password))
+	hashed = hash_password(args.password) if args.rounds is None else hash_password(args.password, args.rounds)
+	print("Hash pour le mot de passe:", hashed)
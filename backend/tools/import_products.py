@@ -0,0 +1,26 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import SessionLocal
+from product_import import DEFAULT_CHUNK_SIZE, detect_format, import_products, iter_rows
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Importer un catalogue produits (CSV ou NDJSON), upsert sur le SKU")
+	parser.add_argument("path")
+	parser.add_argument("--format", choices=["csv", "ndjson"], default=None)
+	parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+	args = parser.parse_args()
+
+	fmt = args.format or detect_format(args.path)
+	db = SessionLocal()
+	try:
+		with open(args.path, "rb") as stream:
+			report = import_products(db, iter_rows(stream, fmt), chunk_size=args.chunk_size)
+	finally:
+		db.close()
+	print(json.dumps(report, indent=2, ensure_ascii=False))
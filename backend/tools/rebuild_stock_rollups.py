@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import SessionLocal
+from stock_rollups import rebuild_rollups
+
+
+if __name__ == "__main__":
+	db = SessionLocal()
+	try:
+		count = rebuild_rollups(db)
+	finally:
+		db.close()
+	print(f"Rollups journaliers reconstruits: {count} lignes")
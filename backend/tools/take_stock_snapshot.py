@@ -0,0 +1,17 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import SessionLocal
+from stock_history import take_snapshot
+
+
+if __name__ == "__main__":
+	# A lancer périodiquement (cron), ex: tous les jours à minuit
+	db = SessionLocal()
+	try:
+		snapshot = take_snapshot(db)
+	finally:
+		db.close()
+	print(f"Snapshot #{snapshot.id} pris le {snapshot.taken_at}")
@@ -3,6 +3,8 @@ import { showToast } from "../components/toast";
 
 const api = axios.create({
   baseURL: "http://localhost:8000", // FastAPI
+  // Sends back the read-your-writes cookie set after a write
+  withCredentials: true,
   headers: {
     "Content-Type": "application/json",
   },
@@ -12,27 +14,57 @@ const api = axios.create({
   },
 });
 
-// Intercepteur → ajoute automatiquement le token et x_user_id
+// Intercepteur → ajoute automatiquement le jeton d'accès
 api.interceptors.request.use(
   (config) => {
     const authData = JSON.parse(localStorage.getItem("auth") || '{}');
     const token = authData.token;
-    const userId = authData.user?.id;
     
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
-    if (userId) {
-      config.headers["X-User-ID"] = userId.toString();
-    }
     return config;
   },
   (error) => Promise.reject(error)
 );
 
+// Access tokens are short-lived: on a 401, trade the refresh token for a new
+// pair once (shared by concurrent requests) and replay the request
+let refreshing = null;
+
+async function refreshTokens() {
+  const authData = JSON.parse(localStorage.getItem("auth") || '{}');
+  if (!authData.refreshToken) return null;
+  const response = await axios.post(`${api.defaults.baseURL}/auth/refresh`, {
+    refresh_token: authData.refreshToken,
+  });
+  const updated = { ...authData, token: response.data.access_token, refreshToken: response.data.refresh_token };
+  localStorage.setItem("auth", JSON.stringify(updated));
+  return updated.token;
+}
+
+// New access token from the refresh token, one refresh shared by concurrent callers
+export function refreshAccessToken() {
+  refreshing = refreshing || refreshTokens().finally(() => { refreshing = null; });
+  return refreshing;
+}
+
 // Response interceptor: show toast on 401 and clear auth
 api.interceptors.response.use(
-  (response) => {
+  async (response) => {
+    const original = response.config;
+    if (response.status === 401 && original && !original._retried && !original.url?.includes('/auth/')) {
+      original._retried = true;
+      try {
+        const token = await refreshAccessToken();
+        if (token) {
+          original.headers.Authorization = `Bearer ${token}`;
+          return api(original);
+        }
+      } catch (e) {
+        // fall through: the session is over
+      }
+    }
     // Reject 405 responses for analytics endpoints to trigger catch block
     if (response.status === 405 && 
         (response.config?.url?.includes('/stock/trend') || 
@@ -0,0 +1,54 @@
+import api, { refreshAccessToken } from './axios';
+
+// Flux SSE des changements (produits, stock, commandes, alertes).
+// Le navigateur se reconnecte seul et renvoie Last-Event-ID : le serveur
+// rejoue alors les événements manqués, ou envoie "reset" s'il ne le peut pas.
+// EventSource n'envoie pas d'en-tête Authorization : le jeton d'accès passe
+// dans l'URL. Une connexion refusée (jeton expiré) n'est pas relancée par le
+// navigateur : on renouvelle le jeton et on rouvre le flux là où il s'était arrêté.
+export const eventsAPI = {
+  subscribe: (topics, onEvent, onReset) => {
+    let source = null;
+    let lastEventId = null;
+    let closed = false;
+    let retried = false;
+
+    const open = () => {
+      const url = new URL('/events/', api.defaults.baseURL);
+      url.searchParams.set('topics', topics.join(','));
+      const { token } = JSON.parse(localStorage.getItem('auth') || '{}');
+      if (token) url.searchParams.set('access_token', token);
+      if (lastEventId) url.searchParams.set('since', lastEventId);
+      source = new EventSource(url.toString());
+      source.onopen = () => { retried = false; };
+
+      topics.forEach((topic) => {
+        source.addEventListener(topic, (message) => {
+          lastEventId = message.lastEventId || lastEventId;
+          const event = JSON.parse(message.data);
+          onEvent({ topic, ...event });
+        });
+      });
+      source.addEventListener('reset', (message) => {
+        lastEventId = message.lastEventId || lastEventId;
+        onReset && onReset();
+      });
+      source.onerror = async () => {
+        // One new token per refusal: a stream refused for another reason stays closed
+        if (closed || retried || source.readyState !== EventSource.CLOSED) return;
+        retried = true;
+        try {
+          if (await refreshAccessToken()) open();
+        } catch (e) {
+          // session over: the stream stays closed
+        }
+      };
+    };
+
+    open();
+    return () => {
+      closed = true;
+      source.close();
+    };
+  }
+};
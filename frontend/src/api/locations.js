@@ -0,0 +1,8 @@
+import api from './axios';
+
+export const locationsApi = {
+  getAll: async () => {
+    const response = await api.get('/locations/');
+    return response.data;
+  }
+};
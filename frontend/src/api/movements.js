@@ -1,11 +1,18 @@
 import api from './axios';
 
 export const movementsAPI = {
+  // First page only (the newest 200 by default): use getPage to follow the cursor
   getAll: async (params = {}) => {
     const response = await api.get('/stock/', { params });
     return response.data;
   },
 
+  // One page of movements, newest first; pass the returned nextCursor back to get the next one
+  getPage: async (params = {}) => {
+    const response = await api.get('/stock/', { params });
+    return { movements: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  },
+
   getByProduct: async (productId) => {
     const response = await api.get(`/stock/product/${productId}`);
     return response.data;
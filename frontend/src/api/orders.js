@@ -1,8 +1,20 @@
 import api from './axios';
 
 export const ordersAPI = {
-  getAll: async () => {
-    const response = await api.get('/orders/');
+  getAll: async (params = {}) => {
+    const response = await api.get('/orders/', { params });
+    return response.data;
+  },
+
+  // One page of orders; pass the returned nextCursor back to get the next one
+  getPage: async (params = {}) => {
+    const response = await api.get('/orders/', { params });
+    return { orders: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  },
+
+  // Deliver PENDING orders from stock, oldest first (order_ids or filters)
+  fulfill: async (payload = {}) => {
+    const response = await api.post('/orders/fulfill', payload);
     return response.data;
   },
 
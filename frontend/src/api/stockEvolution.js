@@ -3,8 +3,12 @@ import api from './axios';
 export const stockEvolutionAPI = {
   getStockEvolution: async (months = 6) => {
     try {
-      const response = await api.get(`/stock/evolution?months=${months}`);
-      return response.data;
+      const response = await api.get('/stock/evolution-value', { params: { months } });
+      return response.data.map((row) => ({
+        month: new Date(`${row.date}T00:00:00`).toLocaleDateString('fr-FR', { month: 'short', year: '2-digit' }),
+        value: row.valeur,
+        date: row.date
+      }));
     } catch (error) {
       // Fallback to mock data if API not available
       const now = new Date();
@@ -46,13 +46,13 @@ export function AuthProvider({ children }) {
       }
 
       const data = await res.json();
-      // Expecting { user: {id, name, email, role}, token?: '...' }
+      // Expecting { user: {id, name, email, role}, access_token, refresh_token }
       const u = data.user || data;
       const t = data.token || data.access_token || null;
       setUser(u);
       setToken(t);
       setIsAuthenticated(true);
-      localStorage.setItem("auth", JSON.stringify({ user: u, token: t }));
+      localStorage.setItem("auth", JSON.stringify({ user: u, token: t, refreshToken: data.refresh_token || null }));
       return u;
     } catch (error) {
       clearTimeout(timeoutId);
@@ -71,6 +71,15 @@ export function AuthProvider({ children }) {
   }
 
   function logout() {
+    // Revoke the tokens server side; the local session ends either way
+    const stored = JSON.parse(localStorage.getItem("auth") || "{}");
+    if (stored.token) {
+      fetch("http://127.0.0.1:8000/auth/logout", {
+        method: "POST",
+        headers: { "Content-Type": "application/json", Authorization: `Bearer ${stored.token}` },
+        body: JSON.stringify({ refresh_token: stored.refreshToken || null }),
+      }).catch(() => {});
+    }
     setUser(null);
     setToken(null);
     setIsAuthenticated(false);
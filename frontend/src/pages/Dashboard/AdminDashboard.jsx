@@ -4,7 +4,7 @@ import {
 } from 'react-icons/fa';
 import { productsAPI } from '../../api/products';
 import { usersApi } from '../../api/users';
-import { ordersAPI } from '../../api/orders';
+import { statsAPI } from '../../api/stats';
 import { BarChart, Bar, PieChart, Pie, LineChart, Line, Cell, ResponsiveContainer, XAxis, YAxis, CartesianGrid, Tooltip, Legend } from 'recharts';
 
 const COLORS = ['#3b82f6', '#10b981', '#f59e0b', '#8b5cf6', '#06b6d4', '#ef4444'];
@@ -24,16 +24,17 @@ const AdminDashboard = () => {
   useEffect(() => {
     const fetchDashboardData = async () => {
       try {
-        const [productsRes, usersRes, ordersRes] = await Promise.all([
+        const [productsRes, usersRes, statsRes] = await Promise.all([
           productsAPI.getAll(),
           usersApi.getAll(),
-          ordersAPI.getAll()
+          statsAPI.getStats()
         ]);
 
         window.products = productsRes.data || productsRes;
         const products = window.products;
         const users = usersRes.data || usersRes;
-        const orders = ordersRes.data || ordersRes;
+        // Order counts per status come from the server, not from the order list
+        const statusGroups = statsRes.orders_by_status || {};
 
         // Calculate stats from real data
         const totalStock = products.reduce((sum, product) => sum + (product.quantity || 0), 0);
@@ -50,13 +51,6 @@ const AdminDashboard = () => {
           count
         }));
 
-        // Group orders by status
-        const statusGroups = orders.reduce((acc, order) => {
-          const status = order.status || 'PENDING';
-          acc[status] = (acc[status] || 0) + 1;
-          return acc;
-        }, {});
-
         // Find low stock products (quantity < 10)
         const lowStockProducts = products.filter(product => (product.quantity || 0) < 10);
 
@@ -64,7 +58,7 @@ const AdminDashboard = () => {
           totalProducts: products.length,
           totalUsers: users.length,
           totalStock,
-          totalOrders: orders.length,
+          totalOrders: Object.values(statusGroups).reduce((sum, count) => sum + count, 0),
           productsByCategory,
           ordersByStatus: statusGroups,
           lowStockProducts
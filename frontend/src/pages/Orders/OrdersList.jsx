@@ -2,29 +2,44 @@ import React, { useState, useEffect } from 'react';
 import { FaPlus, FaEdit, FaTrash, FaShoppingCart, FaBox, FaCalendar, FaHashtag, FaSearch } from 'react-icons/fa';
 import { useAuth } from '../../contexts/AuthContext';
 import api from '../../api/axios';
+import { ordersAPI } from '../../api/orders';
 import Swal from 'sweetalert2';
 
 export default function OrdersList() {
   const [orders, setOrders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showModal, setShowModal] = useState(false);
   const [editingOrder, setEditingOrder] = useState(null);
+  const [lines, setLines] = useState([{ product_id: '', quantity: 1 }]);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
+  const [dateFrom, setDateFrom] = useState('');
+  const [dateTo, setDateTo] = useState('');
   const { user } = useAuth();
 
   const canModify = user?.role === "ADMIN" || user?.role === "MANAGER";
 
   useEffect(() => {
     fetchOrders();
-    fetchProducts();
-  }, []);
+  }, [statusFilter, dateFrom, dateTo]);
+
+  // The status and date filters are applied by the server, one page at a time
+  const orderFilters = () => {
+    const params = {};
+    if (statusFilter !== 'all') params.status = statusFilter;
+    if (dateFrom) params.date_from = dateFrom;
+    if (dateTo) params.date_to = dateTo;
+    return params;
+  };
 
   const fetchOrders = async () => {
     try {
-      const response = await api.get('/orders/');
-      setOrders(response.data);
+      const page = await ordersAPI.getPage(orderFilters());
+      setOrders(page.orders);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Erreur lors du chargement des commandes:', error);
     } finally {
@@ -32,6 +47,30 @@ export default function OrdersList() {
     }
   };
 
+  const fetchMoreOrders = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await ordersAPI.getPage({ ...orderFilters(), cursor: nextCursor });
+      setOrders(prev => [...prev, ...page.orders]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Erreur lors du chargement des commandes:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const openModal = (order = null) => {
+    setEditingOrder(order);
+    setLines(order?.items?.length
+      ? order.items.map(item => ({ product_id: item.product_id, quantity: item.quantity }))
+      : [{ product_id: '', quantity: 1 }]);
+    setShowModal(true);
+    // The product list is only needed by the form
+    if (products.length === 0) fetchProducts();
+  };
+
   const fetchProducts = async () => {
     try {
       const response = await api.get('/products/');
@@ -44,11 +83,14 @@ export default function OrdersList() {
   const handleSubmit = async (e) => {
     e.preventDefault();
     const formData = new FormData(e.target);
-    const orderData = {
-      product_id: parseInt(formData.get('product_id')),
-      quantity: parseInt(formData.get('quantity')),
-      status: formData.get('status')
-    };
+    const orderData = { status: formData.get('status') };
+    // Lines of an order already (partly) delivered can no longer change
+    if (!editingOrder || !(editingOrder.fulfilled_quantity > 0)) {
+      orderData.items = lines.map(line => ({
+        product_id: parseInt(line.product_id),
+        quantity: parseInt(line.quantity)
+      }));
+    }
 
     try {
       if (editingOrder) {
@@ -83,8 +125,7 @@ export default function OrdersList() {
   };
 
   const handleEdit = (order) => {
-    setEditingOrder(order);
-    setShowModal(true);
+    openModal(order);
   };
 
   const handleDelete = async (id) => {
@@ -120,6 +161,35 @@ export default function OrdersList() {
     }
   };
 
+  const handleFulfill = async () => {
+    const result = await Swal.fire({
+      title: 'Livrer les commandes en attente ?',
+      text: "Le stock disponible est attribué aux commandes les plus anciennes d'abord.",
+      icon: 'question',
+      showCancelButton: true,
+      confirmButtonText: 'Livrer',
+      cancelButtonText: 'Annuler'
+    });
+    if (!result.isConfirmed) return;
+
+    try {
+      const params = orderFilters();
+      const report = await ordersAPI.fulfill({ date_from: params.date_from, date_to: params.date_to });
+      await Swal.fire({
+        icon: 'success',
+        title: 'Livraison effectuée',
+        text: `${report.filled.length} livrée(s), ${report.partial.length} partielle(s), ${report.short.length} en rupture`,
+      });
+      fetchOrders();
+    } catch (error) {
+      Swal.fire({
+        icon: 'error',
+        title: 'Erreur',
+        text: error.response?.data?.detail || 'Erreur lors de la livraison'
+      });
+    }
+  };
+
   const getStatusColor = (status) => {
     switch (status) {
       case 'PENDING':
@@ -147,10 +217,8 @@ export default function OrdersList() {
   };
 
   const filteredOrders = orders.filter(order => {
-    const matchesSearch = order.product_name?.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                         order.id.toString().includes(searchTerm);
-    const matchesStatus = statusFilter === 'all' || order.status === statusFilter;
-    return matchesSearch && matchesStatus;
+    return order.items?.some(item => item.product_name?.toLowerCase().includes(searchTerm.toLowerCase())) ||
+           order.id.toString().includes(searchTerm);
   });
 
   if (loading) {
@@ -169,13 +237,22 @@ export default function OrdersList() {
           <p className="text-gray-600">Gérez vos commandes de produits</p>
         </div>
         {canModify && (
-          <button
-            onClick={() => setShowModal(true)}
-            className="bg-blue-600 text-white px-4 py-2 rounded-lg hover:bg-blue-700 transition-colors flex items-center space-x-2"
-          >
-            <FaPlus className="w-4 h-4" />
-            <span>Nouvelle commande</span>
-          </button>
+          <div className="flex space-x-2">
+            <button
+              onClick={handleFulfill}
+              className="bg-green-600 text-white px-4 py-2 rounded-lg hover:bg-green-700 transition-colors flex items-center space-x-2"
+            >
+              <FaShoppingCart className="w-4 h-4" />
+              <span>Livrer les commandes</span>
+            </button>
+            <button
+              onClick={() => openModal()}
+              className="bg-blue-600 text-white px-4 py-2 rounded-lg hover:bg-blue-700 transition-colors flex items-center space-x-2"
+            >
+              <FaPlus className="w-4 h-4" />
+              <span>Nouvelle commande</span>
+            </button>
+          </div>
         )}
       </div>
 
@@ -206,6 +283,24 @@ export default function OrdersList() {
                 <option value="CANCELLED">Annulée</option>
               </select>
             </div>
+            <div className="sm:w-40">
+              <input
+                type="date"
+                value={dateFrom}
+                onChange={(e) => setDateFrom(e.target.value)}
+                title="Du"
+                className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
+              />
+            </div>
+            <div className="sm:w-40">
+              <input
+                type="date"
+                value={dateTo}
+                onChange={(e) => setDateTo(e.target.value)}
+                title="Au"
+                className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
+              />
+            </div>
           </div>
         </div>
 
@@ -214,7 +309,7 @@ export default function OrdersList() {
             <FaShoppingCart className="mx-auto h-12 w-12 text-gray-400" />
             <h3 className="mt-2 text-sm font-medium text-gray-900">Aucune commande</h3>
             <p className="mt-1 text-sm text-gray-500">
-              {searchTerm || statusFilter !== 'all' 
+              {searchTerm || statusFilter !== 'all' || dateFrom || dateTo
                 ? 'Aucune commande ne correspond à vos critères de recherche.'
                 : 'Commencez par créer votre première commande.'}
             </p>
@@ -262,11 +357,18 @@ export default function OrdersList() {
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="flex items-center">
                         <FaBox className="text-gray-400 mr-2" />
-                        <span className="text-sm text-gray-900">{order.product_name || 'Produit inconnu'}</span>
+                        <span className="text-sm text-gray-900">
+                          {order.items?.length
+                            ? order.items.map(item => item.product_name || 'Produit inconnu').join(', ')
+                            : 'Produit inconnu'}
+                        </span>
                       </div>
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <span className="text-sm font-medium text-gray-900">{order.quantity}</span>
+                      {order.status === 'PENDING' && order.fulfilled_quantity > 0 && (
+                        <span className="ml-2 text-xs text-gray-500">({order.fulfilled_quantity} livrée(s))</span>
+                      )}
                     </td>
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="flex items-center">
@@ -305,6 +407,17 @@ export default function OrdersList() {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <div className="p-4 text-center border-t border-gray-200">
+                <button
+                  onClick={fetchMoreOrders}
+                  disabled={loadingMore}
+                  className="px-4 py-2 text-sm text-blue-600 bg-blue-50 rounded-lg hover:bg-blue-100 transition-colors disabled:opacity-50"
+                >
+                  {loadingMore ? 'Chargement...' : 'Charger plus de commandes'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>
@@ -321,36 +434,56 @@ export default function OrdersList() {
             <form onSubmit={handleSubmit} className="p-6 space-y-4">
               <div>
                 <label className="block text-sm font-medium text-gray-700 mb-1">
-                  Produit *
+                  Produits *
                 </label>
-                <select
-                  name="product_id"
-                  required
-                  defaultValue={editingOrder?.product_id || ''}
-                  className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
-                >
-                  <option value="">Sélectionner un produit</option>
-                  {products.map(product => (
-                    <option key={product.id} value={product.id}>
-                      {product.name} (Stock: {product.quantity})
-                    </option>
+                <div className="space-y-2">
+                  {lines.map((line, index) => (
+                    <div key={index} className="flex space-x-2">
+                      <select
+                        required
+                        value={line.product_id}
+                        disabled={editingOrder?.fulfilled_quantity > 0}
+                        onChange={(e) => setLines(lines.map((l, i) => i === index ? { ...l, product_id: e.target.value } : l))}
+                        className="flex-1 px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
+                      >
+                        <option value="">Sélectionner un produit</option>
+                        {products.map(product => (
+                          <option key={product.id} value={product.id}>
+                            {product.name} (Stock: {product.quantity})
+                          </option>
+                        ))}
+                      </select>
+                      <input
+                        type="number"
+                        min="1"
+                        required
+                        value={line.quantity}
+                        disabled={editingOrder?.fulfilled_quantity > 0}
+                        onChange={(e) => setLines(lines.map((l, i) => i === index ? { ...l, quantity: e.target.value } : l))}
+                        className="w-24 px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
+                      />
+                      {lines.length > 1 && !(editingOrder?.fulfilled_quantity > 0) && (
+                        <button
+                          type="button"
+                          onClick={() => setLines(lines.filter((_, i) => i !== index))}
+                          className="text-red-600 hover:text-red-900 p-1"
+                        >
+                          <FaTrash className="w-4 h-4" />
+                        </button>
+                      )}
+                    </div>
                   ))}
-                </select>
-              </div>
-              
-              <div>
-                <label className="block text-sm font-medium text-gray-700 mb-1">
-                  Quantité *
-                </label>
-                <input
-                  type="number"
-                  name="quantity"
-                  min="1"
-                  required
-                  defaultValue={editingOrder?.quantity || ''}
-                  className="w-full px-3 py-2 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
-                  placeholder="1"
-                />
+                </div>
+                {!(editingOrder?.fulfilled_quantity > 0) && (
+                  <button
+                    type="button"
+                    onClick={() => setLines([...lines, { product_id: '', quantity: 1 }])}
+                    className="mt-2 text-sm text-blue-600 hover:text-blue-800 flex items-center space-x-1"
+                  >
+                    <FaPlus className="w-3 h-3" />
+                    <span>Ajouter une ligne</span>
+                  </button>
+                )}
               </div>
 
               <div>
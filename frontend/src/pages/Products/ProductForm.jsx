@@ -1,6 +1,8 @@
 // src/pages/Products/ProductForm.jsx
 import React, { useState, useEffect } from 'react';
-import { useAuth } from '../../contexts/AuthContext';
+import api from '../../api/axios';
+import { categoriesApi } from '../../api/categories';
+import { productsAPI } from '../../api/products';
 import { useNavigate, useParams } from 'react-router-dom';
 import { FaArrowLeft, FaSave, FaUpload, FaImage, FaWallet, FaBox, FaTag, FaWarehouse } from 'react-icons/fa';
 
@@ -19,7 +21,6 @@ export default function ProductForm() {
   const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(false);
   const [imagePreview, setImagePreview] = useState('');
-  const { token } = useAuth();
   const navigate = useNavigate();
   const { id } = useParams();
   const isEdit = Boolean(id);
@@ -33,13 +34,8 @@ export default function ProductForm() {
 
   const fetchCategories = async () => {
     try {
-      const response = await fetch('http://localhost:8000/categories', {
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Content-Type': 'application/json'
-        }
-      });
-      const data = await response.json();
+      // Through the api instance: it sends the current access token and refreshes it
+      const data = await categoriesApi.getAll();
       setCategories(data);
     } catch (error) {
       console.error('Error fetching categories:', error);
@@ -48,13 +44,7 @@ export default function ProductForm() {
 
   const fetchProduct = async () => {
     try {
-      const response = await fetch(`http://localhost:8000/products/${id}`, {
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Content-Type': 'application/json'
-        }
-      });
-      const data = await response.json();
+      const data = await productsAPI.getById(id);
       setProduct(data);
       if (data.image_url) setImagePreview(data.image_url);
     } catch (error) {
@@ -82,27 +72,17 @@ export default function ProductForm() {
     setLoading(true);
     
     try {
-      const url = isEdit 
-        ? `http://localhost:8000/products/${id}`
-        : 'http://localhost:8000/products';
+      const payload = {
+        ...product,
+        price: parseFloat(product.price),
+        stock: parseInt(product.stock),
+        category_id: parseInt(product.category_id)
+      };
+      const response = isEdit
+        ? await api.put(`/products/${id}`, payload)
+        : await api.post('/products', payload);
       
-      const method = isEdit ? 'PUT' : 'POST';
-      
-      const response = await fetch(url, {
-        method,
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Content-Type': 'application/json'
-        },
-        body: JSON.stringify({
-          ...product,
-          price: parseFloat(product.price),
-          stock: parseInt(product.stock),
-          category_id: parseInt(product.category_id)
-        })
-      });
-      
-      if (response.ok) {
+      if (response.status < 400) {
         navigate('/products');
       }
     } catch (error) {
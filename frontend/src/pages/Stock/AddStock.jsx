@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { productsAPI } from '../../api/products';
 import { stockApi } from '../../api/stock';
+import { locationsApi } from '../../api/locations';
 import { showToast } from '../../components/toast';
 import { FaPlus, FaMinus, FaSearch, FaBox } from 'react-icons/fa';
 
@@ -12,11 +13,13 @@ export default function AddStock() {
   const [quantity, setQuantity] = useState('');
   const [movementType, setMovementType] = useState('IN');
   const [location, setLocation] = useState('');
+  const [locations, setLocations] = useState([]);
   const [loading, setLoading] = useState(false);
   const [loadingProducts, setLoadingProducts] = useState(true);
 
   useEffect(() => {
     loadProducts();
+    loadLocations();
   }, []);
 
   useEffect(() => {
@@ -42,6 +45,16 @@ export default function AddStock() {
     }
   };
 
+  const loadLocations = async () => {
+    try {
+      const data = await locationsApi.getAll();
+      setLocations(data || []);
+    } catch (error) {
+      // Without the list the movement is simply recorded without a location
+      setLocations([]);
+    }
+  };
+
   const handleProductSelect = (product) => {
     setSelectedProduct(product);
     setSearchTerm(product.name);
@@ -227,13 +240,18 @@ export default function AddStock() {
             <label className="block text-sm font-medium text-gray-700 mb-2">
               Emplacement (optionnel)
             </label>
-            <input
-              type="text"
+            <select
               value={location}
               onChange={(e) => setLocation(e.target.value)}
-              placeholder="Ex: Entrepôt A, Rayon B..."
               className="w-full px-4 py-3 border border-gray-300 rounded-lg focus:ring-2 focus:ring-blue-500 focus:border-blue-500"
-            />
+            >
+              <option value="">Aucun emplacement</option>
+              {locations.map((loc) => (
+                <option key={loc.id} value={loc.code}>
+                  {loc.code} - {loc.name}
+                </option>
+              ))}
+            </select>
           </div>
 
           {/* Submit Button */}
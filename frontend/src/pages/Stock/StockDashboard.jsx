@@ -1,9 +1,10 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { FaBox, FaHistory, FaChartLine, FaExclamationTriangle, FaEdit } from 'react-icons/fa';
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 import { productsAPI } from '../../api/products';
 import { stockAnalyticsAPI } from '../../api/stockAnalytics';
 import { movementsAPI } from '../../api/movements';
+import { eventsAPI } from '../../api/events';
 import StockList from './StockList';
 import StockMovements from './StockMovements';
 import AddStock from './AddStock';
@@ -22,51 +23,89 @@ export default function StockDashboard() {
     monthlyData: []
   });
 
+  const productsRef = useRef([]);
+
   useEffect(() => {
     fetchStockData();
   }, [activeTab]);
 
+  // Mise à jour incrémentale à partir du flux d'événements au lieu de tout recharger
+  useEffect(() => {
+    const unsubscribe = eventsAPI.subscribe(['products', 'stock'], (event) => {
+      const products = productsRef.current;
+      if (event.topic === 'stock' && event.type === 'quantity') {
+        productsRef.current = products.map(p =>
+          p.id === event.data.product_id ? { ...p, quantity: event.data.quantity } : p
+        );
+      } else if (event.topic === 'stock' && event.type === 'movement.created') {
+        setStats(prev => ({ ...prev, todayMovements: prev.todayMovements + 1 }));
+        return;
+      } else if (event.topic === 'products' && event.type === 'created') {
+        productsRef.current = [...products, event.data];
+      } else if (event.topic === 'products' && event.type === 'updated') {
+        productsRef.current = products.map(p => p.id === event.data.id ? { ...p, ...event.data } : p);
+      } else if (event.topic === 'products' && event.type === 'deleted') {
+        productsRef.current = products.filter(p => p.id !== event.data.id);
+      } else {
+        fetchStockData();
+        return;
+      }
+      setStats(prev => ({ ...prev, ...productStats(productsRef.current) }));
+    }, () => fetchStockData());
+    return unsubscribe;
+  }, []);
+
+  const productStats = (products) => {
+    const totalItems = products.length;
+    const totalStock = products.reduce((sum, p) => sum + (p.quantity || 0), 0);
+    const lowStock = products.filter(p => p.quantity < 10 && p.quantity > 0).length;
+    const stockValue = products.reduce((sum, p) => sum + ((p.price || 0) * (p.quantity || 0)), 0);
+
+    const categoryGroups = products.reduce((acc, product) => {
+      const category = product.category_name || product.category || 'Autres';
+      if (!acc[category]) acc[category] = { count: 0, value: 0 };
+      acc[category].count += product.quantity || 0;
+      acc[category].value += (product.price || 0) * (product.quantity || 0);
+      return acc;
+    }, {});
+
+    const categoryData = Object.entries(categoryGroups).map(([name, data]) => ({
+      name,
+      stock: data.count,
+      value: data.value
+    }));
+
+    return { totalItems, totalStock, lowStock, stockValue, categoryData };
+  };
+
+  // Movements since a day, counted over every page of the ledger
+  const countMovementsSince = async (dateISO) => {
+    let count = 0;
+    let cursor = null;
+    do {
+      const page = await movementsAPI.getPage({ date_from: dateISO, limit: 1000, ...(cursor && { cursor }) });
+      count += page.movements.length;
+      cursor = page.nextCursor;
+    } while (cursor);
+    return count;
+  };
+
   const fetchStockData = async () => {
     try {
-      const [products, stockTrend, stockEvolution, movements] = await Promise.all([
+      const now = new Date();
+      const todayISO = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}-${String(now.getDate()).padStart(2, '0')}`;
+      const [products, stockTrend, stockEvolution, todayMovements] = await Promise.all([
         productsAPI.getAll(),
         stockAnalyticsAPI.getStockTrend(7),
         stockAnalyticsAPI.getStockEvolutionValue(6),
-        movementsAPI.getAll()
+        countMovementsSince(todayISO)
       ]);
       
-      const totalItems = products.length;
-      const totalStock = products.reduce((sum, p) => sum + (p.quantity || 0), 0);
-      const lowStock = products.filter(p => p.quantity < 10 && p.quantity > 0).length;
-      const stockValue = products.reduce((sum, p) => sum + ((p.price || 0) * (p.quantity || 0)), 0);
-
-      // Count today's movements
-      const today = new Date().toDateString();
-      const todayMovements = movements.filter(m => 
-        new Date(m.movement_date).toDateString() === today
-      ).length;
-
-      const categoryGroups = products.reduce((acc, product) => {
-        const category = product.category_name || product.category || 'Autres';
-        if (!acc[category]) acc[category] = { count: 0, value: 0 };
-        acc[category].count += product.quantity || 0;
-        acc[category].value += (product.price || 0) * (product.quantity || 0);
-        return acc;
-      }, {});
-
-      const categoryData = Object.entries(categoryGroups).map(([name, data]) => ({
-        name,
-        stock: data.count,
-        value: data.value
-      }));
+      productsRef.current = products;
 
       setStats({
-        totalItems,
-        lowStock,
-        stockValue,
+        ...productStats(products),
         todayMovements,
-        categoryData,
-        totalStock,
         stockTrendData: stockTrend || [],
         monthlyData: stockEvolution || []
       });
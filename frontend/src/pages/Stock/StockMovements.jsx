@@ -4,46 +4,55 @@ import { movementsAPI } from '../../api/movements';
 
 export default function StockMovements({ refreshTrigger }) {
   const [movements, setMovements] = useState([]);
-  const [filteredMovements, setFilteredMovements] = useState([]);
   const [dateFilter, setDateFilter] = useState('');
   const [typeFilter, setTypeFilter] = useState('all');
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     loadMovements();
-  }, [refreshTrigger]);
+  }, [refreshTrigger, dateFilter, typeFilter]);
+
+  // Filters are applied by the API, so every page matches them
+  const movementFilters = () => {
+    const params = {};
+    if (dateFilter) {
+      params.date_from = dateFilter;
+      params.date_to = dateFilter;
+    }
+    if (typeFilter !== 'all') params.type = typeFilter.toUpperCase();
+    return params;
+  };
 
   const loadMovements = async () => {
     try {
       setLoading(true);
-      const data = await movementsAPI.getAll();
-      console.log('Movements loaded:', data);
-      setMovements(data || []);
-      setFilteredMovements(data || []);
+      const page = await movementsAPI.getPage(movementFilters());
+      setMovements(page.movements || []);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Error loading movements:', error);
       setMovements([]);
-      setFilteredMovements([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
     }
   };
 
-  useEffect(() => {
-    let filtered = movements;
-
-    if (dateFilter) {
-      filtered = filtered.filter(movement => 
-        movement.movement_date.startsWith(dateFilter)
-      );
-    }
-
-    if (typeFilter !== 'all') {
-      filtered = filtered.filter(movement => movement.type === typeFilter);
+  const loadMoreMovements = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const page = await movementsAPI.getPage({ ...movementFilters(), cursor: nextCursor });
+      setMovements(prev => [...prev, ...page.movements]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error loading movements:', error);
+    } finally {
+      setLoadingMore(false);
     }
-
-    setFilteredMovements(filtered);
-  }, [dateFilter, typeFilter, movements]);
+  };
 
   const getMovementIcon = (type) => {
     const normalizedType = type.toUpperCase();
@@ -97,7 +106,7 @@ export default function StockMovements({ refreshTrigger }) {
           <div className="flex items-center justify-center py-12">
             <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-600"></div>
           </div>
-        ) : filteredMovements.length === 0 ? (
+        ) : movements.length === 0 ? (
           <div className="text-center py-12">
             <FaBox className="mx-auto h-12 w-12 text-gray-400 mb-4" />
             <h3 className="text-lg font-medium text-gray-900 mb-2">Aucun mouvement trouvé</h3>
@@ -115,7 +124,7 @@ export default function StockMovements({ refreshTrigger }) {
                 </tr>
               </thead>
               <tbody className="bg-white divide-y divide-gray-200">
-                {filteredMovements.map((movement) => (
+                {movements.map((movement) => (
                   <tr key={movement.id} className="hover:bg-gray-50">
                     <td className="px-6 py-4 whitespace-nowrap">
                       <div className="flex items-center">
@@ -151,6 +160,17 @@ export default function StockMovements({ refreshTrigger }) {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <div className="p-4 text-center border-t border-gray-200">
+                <button
+                  onClick={loadMoreMovements}
+                  disabled={loadingMore}
+                  className="px-4 py-2 text-sm text-blue-600 bg-blue-50 rounded-lg hover:bg-blue-100 transition-colors disabled:opacity-50"
+                >
+                  {loadingMore ? 'Chargement...' : 'Charger plus de mouvements'}
+                </button>
+              </div>
+            )}
           </div>
         )}
       </div>